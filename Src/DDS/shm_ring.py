@@ -0,0 +1,225 @@
+"""
+Shared-memory command ring between processes.
+
+One writer process (gait / IK) appends timestamped frames of servo angles to a
+ring in multiprocessing.shared_memory; any number of reader processes (the
+serial driver) pick up the newest frame without a socket, serialization or a
+lock shared with the writer.
+
+Layout: a header (magic, capacity, frame width, frames written) followed by
+`capacity` slots of [seq, frame number, timestamp, angles[width]]. Every slot
+is guarded by a seqlock: the writer makes seq odd, writes the slot, makes seq
+even again and only then publishes the new frame count. A reader copies the
+slot between two reads of seq and retries when they differ or are odd, so a
+frame is never seen half written and the writer never waits for a reader.
+
+Timestamps are time.monotonic(), which is system wide on Linux, so a reader
+can measure the writer -> reader latency directly.
+
+The ring is created once, by whoever owns the control stack, before any writer
+or reader process starts; those attach by name (ShmRingWriter(create=False),
+ShmRingReader), so every process maps the same segment. A name that already
+exists is never taken over implicitly: it may belong to another running stack.
+A segment left behind by a crashed run is removed with remove().
+"""
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import time
+import multiprocessing as mp
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from Src.Drivers.Transmit import config as servo_cfg
+
+RING_NAME = "hexapod_servo_ring"
+RING_CAPACITY = 64
+MAGIC = 0x48584652          # "HXFR"
+
+_HEADER = np.dtype([("magic", "<u4"), ("capacity", "<u4"), ("width", "<u4"), ("reserved", "<u4"), ("count", "<u8")])
+
+
+def _slot_dtype(width: int) -> np.dtype:
+    return np.dtype([("seq", "<u8"), ("frame", "<u8"), ("timestamp", "<f8"), ("angles", "<f8", (width,))])
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name)
+    # the owner unlinks the segment: keep the resource tracker of an independent process from unlinking it at exit.
+    # a multiprocessing child shares its parent's tracker, where the owner's registration has to stay
+    if mp.parent_process() is None:
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    return shm
+
+
+def remove(name: str = RING_NAME) -> bool:
+    '''
+    unlink a ring left behind by a crashed run, only when no running stack uses that name
+    return: True if a segment was removed
+    '''
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    shm.close()
+    shm.unlink()
+    return True
+
+
+class _Ring:
+    def _map(self, shm: shared_memory.SharedMemory, capacity: int, width: int):
+        self._shm = shm
+        self.capacity = capacity
+        self.width = width
+        self._header = np.ndarray((1,), dtype=_HEADER, buffer=shm.buf)
+        slots = np.ndarray((capacity,), dtype=_slot_dtype(width), buffer=shm.buf, offset=_HEADER.itemsize)
+        self._seq = slots["seq"]
+        self._frame = slots["frame"]
+        self._timestamp = slots["timestamp"]
+        self._angles = slots["angles"]
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def count(self) -> int:
+        # frames written so far
+        return int(self._header["count"][0])
+
+    def close(self):
+        # drop the numpy views first, SharedMemory refuses to close while they export the buffer
+        self._header = self._seq = self._frame = self._timestamp = self._angles = None
+        self._shm.close()
+
+
+class ShmRingWriter(_Ring):
+    '''
+    the only writer of the ring. Also usable as a GaitController servo_sink:
+    send_order names the angle columns, write_angles() appends a frame stamped now.
+    create=True makes a new ring (FileExistsError if the name is taken), create=False attaches to the ring
+    the owner created, capacity then comes from its header.
+    '''
+    def __init__(self, name: str = RING_NAME, capacity: int = RING_CAPACITY, send_order: List[str] = servo_cfg.SEND_ORDER,
+                 create: bool = True):
+        self.send_order = list(send_order)
+        width = len(self.send_order)
+        if not create:
+            shm = _attach(name)
+            header = np.ndarray((1,), dtype=_HEADER, buffer=shm.buf)
+            magic, capacity, ring_width = int(header["magic"][0]), int(header["capacity"][0]), int(header["width"][0])
+            del header
+            if magic != MAGIC or ring_width != width:
+                shm.close()
+                raise ValueError(f"shared memory {name!r} is not a servo command ring of width {width}")
+            self._map(shm, capacity, width)
+            return
+        size = _HEADER.itemsize + capacity * _slot_dtype(width).itemsize
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            raise FileExistsError(f"shared memory {name!r} already exists: another control stack is using it, "
+                                  f"or a crashed run left it behind (shm_ring.remove({name!r}))") from None
+        self._map(shm, capacity, width)
+        self._header["capacity"] = capacity
+        self._header["width"] = width
+        self._header["count"] = 0
+        self._seq[:] = 0
+        self._header["magic"] = MAGIC
+
+    def write(self, angles, timestamp: Optional[float] = None) -> int:
+        '''
+        append one frame, return its frame number (1, 2, ...)
+        '''
+        frame = self.count + 1
+        slot = (frame - 1) % self.capacity
+        self._seq[slot] += 1                # odd: slot being written
+        self._angles[slot] = angles
+        self._timestamp[slot] = time.monotonic() if timestamp is None else timestamp
+        self._frame[slot] = frame
+        self._seq[slot] += 1                # even: slot consistent
+        self._header["count"] = frame       # publish
+        return frame
+
+    def write_angles(self, angles):
+        self.write(angles)
+
+    def unlink(self):
+        name = self._shm.name
+        self.close()
+        try:
+            shared_memory.SharedMemory(name=name).unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ShmRingReader(_Ring):
+    '''
+    attaches to an existing ring, read_latest() returns the newest consistent frame
+    '''
+    def __init__(self, name: str = RING_NAME, max_retries: int = 100):
+        shm = _attach(name)
+        header = np.ndarray((1,), dtype=_HEADER, buffer=shm.buf)
+        if int(header["magic"][0]) != MAGIC:
+            del header
+            shm.close()
+            raise ValueError(f"shared memory {name!r} is not a servo command ring")
+        capacity, width = int(header["capacity"][0]), int(header["width"][0])
+        del header
+        self._map(shm, capacity, width)
+        self.max_retries = max_retries
+        self._last_frame = 0
+        # statistics
+        self.reads = 0              # frames returned
+        self.retries = 0            # slot copies repeated because the writer was in the slot
+        self.skipped = 0            # frames overwritten by newer ones before this reader saw them
+        self.failed = 0             # reads given up after max_retries
+        self.latency_sum = 0.0      # s, timestamp -> read, summed over reads
+        self.latency_max = 0.0
+
+    def read_latest(self, new_only: bool = True) -> Optional[Tuple[int, float, np.ndarray]]:
+        '''
+        return: (frame number, timestamp, angles (width,) copy) of the newest frame,
+                None if nothing was written yet (or, with new_only, nothing since the last call)
+        '''
+        for _ in range(self.max_retries):
+            count = self.count
+            if count == 0 or (new_only and count == self._last_frame):
+                return None
+            slot = (count - 1) % self.capacity
+            before = int(self._seq[slot])
+            if before & 1:
+                self.retries += 1
+                continue
+            frame = int(self._frame[slot])
+            timestamp = float(self._timestamp[slot])
+            angles = self._angles[slot].copy()
+            if int(self._seq[slot]) != before:
+                self.retries += 1
+                continue
+            if frame > self._last_frame + 1 and self._last_frame:
+                self.skipped += frame - self._last_frame - 1
+            self._last_frame = frame
+            self.reads += 1
+            latency = time.monotonic() - timestamp
+            self.latency_sum += latency
+            self.latency_max = max(self.latency_max, latency)
+            return frame, timestamp, angles
+        self.failed += 1
+        return None
+
+    def stats(self) -> dict:
+        return {"reads": self.reads, "retries": self.retries, "skipped": self.skipped, "failed": self.failed,
+                "written": self.count,
+                "latency_mean": self.latency_sum / self.reads if self.reads else None,
+                "latency_max": self.latency_max if self.reads else None}
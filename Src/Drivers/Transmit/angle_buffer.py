@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Latest-value handoff of the servo command between threads.
+
+Two preallocated slots and a generation counter: slot (generation & 1) is the
+published command. A writer fills the other slot and then increments the
+generation, which publishes it in one step. A reader notes the generation,
+copies the published slot and checks the generation again; only a publish that
+completed during the copy can have touched that slot, and then the copy is
+simply repeated (seqlock). The reader never takes a lock, and a writer never
+waits for the reader.
+
+Every slot carries the time.monotonic() timestamp of its command, so the
+sender can interpolate between setpoints.
+
+Writers are serialized among themselves by a lock that only writers take, so
+with one producer (the usual case) it is never contended. Reader retries and
+writer contention are counted, see stats().
+"""
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class AngleDoubleBuffer:
+
+    def __init__(self, initial, low: float = 0.0, high: float = 180.0, max_retries: int = 100):
+        initial = np.asarray(initial, dtype=float)
+        self.width = initial.size
+        self.low = low
+        self.high = high
+        self.max_retries = max_retries
+        self._slots = np.empty((2, self.width))
+        np.clip(initial, low, high, out=self._slots[0])
+        self._slots[1] = self._slots[0]
+        self._stamps = np.full(2, time.monotonic())
+        self._generation = 0
+        self._write_lock = threading.Lock()
+        self._last_read = 0         # generation of the last snapshot()
+        # statistics
+        self.writes = 0
+        self.write_contention = 0   # writes that had to wait for another writer
+        self.reads = 0
+        self.read_retries = 0       # copies repeated because a write was published during the copy
+        self.overwritten = 0        # generations published and replaced before any snapshot() saw them
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _acquire(self):
+        if not self._write_lock.acquire(blocking=False):
+            self.write_contention += 1
+            self._write_lock.acquire()
+
+    def write(self, angles, index: Optional[np.ndarray] = None, timestamp: Optional[float] = None):
+        """
+        publish angles (width,), clamped to low..high, stamped timestamp (default: now).
+        with index, angles[index] is published (e.g. a permutation into send order), without an intermediate copy
+        """
+        self._acquire()
+        try:
+            back_index = (self._generation + 1) & 1
+            back = self._slots[back_index]
+            self._stamps[back_index] = time.monotonic() if timestamp is None else timestamp
+            if index is None:
+                np.clip(angles, self.low, self.high, out=back)
+            else:
+                np.take(angles, index, out=back)
+                np.clip(back, self.low, self.high, out=back)
+            self._generation += 1
+            self.writes += 1
+        finally:
+            self._write_lock.release()
+
+    def update(self, columns, values):
+        """publish a copy of the current command with only the given columns replaced"""
+        self._acquire()
+        try:
+            generation = self._generation
+            back = self._slots[(generation + 1) & 1]
+            self._stamps[(generation + 1) & 1] = time.monotonic()
+            # writers are excluded, the published slot cannot change under this copy
+            back[:] = self._slots[generation & 1]
+            back[columns] = np.clip(values, self.low, self.high)
+            self._generation = generation + 1
+            self.writes += 1
+        finally:
+            self._write_lock.release()
+
+    def snapshot(self, out: Optional[np.ndarray] = None) -> Tuple[int, float, np.ndarray]:
+        """
+        consistent copy of the published command, O(1) and lock free
+        return: (generation, timestamp, angles (width,)), angles is out when given
+        """
+        out = np.empty(self.width) if out is None else out
+        generation = self._generation
+        for _ in range(self.max_retries):
+            timestamp = float(self._stamps[generation & 1])
+            np.copyto(out, self._slots[generation & 1])
+            current = self._generation
+            if current == generation:
+                break
+            self.read_retries += 1
+            generation = current
+        else:
+            # writers kept publishing for max_retries copies: take the latest under the writer lock
+            with self._write_lock:
+                generation = self._generation
+                timestamp = float(self._stamps[generation & 1])
+                np.copyto(out, self._slots[generation & 1])
+        self.reads += 1
+        if generation > self._last_read + 1:
+            self.overwritten += generation - self._last_read - 1
+        self._last_read = max(self._last_read, generation)
+        return generation, timestamp, out
+
+    def peek(self) -> np.ndarray:
+        """copy of the published command without touching the read statistics"""
+        while True:
+            generation = self._generation
+            angles = self._slots[generation & 1].copy()
+            if self._generation == generation:
+                return angles
+
+    def stats(self) -> dict:
+        return {"generation": self._generation, "writes": self.writes, "write_contention": self.write_contention,
+                "reads": self.reads, "read_retries": self.read_retries, "overwritten": self.overwritten}
+
+    def reset_stats(self):
+        self.writes = self.write_contention = self.reads = self.read_retries = self.overwritten = 0
+        self._last_read = self._generation
@@ -27,4 +27,16 @@ DEFAULT_JOINT_ANGLE = {
     "R1_coxa":90.0, "R1_femur":90.0, "R1_tibia":90.0,
     "R2_coxa":90.0, "R2_femur":90.0, "R2_tibia":90.0,
     "R3_coxa":90.0, "R3_femur":90.0, "R3_tibia":90.0,     
-}
\ No newline at end of file
+}
+
+# ==== setpoint interpolation (sender thread) ====
+
+# "none": send the newest setpoint as is, "linear" / "hermite" (cubic, Catmull-Rom tangents): interpolate
+# between timestamped setpoints at CONTROL_FREQUENCE, so the gait side may run slower than the sender.
+# interpolation adds one setpoint interval of latency, so it is opt-in: servo(interpolation=...) / --interpolation
+INTERPOLATION = "none"
+# s, how far behind the newest setpoint the output runs, None: the measured setpoint interval
+INTERPOLATION_DELAY = None
+# s, setpoints further apart than this follow a pause: the move to the new setpoint takes one delay instead
+# of the whole gap, and the gap does not count for the interval estimate
+INTERPOLATION_MAX_GAP = 0.1
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Resampling of timestamped servo setpoints at the sender rate.
+
+The gait side publishes setpoints at its own rate (e.g. 50 Hz), the sender
+thread needs one frame per period (200 Hz). Instead of repeating the newest
+setpoint until the next one arrives, the output follows the setpoint history
+`delay` seconds in the past, so there is (almost) always a setpoint on both
+sides of the sampled time and the output is interpolated, not extrapolated:
+
+  linear   piecewise linear between neighbouring setpoints
+  hermite  cubic Hermite with Catmull-Rom tangents (velocity continuous)
+  none     newest setpoint as is, no added delay
+
+The delay defaults to the measured setpoint interval, i.e. one upstream period
+of latency for smooth motion. Timestamps are time.monotonic().
+"""
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from typing import Optional
+
+import numpy as np
+
+from Src.Drivers.Transmit import config as cfg
+
+
+class SetpointInterpolator:
+
+    MODES = ("none", "linear", "hermite")
+    HISTORY = 4                 # setpoints kept, hermite needs the neighbours of the sampled segment
+
+    def __init__(self,
+                 width: int,
+                 mode: str = cfg.INTERPOLATION,
+                 delay: Optional[float] = cfg.INTERPOLATION_DELAY,
+                 max_gap: float = cfg.INTERPOLATION_MAX_GAP):
+        if mode not in self.MODES:
+            raise ValueError(f"interpolation mode must be one of {self.MODES}, got {mode!r}")
+        self.width = width
+        self.mode = mode
+        self.fixed_delay = delay
+        self.max_gap = max_gap
+        self.interval: Optional[float] = None   # s, running estimate of the setpoint interval
+        # oldest first, the newest setpoint is the last row
+        self._times = np.zeros(self.HISTORY)
+        self._points = np.zeros((self.HISTORY, width))
+        self._count = 0
+
+    @property
+    def delay(self) -> float:
+        if self.mode == "none":
+            return 0.0
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        return self.interval if self.interval is not None else 0.0
+
+    def reset(self):
+        self._count = 0
+        self.interval = None
+
+    def push(self, timestamp: float, angles):
+        """
+        add a setpoint (width,) stamped timestamp, newer than the previous ones
+        """
+        if self._count:
+            last = self._times[-1]
+            gap = timestamp - last
+            if gap <= 0.0:
+                # same or older stamp: replaces the newest setpoint
+                self._points[-1] = angles
+                return
+            if gap > self.max_gap:
+                # after a pause: hold the previous setpoint until the new one is sampled, then move in one delay
+                self._times[-1] = timestamp - (min(self.delay, self.max_gap) or self.max_gap)
+            else:
+                self.interval = gap if self.interval is None else 0.9 * self.interval + 0.1 * gap
+        self._times[:-1] = self._times[1:]
+        self._points[:-1] = self._points[1:]
+        self._times[-1] = timestamp
+        self._points[-1] = angles
+        self._count = min(self._count + 1, self.HISTORY)
+
+    def sample(self, now: float, out: np.ndarray) -> np.ndarray:
+        """
+        output (width,) for time now, written to out
+        """
+        n = self._count
+        if n == 0:
+            return out
+        times, points = self._times, self._points
+        t = now - self.delay
+        first = self.HISTORY - n
+        if self.mode == "none" or n == 1 or t >= times[-1]:
+            np.copyto(out, points[-1])
+            return out
+        if t <= times[first]:
+            np.copyto(out, points[first])
+            return out
+
+        # segment [i, i + 1] containing t
+        i = first + int(np.searchsorted(times[first:], t, side="right")) - 1
+        t0, t1 = times[i], times[i + 1]
+        dt = t1 - t0
+        u = (t - t0) / dt
+        p0, p1 = points[i], points[i + 1]
+        if self.mode == "linear":
+            np.subtract(p1, p0, out=out)
+            out *= u
+            out += p0
+            return out
+
+        # cubic Hermite, tangents from the neighbouring setpoints (one-sided at the ends of the history)
+        m0 = (p1 - points[i - 1]) / (t1 - times[i - 1]) if i > first else (p1 - p0) / dt
+        m1 = (points[i + 2] - p0) / (times[i + 2] - t0) if i + 2 < self.HISTORY else (p1 - p0) / dt
+        u2 = u * u
+        u3 = u2 * u
+        np.multiply(p0, 2.0 * u3 - 3.0 * u2 + 1.0, out=out)
+        out += (u3 - 2.0 * u2 + u) * dt * m0
+        out += (-2.0 * u3 + 3.0 * u2) * p1
+        out += (u3 - u2) * dt * m1
+        return out
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+STM32 servo board simulator on a Linux pseudo-terminal.
+
+Creates a PTY and behaves like the board on the other end of the UART: the
+driver opens `simulator.port` instead of COM7 and the simulator parses the
+AA 55 SET18 frames (see servo_control.py), checks LEN, CMD, CRC16-IBM and SEQ
+continuity and keeps the newest angles.
+
+UART timing is modelled at the configured baud (8N1, 10 bits per byte): bytes
+are taken off the PTY no faster than the line could carry them, so a host that
+sends more than the baud rate allows is slowed down by the PTY buffer filling
+up, like a real port. Every frame is stamped with the time its last byte would
+have finished on the wire.
+
+    python Src/Drivers/Transmit/servo_board_simulator.py
+    python Tests/tripod_gait_local.py --port /dev/pts/N
+"""
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import math
+import os
+import select
+import struct
+import threading
+import time
+import tty
+from typing import Callable, Optional
+
+import numpy as np
+
+from Src.Drivers.Transmit import config as cfg
+from Src.Drivers.Transmit.servo_control import crc16_ibm, servo
+
+
+class ServoBoardSimulator:
+
+    BITS_PER_BYTE = 10          # 8N1: start + 8 data + stop
+    READ_CHUNK = 64             # bytes taken off the PTY per step, bounds the timing granularity
+    _PAYLOAD = struct.Struct("<BH18H")
+    _CRC = struct.Struct("<H")
+
+    def __init__(self,
+                 baud: int = cfg.BAUD,
+                 on_frame: Optional[Callable[[int, np.ndarray, float], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        on_frame(seq, angles (18,) in degree, receive time) is called from the simulator thread for every valid frame
+        """
+        self.baud = baud
+        self.byte_time = self.BITS_PER_BYTE / float(baud)
+        self.on_frame = on_frame
+        self.clock = clock
+        self._master, self._slave = os.openpty()
+        # raw line discipline: no echo, no CR/LF translation, frames pass byte for byte
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._buffer = bytearray()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.bytes_received = 0
+            self.bytes_discarded = 0        # skipped while looking for AA 55 (noise, broken frames)
+            self.frames = 0                 # valid frames
+            self.crc_errors = 0
+            self.bad_frames = 0             # wrong LEN or CMD
+            self.seq_gaps = 0               # times SEQ jumped ahead
+            self.dropped = 0                # frames missing in those jumps
+            self.seq_repeats = 0            # SEQ equal to or behind the previous one
+            self.last_seq: Optional[int] = None
+            self.last_angles = np.full(18, np.nan)
+            self._line_time = None          # when the line finishes the bytes received so far
+            self._busy = 0.0                # s the line spent transmitting
+            self._started = self.clock()
+            self._first_frame = None
+            self._last_frame = None
+            # Welford running mean / variance of the frame intervals
+            self._intervals = 0
+            self._interval_mean = 0.0
+            self._interval_m2 = 0.0
+            self._interval_max = 0.0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="servo board simulator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def close(self):
+        self.stop()
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._master], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                chunk = os.read(self._master, self.READ_CHUNK)
+            except OSError:
+                continue
+            now = self.clock()
+            with self._lock:
+                # the line is idle until now unless it is still busy with earlier bytes
+                line_time = now if self._line_time is None or self._line_time < now else self._line_time
+                self._line_time = line_time + len(chunk) * self.byte_time
+                self._busy += len(chunk) * self.byte_time
+                self.bytes_received += len(chunk)
+                self._buffer += chunk
+                self._parse()
+                line_time = self._line_time
+            # the UART cannot deliver bytes faster than the baud rate
+            wait = line_time - self.clock()
+            if wait > 0.0:
+                time.sleep(wait)
+
+    def _parse(self):
+        buf = self._buffer
+        end_time = self._line_time
+        while True:
+            start = buf.find(b"\xaa\x55")
+            if start < 0:
+                # keep a trailing 0xAA, it may be the first half of the next start marker
+                keep = 1 if buf[-1:] == b"\xaa" else 0
+                self.bytes_discarded += len(buf) - keep
+                del buf[:len(buf) - keep]
+                return
+            if start:
+                self.bytes_discarded += start
+                del buf[:start]
+            if len(buf) < 3:
+                return
+            if buf[2] != servo.LEN_FIXED:
+                self.bad_frames += 1
+                self.bytes_discarded += 2
+                del buf[:2]
+                continue
+            if len(buf) < servo.FRAME_SIZE:
+                return
+            frame = bytes(buf[:servo.FRAME_SIZE])
+            # time the last byte of this frame left the wire: bytes still buffered come after it
+            received = end_time - (len(buf) - servo.FRAME_SIZE) * self.byte_time
+            if self._check(frame, received):
+                del buf[:servo.FRAME_SIZE]
+            else:
+                # resynchronize on the next start marker inside the rejected frame
+                self.bytes_discarded += 2
+                del buf[:2]
+
+    def _check(self, frame: bytes, received: float) -> bool:
+        if crc16_ibm(frame[3:servo.FRAME_SIZE - 2]) != self._CRC.unpack_from(frame, servo.FRAME_SIZE - 2)[0]:
+            self.crc_errors += 1
+            return False
+        cmd, seq, *angles = self._PAYLOAD.unpack_from(frame, 3)
+        if cmd != servo.CMD_SET18:
+            self.bad_frames += 1
+            return False
+
+        if self.last_seq is not None:
+            step = (seq - self.last_seq) & 0xFFFF
+            if step == 0 or step > 0x8000:
+                self.seq_repeats += 1
+            elif step > 1:
+                self.seq_gaps += 1
+                self.dropped += step - 1
+        self.last_seq = seq
+        self.last_angles = np.array(angles) / 10.0
+        self.frames += 1
+        if self._last_frame is not None:
+            interval = received - self._last_frame
+            self._intervals += 1
+            delta = interval - self._interval_mean
+            self._interval_mean += delta / self._intervals
+            self._interval_m2 += delta * (interval - self._interval_mean)
+            self._interval_max = max(self._interval_max, interval)
+        else:
+            self._first_frame = received
+        self._last_frame = received
+        if self.on_frame is not None:
+            self.on_frame(seq, self.last_angles, received)
+        return True
+
+    def stats(self) -> dict:
+        """
+        return: {"port", "baud", "frames", "frame_rate", "crc_errors", "bad_frames", "seq_gaps", "dropped",
+                 "seq_repeats", "bytes_received", "bytes_discarded", "line_utilization",
+                 "interval_mean", "interval_jitter" (std), "interval_max", "last_seq"}, times in s
+        """
+        with self._lock:
+            elapsed = self.clock() - self._started
+            intervals = self._intervals
+            return {
+                "port": self.port,
+                "baud": self.baud,
+                "frames": self.frames,
+                "frame_rate": intervals / (self._last_frame - self._first_frame) if intervals else None,
+                "crc_errors": self.crc_errors,
+                "bad_frames": self.bad_frames,
+                "seq_gaps": self.seq_gaps,
+                "dropped": self.dropped,
+                "seq_repeats": self.seq_repeats,
+                "bytes_received": self.bytes_received,
+                "bytes_discarded": self.bytes_discarded,
+                "line_utilization": self._busy / elapsed if elapsed > 0.0 else 0.0,
+                "interval_mean": self._interval_mean if intervals else None,
+                "interval_jitter": math.sqrt(self._interval_m2 / intervals) if intervals else None,
+                "interval_max": self._interval_max if intervals else None,
+                "last_seq": self.last_seq,
+            }
+
+    def report(self) -> str:
+        s = self.stats()
+        if not s["frames"]:
+            return f"[board sim {self.port}] no frames yet, {s['bytes_received']} bytes received"
+        rate = f"{s['frame_rate']:.1f} Hz" if s["frame_rate"] else "-"
+        jitter = f"{s['interval_jitter'] * 1e6:.0f} us" if s["interval_jitter"] is not None else "-"
+        return (f"[board sim {self.port}] {s['frames']} frames @ {rate}, jitter {jitter}, "
+                f"{s['dropped']} dropped in {s['seq_gaps']} gaps, {s['seq_repeats']} repeated, "
+                f"{s['crc_errors']} CRC errors, {s['bad_frames']} bad frames, {s['bytes_discarded']} bytes discarded, "
+                f"line {s['line_utilization'] * 100:.1f}% busy @ {self.baud} baud")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulated STM32 servo board on a pseudo-terminal")
+    parser.add_argument("--baud", type=int, default=cfg.BAUD, help="modelled UART baud rate")
+    parser.add_argument("--interval", type=float, default=1.0, help="s between stats lines")
+    args = parser.parse_args()
+
+    board = ServoBoardSimulator(baud=args.baud)
+    board.start()
+    print(f"Simulated servo board on {board.port} @ {args.baud} baud. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(args.interval)
+            print(board.report())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        board.close()
+        print(board.report())
@@ -19,13 +19,39 @@ if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
 
-import time
 import math
+import time
 import struct
 import serial
+import numpy as np
 from Src.Drivers.Transmit import config as cfg
+from Src.Drivers.Transmit.angle_buffer import AngleDoubleBuffer
+from Src.Drivers.Transmit.interpolation import SetpointInterpolator
+from Src.Timing.scheduler import PeriodicScheduler
 import threading
-import queue
+
+
+def _crc16_ibm_table() -> list:
+    """CRC16-IBM (poly=0xA001, reflected) of every single byte value, for the byte-wise table lookup"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 0x0001 else crc >> 1
+        table.append(crc)
+    return table
+
+
+CRC16_TABLE = _crc16_ibm_table()
+
+
+def crc16_ibm(data) -> int:
+    """CRC16-IBM (Modbus) poly=0xA001, init=0xFFFF, one table lookup per byte, shared by encoder and frame checkers"""
+    crc = 0xFFFF
+    table = CRC16_TABLE
+    for ch in data:
+        crc = (crc >> 8) ^ table[(crc ^ ch) & 0xFF]
+    return crc
 
 
 class servo:
@@ -33,72 +59,108 @@ class servo:
     CMD_SET18 = 0x01
     LEN_FIXED = 41         # CMD..CRC length
     START1, START2 = 0xAA, 0x55
+    FRAME_SIZE = 3 + LEN_FIXED
+    _PAYLOAD = struct.Struct("<BH18H")      # CMD, SEQ, angles, packed at offset 3
+    _CRC = struct.Struct("<H")
 
     def __init__(self, 
                  port: str = cfg.PORT, 
                  baud: int = cfg.BAUD,
                  control_frequency: int = cfg.CONTROL_FREQUENCE,
                  send_order: list = cfg.SEND_ORDER,
-                 default_joint_angle: dict = cfg.DEFAULT_JOINT_ANGLE):
+                 default_joint_angle: dict = cfg.DEFAULT_JOINT_ANGLE,
+                 interpolation: str = cfg.INTERPOLATION):
         self.port = port
         self.baud = baud
         self.control_frequency = control_frequency
-        self.send_order = send_order
-        self.DEFAULT_JOINT_ANGLE = default_joint_angle
-        self.__joint_angle = default_joint_angle
-        self._lock = threading.RLock()
-        self._q = queue.Queue(maxsize=1)
+        self.DEFAULT_JOINT_ANGLE = dict(default_joint_angle)
+        # array API column order (set_angles_array / read_angles_array) and the order on the wire
+        self.joint_names = list(self.DEFAULT_JOINT_ANGLE)
+        self.send_order = list(send_order) if send_order else list(self.joint_names)
+        unknown = [name for name in self.send_order if name not in self.DEFAULT_JOINT_ANGLE]
+        if unknown:
+            raise ValueError(f"send_order has joints without a default angle: {unknown}")
+        # joint_names -> send_order permutation, compiled once
+        self._send_index = np.array([self.joint_names.index(name) for name in self.send_order], dtype=np.intp)
+        self._joint_order = np.argsort(self._send_index)
+        self._send_column = {name: i for i, name in enumerate(self.send_order)}
         self._stop = threading.Event()
         self._thread = None
         self._ser = None
         self._seq = 0
+        # frame buffer reused by _build_frame(), the AA 55 LEN header never changes
+        self._frame = bytearray(self.FRAME_SIZE)
+        self._frame[0:3] = bytes((self.START1, self.START2, self.LEN_FIXED))
+        self._angles_d10 = np.empty(18, dtype=np.float64)
+        # commanded angles in send_order: lock-free latest-value handoff to the sender thread
+        self.angles = AngleDoubleBuffer([self.DEFAULT_JOINT_ANGLE[name] for name in self.send_order])
+        self._send_angles = np.empty(len(self.send_order))
+        # sender side: setpoint history resampled at control_frequency, see interpolation.py
+        self.interpolator = SetpointInterpolator(len(self.send_order), interpolation)
+        self._setpoint = np.empty(len(self.send_order))
+        self._setpoint_generation = -1
+        self._source = None         # optional frame source polled once per send tick, see attach_source()
+        period = 1.0 / float(self.control_frequency) if self.control_frequency and self.control_frequency > 0 else 1.0/150.0
+        # send timing, jitter / overrun statistics via self.scheduler.stats()
+        self.scheduler = PeriodicScheduler(period, name="servo")
 
     def set_angle(self, joint_name: str, joint_angle: float):
-        try:
-            ang = float(joint_angle)
-        except (ValueError, TypeError) as e:
-            print(f"set_angle: invalid angle for {joint_name}: {joint_angle} -> {e}")
-            return
-        ang = max(0.0, min(180.0, ang))
-        with self._lock:
-            self.__joint_angle[joint_name] = ang
-
+        self.set_all_angle({joint_name: joint_angle})
 
     def set_all_angle(self, joint_angle: dict):
+        """name-keyed convenience wrapper, joints not given keep their angle"""
         if not isinstance(joint_angle, dict):
             return
 
-        with self._lock:
-            for k, v in joint_angle.items():
-                try:
-                    ang = float(v)
-                except (ValueError, TypeError) as e:
-                    print(f"set_all_angle: invalid angle for {k}: {v} -> {e}")
-                    continue
-                ang = max(0.0, min(180.0, ang))
-                self.__joint_angle[k] = ang
-            snapshot = dict(self.__joint_angle)
-
-        try:
-            self._q.put_nowait(snapshot)
-        except queue.Full:
+        columns, values = [], []
+        for k, v in joint_angle.items():
+            column = self._send_column.get(k)
+            if column is None:
+                continue
             try:
-                _ = self._q.get_nowait()
-            except queue.Empty:
-                pass
-            try:
-                self._q.put_nowait(snapshot)
-            except Exception as e:
-                print("Warning: failed to update single-slot queue:", e)
+                values.append(float(v))
+            except (ValueError, TypeError) as e:
+                print(f"set_all_angle: invalid angle for {k}: {v} -> {e}")
+                continue
+            columns.append(column)
+        if columns:
+            self.angles.update(columns, values)
+
+    def set_angles_array(self, angles, timestamp: float = None):
+        """
+        fast path: angles (18,) in degree, columns in self.joint_names order.
+        permuted to send_order with the precompiled index array, clamped to 0..180 and published.
+        timestamp: time.monotonic() the setpoint belongs to, default now
+        """
+        self.angles.write(angles, self._send_index, timestamp)
+
+    def write_angles(self, angles, timestamp: float = None):
+        """
+        in-process fast path: angles (18,) in degree, already in send_order.
+        copied into the back buffer and published, never waits for the sender thread
+        """
+        self.angles.write(angles, timestamp=timestamp)
+
+    def read_angles_array(self) -> np.ndarray:
+        """commanded angles (18,), columns in self.joint_names order"""
+        return self.angles.peek()[self._joint_order]
+
+    def buffer_stats(self) -> dict:
+        """writes, reads, write_contention, read_retries and overwritten (commands never sent) of the angle handoff"""
+        return self.angles.stats()
+
+    def attach_source(self, source):
+        """
+        source.read_latest() -> (frame number, timestamp, angles (18,) in send_order) or None when nothing new,
+        e.g. a DDS.shm_ring.ShmRingReader fed by a gait process. polled by the sender thread right before each frame
+        """
+        self._source = source
 
     def read_joint_angle(self) -> dict:
-        with self._lock:
-            # print(self.__joint_angle)
-            return dict(self.__joint_angle)
+        return dict(zip(self.send_order, self.angles.peek().tolist()))
         
     def reset_joint_angle(self):
-        with self._lock:
-            self.set_all_angle(self.DEFAULT_JOINT_ANGLE)
+        self.set_all_angle(self.DEFAULT_JOINT_ANGLE)
         
     def start(self):
         self._stop.clear()
@@ -118,25 +180,22 @@ class servo:
 
     def _run(self):
         self._open_serial()
-        period = 1.0 / float(self.control_frequency) if self.control_frequency and self.control_frequency > 0 else 1.0/150.0
-        next_time = time.time()
-        
-        while not self._stop.is_set():
-            angles_snapshot = None
-            try:
-                angles_snapshot = self._q.get_nowait()
-            except queue.Empty:
-                angles_snapshot = None
-
-            if angles_snapshot is None:
-                angles_snapshot = self.read_joint_angle()
-
-            if self.send_order:
-                angles_list = [angles_snapshot.get(name, 90.0) for name in self.send_order]
-            else:
-                angles_list = [angles_snapshot[k] for k in angles_snapshot]
+        self.scheduler.start()
 
-            frame = self._build_frame(self._seq, angles_list)
+        while not self._stop.is_set():
+            source = self._source
+            if source is not None:
+                latest = source.read_latest()
+                if latest is not None:
+                    self.write_angles(latest[2], timestamp=latest[1])
+
+            generation, timestamp, _ = self.angles.snapshot(self._setpoint)
+            if generation != self._setpoint_generation:
+                self.interpolator.push(timestamp, self._setpoint)
+                self._setpoint_generation = generation
+            self.interpolator.sample(time.monotonic(), self._send_angles)
+
+            frame = self._build_frame(self._seq, self._send_angles)
             self._seq = (self._seq + 1) & 0xFFFF
 
             if self._ser:
@@ -153,12 +212,7 @@ class servo:
             if self._ser is None:
                 self._open_serial()
 
-            next_time += period
-            sleep_t = next_time - time.time()
-            if sleep_t > 0:
-                time.sleep(sleep_t)
-            else:
-                next_time = time.time()
+            self.scheduler.wait()
 
     def _open_serial(self):
         try:
@@ -168,43 +222,21 @@ class servo:
             self._ser = None
             print("serial open failed:", e)   
     
-    def _crc16_ibm(self, data: bytes) -> int:
-        """CRC16-IBM (Modbus) poly=0xA001, init=0xFFFF"""
-        crc = 0xFFFF
-        for ch in data:
-            crc ^= ch
-            for _ in range(8):
-                if (crc & 0x0001) != 0:
-                    crc = (crc >> 1) ^ 0xA001
-                else:
-                    crc >>= 1
-        return crc & 0xFFFF
-
-    def _deg_to_u16_d10(self, deg: float) -> int:
-        """angle(°) -> uint16(0.1°), limit to 0..180°"""
-        if deg < 0.0: deg = 0.0
-        if deg > 180.0: deg = 180.0
-        return int(round(deg * 10.0)) & 0xFFFF
-
     def _build_frame(self, _seq: int, angles_deg_18):
         """
         seq: increase 1 when it is called. (check for frame drops)
         angles_deg_18: angles of all servos (°, float)
         return the entile frame in bytes
         """
-        #  CMD, SEQ, angles
-        payload = bytearray()
-        payload.append(self.CMD_SET18)                       # CMD
-        payload += struct.pack("<H", _seq & 0xFFFF)      # SEQ
-        for a in angles_deg_18:
-            payload += struct.pack("<H", self._deg_to_u16_d10(a))
-
+        # angles(°) -> uint16(0.1°), limited to 0..180°, for all 18 at once (list or np.ndarray)
+        d10 = self._angles_d10
+        np.clip(angles_deg_18, 0.0, 180.0, out=d10)
+        d10 *= 10.0
+        np.rint(d10, out=d10)
+
+        frame = self._frame
+        self._PAYLOAD.pack_into(frame, 3, self.CMD_SET18, _seq & 0xFFFF, *d10.astype(np.uint16).tolist())
         # CRC of CMD..angles
-        crc = self._crc16_ibm(payload)
-        payload += struct.pack("<H", crc)
-
-        # head + LEN + payload
-        frame = bytearray([self.START1, self.START2, self.LEN_FIXED])  # AA 55 LEN
-        frame += payload                                # CMD..CRC
+        self._CRC.pack_into(frame, 3 + self.LEN_FIXED - 2, crc16_ibm(memoryview(frame)[3:3 + self.LEN_FIXED - 2]))
         return bytes(frame)
 
@@ -1,8 +1,10 @@
 import sys
-import time
 import threading
 from pathlib import Path
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
 
 FILE = Path(__file__).resolve()
 ROOT = FILE.parents[3]
@@ -10,20 +12,35 @@ if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
 from Src.Gait_control.Robot.robot_geometry_model import Spider_robot
-from Src.Gait_control.Tripod_gait.tripod_gait import TripodGait
+from Src.Gait_control.Tripod_gait import cpg
+from Src.Gait_control.Tripod_gait.tripod_gait import CPGGait, TripodGait
+from Src.Gait_control.Gait_controller.gait_table import GaitTable
 from Src.DDS.publisher import Publisher
+from Src.Timing import probes as latency
+from Src.Timing.scheduler import PeriodicScheduler
+
+TWO_PI = 2.0 * np.pi
+
+# stages of one step() timed by the latency probes
+STAGES = ("gait_sample", "bezier", "ik", "dict", "publish")
+GAIT_SAMPLE, BEZIER, IK, DICT, PUBLISH = range(len(STAGES))
 
 
 class GaitController:
-    """Runs a tripod gait and publishes servo outputs."""
+    """Runs a CPG gait (tripod by default) and publishes servo outputs."""
 
     def __init__(
         self,
-        gait: Optional[TripodGait] = None,
+        gait: Optional[CPGGait] = None,
         robot: Optional[Spider_robot] = None,
         control_hz: float = 50.0,
         pub_bind: Optional[str] = "tcp://*:5556",
         publisher_warmup: float = 0.2,
+        gait_table: Optional[GaitTable] = None,
+        ik_refresh_interval: int = 1,
+        diagnostics_interval: float = 1.0,
+        latency_probes: bool = False,
+        servo_sink=None,
     ) -> None:
         self.robot = robot if robot is not None else Spider_robot()
         self.gait = gait if gait is not None else TripodGait()
@@ -31,13 +48,41 @@ class GaitController:
         self.control_dt = 1.0 / self.control_hz
         self.pub_bind = pub_bind
         self.publisher_warmup = max(0.0, float(publisher_warmup))
+        # full closed-form IK every ik_refresh_interval ticks, Jacobian (incremental) updates in between
+        self.ik_refresh_interval = max(1, int(ik_refresh_interval))
+        self._ik_tick = 0
+        # IK status counters of the robot are published on "robot.diagnostics" every diagnostics_interval seconds
+        self.diagnostics_interval = float(diagnostics_interval)
+        self._last_diagnostics_time: Optional[float] = None
 
+        # per-stage step() timing, summary via self.probes.summary(); a no-op object when disabled
+        self.probes = latency.DISABLED
+        if latency_probes:
+            self.enable_probes()
+        # control loop timing, jitter / overrun statistics via self.scheduler.stats()
+        self.scheduler = PeriodicScheduler(self.control_dt, name="GaitController")
+        # in-process servo driver (servo_control.servo or anything with send_order and write_angles()):
+        # every step writes the servo outputs straight into its buffer, ZeroMQ stays an optional side channel
+        self.servo_sink = None
+        if servo_sink is not None:
+            self.attach_servo_sink(servo_sink)
         self._stop_event = threading.Event()
         self._loop_thread: Optional[threading.Thread] = None
         self._publisher: Optional[Publisher] = None
         self._positions = {}
+        self._leg_rows_cache: Dict[tuple, np.ndarray] = {}
         self._phases = []
 
+        # table playback mode: only the phase advances, servo outputs come from a compiled GaitTable.
+        # the phase is a uint32 fixed-point accumulator that indexes the table rows directly
+        self.gait_table = gait_table
+        if gait_table is not None and gait_table.leg_names != self.robot.leg_names:
+            raise ValueError(f"gait table legs {gait_table.leg_names} do not match the robot legs {self.robot.leg_names}")
+        self._table_pose_warned = None  # body pose last warned about, the table ignores body poses
+        self._table_phase = int(self.gait.phase_fixed()[0])
+        self._table_residual = 0.0      # sub-LSB part of the phase increments, carried to the next tick
+        self._table_last_time: Optional[float] = None
+
     def start(self) -> None:
         if self._loop_thread and self._loop_thread.is_alive():
             return
@@ -53,14 +98,127 @@ class GaitController:
         self._loop_thread = None
         self._close_publisher()
 
-    def step(self, time_s: float, publish: bool = True) -> Dict[str, float]:
-        self._positions = self.gait.sample(time_s)
-        self._phases = self.gait.phases()
-        self._apply_positions(self._positions)
-        servo_outputs = self.robot.read_servo_outputs() or {}
+    def attach_servo_sink(self, sink) -> None:
+        names = self.robot.state.servo_names
+        missing = [name for name in sink.send_order if name not in names]
+        if missing:
+            raise ValueError(f"servo sink expects joints the robot does not have: {missing}")
+        # robot servo order -> sink send order, compiled once
+        self._sink_index = np.array([names.index(name) for name in sink.send_order], dtype=np.intp)
+        self._sink_buffer = np.empty(len(self._sink_index))
+        self.servo_sink = sink
+
+    def detach_servo_sink(self) -> None:
+        self.servo_sink = None
+
+    def _write_sink(self, servo_outputs: np.ndarray) -> None:
+        sink = self.servo_sink
+        if sink is None:
+            return
+        np.take(servo_outputs, self._sink_index, out=self._sink_buffer)
+        sink.write_angles(self._sink_buffer)
+
+    def enable_probes(self, capacity: Optional[int] = None) -> None:
+        self.probes = latency.LatencyProbes(STAGES) if capacity is None else latency.LatencyProbes(STAGES, capacity)
+
+    def disable_probes(self) -> None:
+        self.probes = latency.DISABLED
+
+    def step(self, time_s: float, publish: bool = True) -> Mapping[str, float]:
+        """Advance to time_s and return the servo outputs of this tick as a read-only mapping, dict() it to modify."""
+        if self.gait_table is not None:
+            return self._step_table(time_s, publish)
+        probes = self.probes
+        probes.begin()
+        phases = self.gait.advance(time_s)
+        probes.lap(GAIT_SAMPLE)
+        ends = self.gait.positions_at(phases)
+        probes.lap(BEZIER)
+        self._apply_ends(self.gait.leg_names, ends)
+        servo = self.robot.read_all_servo_outputs_array().ravel()
+        self._write_sink(servo)
+        probes.lap(IK)
+        self._phases = phases.tolist()
+        if publish:
+            # the one name-keyed dict of this tick, built from the array and serialized by the publisher as is
+            servo_outputs = dict(zip(self.robot.state.servo_names, servo.tolist()))
+            self._positions = dict(zip(self.gait.leg_names, ends.tolist()))
+        probes.lap(DICT)
+        if publish:
+            self._publish(time_s, servo_outputs)
+            self._publish_diagnostics(time_s)
+            probes.lap(PUBLISH)
+        probes.end()
+        return self._servo_output_view(servo_outputs if publish else None)
+
+    def _servo_output_view(self, servo_outputs: Optional[Dict[str, float]]) -> Mapping[str, float]:
+        # step() hands out a read-only mapping either way: a view of the dict just published,
+        # or the robot's cached one when nothing was built this tick
+        if servo_outputs is None:
+            return self.robot.read_servo_outputs()
+        return MappingProxyType(servo_outputs)
+
+    def step_arrays(self, time_s: float):
+        """Advance to time_s without publishing and return the result as arrays (headless / simulation use).
+
+        return: (servo outputs (18,) in robot.state.servo_names order,
+                 end coordinates (6, 3) in robot.leg_names order,
+                 oscillator phases (n,))
+        """
+        if self.gait_table is not None:
+            servo, positions = self._sample_table(time_s)
+            return servo, positions, self._table_phase / cpg.PHASE_SCALE + self.gait_table.phase_offsets
+        self._apply_ends(self.gait.leg_names, self.gait.sample_array(time_s))
+        _, _, servo_outputs, ends = self.robot.state.snapshot()
+        return servo_outputs.ravel(), ends, np.asarray(self.gait.phases())
+
+    def _advance_table_phase(self, time_s: float) -> None:
+        time_s = float(time_s)
+        if self._table_last_time is not None:
+            dt = max(0.0, time_s - self._table_last_time)
+            ticks = self.gait_table.omega * dt * cpg.PHASE_RANGE + self._table_residual
+            whole = round(ticks)
+            self._table_residual = ticks - whole
+            self._table_phase = (self._table_phase + whole) & cpg.PHASE_MASK
+        self._table_last_time = time_s
+
+    def _sample_table(self, time_s: float):
+        # table rows replace the Bezier and IK stages; the sampled row still goes to robot.state and
+        # robot.diagnostics, so the robot readers and IK counters stay current while a table plays
+        table = self.gait_table
+        self._advance_table_phase(time_s)
+        phase = self._table_phase
+        servo = table.sample_fixed(phase)
+        positions = table.sample_positions_fixed(phase)
+        joints = table.sample_joints_fixed(phase)
+        state = self.robot.state
+        n_legs = len(table.leg_names)
+        state.write(slice(None), positions, state.joints if joints is None else joints.reshape(n_legs, 3),
+                    servo.reshape(n_legs, 3))
+        self.robot.diagnostics.record(table.status_fixed(phase))
+        if not self.robot.body.is_neutral and self._table_pose_warned != self.robot.body.pose:
+            self._table_pose_warned = self.robot.body.pose
+            print(f"[GaitController] body pose {self.robot.body.pose} is ignored while a gait table plays")
+        return servo, positions
+
+    def _step_table(self, time_s: float, publish: bool) -> Mapping[str, float]:
+        table = self.gait_table
+        probes = self.probes
+        probes.begin()
+        servo, positions = self._sample_table(time_s)
+        self._write_sink(servo)
+        probes.lap(GAIT_SAMPLE)
+        if publish:
+            servo_outputs = dict(zip(table.joint_names, servo.tolist()))
+            self._positions = dict(zip(table.leg_names, positions.tolist()))
+            self._phases = (self._table_phase / cpg.PHASE_SCALE + table.phase_offsets).tolist()
+        probes.lap(DICT)
         if publish:
             self._publish(time_s, servo_outputs)
-        return servo_outputs
+            self._publish_diagnostics(time_s)
+            probes.lap(PUBLISH)
+        probes.end()
+        return self._servo_output_view(servo_outputs if publish else None)
 
     def close(self) -> None:
         self.stop()
@@ -94,31 +252,55 @@ class GaitController:
             self._publisher = None
 
     def _run_loop(self) -> None:
-        base_time = time.perf_counter()
-        next_tick = base_time
-        while not self._stop_event.is_set():
-            now = time.perf_counter()
-            if now < next_tick:
-                time.sleep(max(0.0, next_tick - now))
-                continue
-            control_time = now - base_time
-            try:
-                self.step(control_time, publish=True)
-            except Exception as exc:
-                print(f"[GaitController] control loop error: {exc}")
-            next_tick += self.control_dt
-            if next_tick < now:
-                next_tick = now + self.control_dt
-
-    def _apply_positions(self, positions: Dict[str, List[float]]) -> None:
-        for leg_name, target in positions.items():
-            leg = self.robot.legs.get(leg_name)
-            if leg is None:
-                continue
-            try:
-                leg.write_end_coordinate(list(target))
-            except Exception as exc:
-                print(f"[GaitController] failed to update {leg_name}: {exc}")
+        self.scheduler.run(self._tick, self._stop_event)
+
+    def _tick(self, control_time: float) -> None:
+        try:
+            self.step(control_time, publish=True)
+        except Exception as exc:
+            print(f"[GaitController] control loop error: {exc}")
+
+    def _apply_ends(self, leg_names: List[str], targets: np.ndarray) -> None:
+        # one batched IK pass for all legs, legs without a target keep their current end coordinate.
+        # gait targets are for the neutral body pose, the current body pose is applied on top
+        try:
+            ends = self.robot.read_all_ends_array()
+            rows = self._leg_rows(leg_names)
+            ends[rows] = targets
+            given = np.zeros(len(self.robot.leg_names), dtype=bool)
+            given[rows] = True
+            if not self.robot.body.is_neutral:
+                ends[given] = self.robot.apply_body_pose(ends)[given]
+            if self._ik_tick % self.ik_refresh_interval == 0:
+                self.robot.write_all_ends_array(ends)
+            else:
+                self.robot.write_all_ends_array_incremental(ends)
+            self._ik_tick += 1
+        except Exception as exc:
+            print(f"[GaitController] failed to update legs: {exc}")
+
+    def _leg_rows(self, leg_names: List[str]) -> np.ndarray:
+        # robot rows of the given legs, cached for the (fixed) gait leg order
+        key = tuple(leg_names)
+        rows = self._leg_rows_cache.get(key)
+        if rows is None:
+            rows = np.array([self.robot.leg_names.index(name) for name in leg_names], dtype=np.intp)
+            self._leg_rows_cache[key] = rows
+        return rows
+
+    def _publish_diagnostics(self, time_s: float) -> None:
+        if self._publisher is None or self.diagnostics_interval <= 0:
+            return
+        if self._last_diagnostics_time is not None and time_s - self._last_diagnostics_time < self.diagnostics_interval:
+            return
+        self._last_diagnostics_time = time_s
+        payload = {"diagnostics": self.robot.diagnostics.summary(), "timing": self.scheduler.stats(), "time": time_s}
+        if self.probes.enabled:
+            payload["latency"] = self.probes.summary()
+        try:
+            self._publisher.publish_once(payload, topic="robot.diagnostics")
+        except Exception as exc:
+            print(f"[GaitController] diagnostics publish failed: {exc}")
 
     def _publish(self, time_s: float, servo_outputs: Dict[str, float]) -> None:
         if self._publisher is None:
@@ -0,0 +1,217 @@
+"""Offline gait compiler and phase-indexed servo table playback.
+
+`compile_gait` runs Bezier + IK + servo conversion of a `CPGGait` over one
+full steady-state phase cycle and stores the result as an (N, 18) servo table,
+together with the joint angles and IK status codes of every row, so playback
+can keep the robot state and diagnostics current.
+`GaitTable.sample` then only interpolates two rows, so steady walking costs
+almost nothing at runtime.
+
+Steady state means the oscillators are phase-locked: every oscillator keeps
+the offset it had at reset (for the tripod preset: 0 and pi) and advances at
+2*pi*omega rad/s.
+"""
+
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import argparse
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from Src.Gait_control.Robot import batch_kinematics as bk
+from Src.Gait_control.Robot.robot_geometry_model import Spider_robot
+from Src.Gait_control.Tripod_gait import config as gait_cfg
+from Src.Gait_control.Tripod_gait import cpg
+from Src.Gait_control.Tripod_gait.tripod_gait import CPGGait, TripodGait
+
+TWO_PI = 2.0 * np.pi
+JOINT_NAMES = ("coxa", "femur", "tibia")
+
+
+class GaitTable:
+    """Phase-indexed servo table of one gait cycle."""
+
+    def __init__(
+        self,
+        servo: np.ndarray,
+        positions: np.ndarray,
+        valid: np.ndarray,
+        leg_names: List[str],
+        phase_offsets: np.ndarray,
+        omega: float,
+        joints: Optional[np.ndarray] = None,
+        status: Optional[np.ndarray] = None,
+    ) -> None:
+        self.servo = np.asarray(servo, dtype=np.float32)            # (N, 18), rows in leg_names x JOINT_NAMES order
+        self.positions = np.asarray(positions, dtype=np.float32)    # (N, 6, 3) foot targets
+        self.valid = np.asarray(valid, dtype=bool)                  # (N,) all legs solved within limits
+        # (N, 18) joint angles, same layout as servo; None for tables compiled before they were stored
+        self.joints = None if joints is None else np.asarray(joints, dtype=np.float32)
+        # (N, 6) IK status codes (batch_kinematics.IK_*) per leg; older tables only have valid per row,
+        # so every leg of an invalid row counts as unreachable
+        if status is None:
+            status = np.where(self.valid[:, None], bk.IK_OK, bk.IK_UNREACHABLE) * np.ones(len(leg_names), dtype=np.int8)
+        self.status = np.asarray(status, dtype=np.int8)
+        self.leg_names = list(leg_names)
+        self.joint_names = [f"{leg}_{joint}" for leg in self.leg_names for joint in JOINT_NAMES]
+        self.phase_offsets = np.asarray(phase_offsets, dtype=float)  # oscillator phases relative to oscillator 0
+        self.omega = float(omega)                                   # Hz
+        self.rows = self.servo.shape[0]
+        # one extra row so row i + 1 never needs a wrap-around check
+        self._servo_wrapped = np.concatenate((self.servo, self.servo[:1]), axis=0)
+        self._positions_wrapped = np.concatenate((self.positions, self.positions[:1]), axis=0)
+        self._joints_wrapped = None if self.joints is None else np.concatenate((self.joints, self.joints[:1]), axis=0)
+
+    def _row(self, phase: float) -> Tuple[int, float]:
+        index = (phase % TWO_PI) * (self.rows / TWO_PI)
+        row = int(index)
+        if row >= self.rows:        # phase rounding just below 2*pi
+            row = self.rows - 1
+        return row, index - row
+
+    def _row_fixed(self, phase_fixed: int) -> Tuple[int, float]:
+        # uint32 fixed-point phase (2^32 == 2*pi): integer multiply and shift, no modulo
+        scaled = int(phase_fixed) * self.rows
+        return scaled >> cpg.PHASE_BITS, (scaled & cpg.PHASE_MASK) * (1.0 / cpg.PHASE_RANGE)
+
+    def sample_fixed(self, phase_fixed: int) -> np.ndarray:
+        """uint32 fixed-point phase of oscillator 0 -> (18,) servo outputs"""
+        row, frac = self._row_fixed(phase_fixed)
+        a = self._servo_wrapped[row]
+        return a + (self._servo_wrapped[row + 1] - a) * frac
+
+    def sample_positions_fixed(self, phase_fixed: int) -> np.ndarray:
+        """uint32 fixed-point phase of oscillator 0 -> (6, 3) foot targets"""
+        row, frac = self._row_fixed(phase_fixed)
+        a = self._positions_wrapped[row]
+        return a + (self._positions_wrapped[row + 1] - a) * frac
+
+    def sample_joints_fixed(self, phase_fixed: int) -> Optional[np.ndarray]:
+        """uint32 fixed-point phase of oscillator 0 -> (18,) joint angles, None if the table has none"""
+        if self._joints_wrapped is None:
+            return None
+        row, frac = self._row_fixed(phase_fixed)
+        a = self._joints_wrapped[row]
+        return a + (self._joints_wrapped[row + 1] - a) * frac
+
+    def status_fixed(self, phase_fixed: int) -> np.ndarray:
+        """uint32 fixed-point phase of oscillator 0 -> (6,) IK status codes of the row at or below it"""
+        return self.status[self._row_fixed(phase_fixed)[0]]
+
+    def sample(self, phase: float) -> np.ndarray:
+        """phase of oscillator 0 (rad) -> (18,) servo outputs, linear interpolation between rows"""
+        row, frac = self._row(phase)
+        a = self._servo_wrapped[row]
+        return a + (self._servo_wrapped[row + 1] - a) * frac
+
+    def sample_positions(self, phase: float) -> np.ndarray:
+        """phase of oscillator 0 (rad) -> (6, 3) foot targets"""
+        row, frac = self._row(phase)
+        a = self._positions_wrapped[row]
+        return a + (self._positions_wrapped[row + 1] - a) * frac
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            servo=self.servo,
+            positions=self.positions,
+            valid=self.valid,
+            leg_names=np.array(self.leg_names),
+            phase_offsets=self.phase_offsets,
+            omega=np.array(self.omega),
+            status=self.status,
+            **({} if self.joints is None else {"joints": self.joints}),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "GaitTable":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                servo=data["servo"],
+                positions=data["positions"],
+                valid=data["valid"],
+                leg_names=[str(name) for name in data["leg_names"]],
+                phase_offsets=data["phase_offsets"],
+                omega=float(data["omega"]),
+                joints=data["joints"] if "joints" in data.files else None,
+                status=data["status"] if "status" in data.files else None,
+            )
+
+
+def compile_gait(
+    gait: Optional[CPGGait] = None,
+    robot: Optional[Spider_robot] = None,
+    rows: int = 1024,
+    omega: Optional[float] = None,
+) -> GaitTable:
+    """Evaluate one steady-state cycle of `gait` at `rows` evenly spaced phases.
+
+    `omega` (Hz) defaults to the frequency of the gait's CPG network, which must
+    be the same for every oscillator for the cycle to be periodic.
+    """
+    gait = gait if gait is not None else TripodGait()
+    robot = robot if robot is not None else Spider_robot()
+    if rows < 2:
+        raise ValueError("gait table needs at least two rows")
+    if omega is None:
+        if np.ptp(gait.network.omega) > 0.0:
+            raise ValueError("gait table needs one common oscillator frequency")
+        omega = float(gait.network.omega[0])
+
+    initial = np.asarray(gait.phases(), dtype=float)
+    phase_offsets = initial - initial[0]
+
+    servo = np.empty((rows, 3 * len(robot.leg_names)))
+    joints = np.empty_like(servo)
+    status = np.empty((rows, len(robot.leg_names)), dtype=np.int8)
+    positions = np.empty((rows, len(robot.leg_names), 3))
+    valid = np.empty(rows, dtype=bool)
+    # like the runtime path, a leg without a valid solution holds its previous output
+    previous = robot.read_all_servo_outputs_array()
+    previous_joints = robot.read_all_joints_array()
+    # foot targets of every row in one vectorized Bezier evaluation, reordered to the robot legs
+    phases = (np.arange(rows) * (TWO_PI / rows))[:, None] + phase_offsets
+    all_ends = np.broadcast_to(robot.read_all_ends_array(), (rows, len(robot.leg_names), 3)).copy()
+    all_ends[:, [robot.leg_names.index(name) for name in gait.leg_names]] = gait.positions_at(phases)
+    for i, ends in enumerate(all_ends):
+        row_joints, servo_outputs, row_status = robot.solve_all_ends_status(ends)
+        leg_valid = row_status <= bk.IK_NEAR_LIMIT
+        servo_outputs[~leg_valid] = previous[~leg_valid]
+        row_joints[~leg_valid] = previous_joints[~leg_valid]
+        previous, previous_joints = servo_outputs, row_joints
+        servo[i] = servo_outputs.ravel()
+        joints[i] = row_joints.ravel()
+        status[i] = row_status
+        positions[i] = ends
+        valid[i] = bool(leg_valid.all())
+
+    if not valid.all():
+        print(f"[gait_table] {int((~valid).sum())}/{rows} rows have legs without a valid solution")
+    return GaitTable(servo, positions, valid, robot.leg_names, phase_offsets, omega, joints=joints, status=status)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile a gait cycle into a servo table")
+    parser.add_argument("output", help="output file (.npz)")
+    parser.add_argument("--gait", choices=sorted(gait_cfg.CPG_PRESETS), default="tripod", help="CPG gait preset")
+    parser.add_argument("--config", choices=("forward", "sidle"), default="forward", help="leg trajectory config")
+    parser.add_argument("--rows", type=int, default=1024, help="table rows per cycle")
+    parser.add_argument("--z-lift", type=float, default=gait_cfg.Z_LIFT)
+    parser.add_argument("--z-down", type=float, default=gait_cfg.Z_DOWN)
+    args = parser.parse_args()
+
+    leg_config = gait_cfg.LEG_CONFIG_Forward if args.config == "forward" else gait_cfg.LEG_CONFIG_Sidle
+    table = compile_gait(CPGGait(args.gait, leg_config=leg_config, z_lift=args.z_lift, z_down=args.z_down), rows=args.rows)
+    table.save(args.output)
+    print(f"Wrote {table.rows} rows x {table.servo.shape[1]} servos to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Parallel gait parameter sweep.
+
+Every combination of the given Y_STEP, X_STEP, Z_LIFT, Z_DOWN, initial_pos and
+CPG omega / K values is run headless (TripodGait + Spider_robot through
+`simulation.simulate`) for whole gait cycles in a process pool. The report
+lists, per combination, servo limit violations, IK failures, the minimum
+distance of any servo output to its limit and the peak joint angular velocity.
+
+    python Src/Gait_control/Gait_controller/parameter_sweep.py --y-step 15 20 25 --z-lift 20 25 30 --csv sweep.csv
+"""
+import os
+import sys
+import csv
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from Src.Gait_control.Gait_controller.gait_controller import GaitController
+from Src.Gait_control.Gait_controller.simulation import simulate
+from Src.Gait_control.Robot import batch_kinematics as bk
+from Src.Gait_control.Robot.robot_geometry_model import Spider_robot
+from Src.Gait_control.Tripod_gait import config as gait_cfg
+from Src.Gait_control.Tripod_gait import cpg
+from Src.Gait_control.Tripod_gait.tripod_gait import TripodGait
+
+PARAMETERS = ("y_step", "x_step", "z_lift", "z_down", "initial_pos", "omega", "K")
+METRICS = ("limit_violations", "ik_failures", "min_servo_margin", "peak_joint_velocity")
+
+
+def combinations(**ranges: Sequence) -> List[Dict[str, object]]:
+    """Cartesian product of the value lists in PARAMETERS order, as one dict per combination."""
+    return [dict(zip(PARAMETERS, values)) for values in itertools.product(*(ranges[name] for name in PARAMETERS))]
+
+
+def evaluate(params: Dict[str, object], configs: Sequence[str] = ("forward", "sidle"),
+             cycles: float = 1.0, control_hz: float = 50.0) -> Dict[str, object]:
+    """Run one combination for `cycles` gait cycles of every leg config, worst case over the configs.
+
+    return: params plus METRICS (counts are leg-ticks, margin in degree, velocity in degree/s)
+    """
+    result = dict(params, limit_violations=0, ik_failures=0, min_servo_margin=np.inf, peak_joint_velocity=0.0)
+    for config in configs:
+        if config == "forward":
+            leg_config = gait_cfg.leg_config_forward(params["y_step"], params["initial_pos"])
+        else:
+            leg_config = gait_cfg.leg_config_sidle(params["x_step"], params["initial_pos"])
+        gait = TripodGait(leg_config=leg_config, z_lift=params["z_lift"], z_down=params["z_down"],
+                          omega=params["omega"], K=params["K"])
+        # a fresh robot per run, so a held output after an IK failure never comes from another combination
+        robot = Spider_robot()
+        limitations = [robot.legs[name].read_servo_output_limitation() for name in robot.leg_names]
+        min_output = np.array([[lim["min_coxa"], lim["min_femur"], lim["min_tibia"]] for lim in limitations]).ravel()
+        max_output = np.array([[lim["max_coxa"], lim["max_femur"], lim["max_tibia"]] for lim in limitations]).ravel()
+        controller = GaitController(gait=gait, robot=robot, control_hz=control_hz, pub_bind=None)
+        run = simulate(controller, cycles / params["omega"])
+
+        # only ticks where the leg was solved, a held output says nothing about the motion
+        solved = np.repeat(run.status <= bk.IK_NEAR_LIMIT, 3, axis=1)
+        margin = np.where(solved, np.minimum(run.servo - min_output, max_output - run.servo), np.inf)
+        velocity = np.where(solved[1:] & solved[:-1], np.abs(np.diff(run.joints, axis=0)) * control_hz, 0.0)
+        result["limit_violations"] += int((run.status == bk.IK_LIMIT_EXCEEDED).sum())
+        result["ik_failures"] += int((run.status == bk.IK_UNREACHABLE).sum())
+        result["min_servo_margin"] = min(result["min_servo_margin"], float(margin.min()))
+        result["peak_joint_velocity"] = max(result["peak_joint_velocity"], float(velocity.max()) if velocity.size else 0.0)
+    return result
+
+
+def sweep(combos: List[Dict[str, object]], configs: Sequence[str] = ("forward", "sidle"),
+          cycles: float = 1.0, control_hz: float = 50.0, workers: Optional[int] = None) -> List[Dict[str, object]]:
+    """evaluate() every combination in a process pool, results in combination order"""
+    n = len(combos)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(evaluate, combos, [tuple(configs)] * n, [cycles] * n, [control_hz] * n,
+                             chunksize=max(1, n // (4 * workers))))
+
+
+def _position(text: str) -> List[float]:
+    values = [float(v) for v in text.split(",")]
+    if len(values) != 3:
+        raise argparse.ArgumentTypeError(f"expected x,y,z, got {text!r}")
+    return values
+
+
+def _format(value) -> str:
+    if isinstance(value, list):
+        return ",".join(f"{v:g}" for v in value)
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sweep gait parameters over a process pool")
+    parser.add_argument("--y-step", type=float, nargs="+", default=[float(gait_cfg.Y_STEP)], help="Y_STEP values (forward stroke)")
+    parser.add_argument("--x-step", type=float, nargs="+", default=[float(gait_cfg.X_STEP)], help="X_STEP values (sidle stroke)")
+    parser.add_argument("--z-lift", type=float, nargs="+", default=[float(gait_cfg.Z_LIFT)], help="Z_LIFT values")
+    parser.add_argument("--z-down", type=float, nargs="+", default=[float(gait_cfg.Z_DOWN)], help="Z_DOWN values")
+    parser.add_argument("--initial-pos", type=_position, nargs="+", default=[[float(v) for v in gait_cfg.initial_pos]],
+                        help="neutral foot positions as x,y,z")
+    parser.add_argument("--omega", type=float, nargs="+", default=[cpg.omega], help="CPG frequency values (Hz)")
+    parser.add_argument("--K", type=float, nargs="+", default=[cpg.K], help="CPG coupling values")
+    parser.add_argument("--config", choices=("forward", "sidle", "both"), default="both", help="leg trajectory config")
+    parser.add_argument("--cycles", type=float, default=1.0, help="gait cycles per run")
+    parser.add_argument("--hz", type=float, default=50.0, help="control rate")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--csv", help="also write the report to this file")
+    args = parser.parse_args()
+
+    combos = combinations(y_step=args.y_step, x_step=args.x_step, z_lift=args.z_lift, z_down=args.z_down,
+                          initial_pos=args.initial_pos, omega=args.omega, K=args.K)
+    configs = ("forward", "sidle") if args.config == "both" else (args.config,)
+    print(f"Sweeping {len(combos)} combinations x {len(configs)} configs")
+    results = sweep(combos, configs, args.cycles, args.hz, args.workers)
+
+    # feasible combinations first, the largest servo margin on top
+    results.sort(key=lambda r: (r["limit_violations"] + r["ik_failures"], -r["min_servo_margin"]))
+    columns = PARAMETERS + METRICS
+    rows = [[_format(r[name]) for name in columns] for r in results]
+    widths = [max(len(name), *(len(row[i]) for row in rows)) for i, name in enumerate(columns)]
+    print("  ".join(name.rjust(w) for name, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(value.rjust(w) for value, w in zip(row, widths)))
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        print(f"Wrote {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
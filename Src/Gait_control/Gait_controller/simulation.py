@@ -0,0 +1,180 @@
+"""Headless, faster-than-real-time gait simulation.
+
+`simulate()` drives `GaitController.step_arrays` from a `VirtualClock` instead of
+the wall clock: every tick advances simulated time by exactly one control period
+and the next tick starts as soon as the previous one is done. Servo outputs,
+joint angles, foot positions, oscillator phases and IK status codes are recorded to arrays,
+so hours of walking can be replayed and compared in seconds.
+
+    python Src/Gait_control/Gait_controller/simulation.py --duration 3600 --output walk.npz
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from Src.Gait_control.Gait_controller.gait_controller import GaitController
+from Src.Gait_control.Gait_controller.gait_table import GaitTable
+from Src.Gait_control.Tripod_gait import config as gait_cfg
+from Src.Gait_control.Tripod_gait.tripod_gait import CPGGait
+
+
+class VirtualClock:
+    """Simulated time in ticks of a fixed period, advanced explicitly instead of following the wall clock.
+
+    The time of tick k is start + k * dt, so it does not accumulate rounding error over long runs.
+    """
+
+    def __init__(self, dt: float, start: float = 0.0) -> None:
+        if dt <= 0.0:
+            raise ValueError("virtual clock period must be positive")
+        self.dt = float(dt)
+        self.start = float(start)
+        self.ticks = 0
+
+    def __call__(self) -> float:
+        return self.start + self.ticks * self.dt
+
+    def tick(self) -> float:
+        self.ticks += 1
+        return self()
+
+
+class SimulationResult:
+    """Arrays recorded by simulate(), one row per control tick."""
+
+    def __init__(
+        self,
+        times: np.ndarray,
+        servo: np.ndarray,
+        ends: np.ndarray,
+        phases: np.ndarray,
+        status: np.ndarray,
+        servo_names,
+        leg_names,
+        wall_time: float,
+        joints: Optional[np.ndarray] = None,
+    ) -> None:
+        self.times = times          # (N,) simulated time in s
+        self.servo = servo          # (N, 18) servo outputs in degree, columns in servo_names order
+        self.joints = joints        # (N, 18) joint angles in degree, same columns; None for older recordings
+        self.ends = ends            # (N, 6, 3) end coordinates in the leg frames, legs in leg_names order
+        self.phases = phases        # (N, n_osc) oscillator phases in rad
+        self.status = status        # (N, 6) IK status codes (batch_kinematics.IK_*), from the table rows in table mode
+        self.servo_names = list(servo_names)
+        self.leg_names = list(leg_names)
+        self.wall_time = float(wall_time)
+
+    @property
+    def ticks(self) -> int:
+        return int(self.times.shape[0])
+
+    @property
+    def simulated_time(self) -> float:
+        return float(self.times[-1] - self.times[0]) if self.ticks > 1 else 0.0
+
+    @property
+    def realtime_factor(self) -> float:
+        """simulated seconds per wall-clock second"""
+        return self.simulated_time / self.wall_time if self.wall_time > 0.0 else float("inf")
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            times=self.times,
+            servo=self.servo,
+            ends=self.ends,
+            phases=self.phases,
+            status=self.status,
+            servo_names=np.array(self.servo_names),
+            leg_names=np.array(self.leg_names),
+            wall_time=np.array(self.wall_time),
+            **({} if self.joints is None else {"joints": self.joints}),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "SimulationResult":
+        with np.load(path) as data:
+            return cls(
+                data["times"], data["servo"], data["ends"], data["phases"], data["status"],
+                [str(name) for name in data["servo_names"]],
+                [str(name) for name in data["leg_names"]],
+                float(data["wall_time"]),
+                data["joints"] if "joints" in data.files else None,
+            )
+
+
+def simulate(
+    controller: GaitController,
+    duration_s: float,
+    clock: Optional[VirtualClock] = None,
+) -> SimulationResult:
+    """Run `controller` for `duration_s` simulated seconds as fast as the CPU allows.
+
+    One tick per control period of the controller (or of `clock`, if given). Nothing
+    is published and the controller's own loop thread is not used.
+    """
+    clock = clock if clock is not None else VirtualClock(controller.control_dt)
+    robot = controller.robot
+    ticks = int(round(duration_s / clock.dt)) + 1
+
+    servo, ends, phases = controller.step_arrays(clock())
+    times = np.empty(ticks)
+    servo_log = np.empty((ticks,) + servo.shape)
+    joints_log = np.empty((ticks,) + servo.shape)
+    ends_log = np.empty((ticks,) + ends.shape)
+    phases_log = np.empty((ticks,) + phases.shape)
+    status_log = np.zeros((ticks, len(robot.leg_names)), dtype=np.int8)
+
+    start = time.perf_counter()
+    for k in range(ticks):
+        if k:
+            servo, ends, phases = controller.step_arrays(clock.tick())
+        times[k] = clock()
+        servo_log[k] = servo
+        joints_log[k] = robot.state.joints.ravel()
+        ends_log[k] = ends
+        phases_log[k] = phases
+        status_log[k] = robot.diagnostics.last_status
+    wall_time = time.perf_counter() - start
+
+    return SimulationResult(times, servo_log, ends_log, phases_log, status_log,
+                            robot.state.servo_names, robot.leg_names, wall_time, joints_log)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless faster-than-real-time gait simulation")
+    parser.add_argument("--duration", type=float, default=600.0, help="simulated time in s")
+    parser.add_argument("--hz", type=float, default=50.0, help="control rate")
+    parser.add_argument("--gait", choices=sorted(gait_cfg.CPG_PRESETS), default="tripod", help="CPG gait preset")
+    parser.add_argument("--config", choices=("forward", "sidle"), default="forward", help="leg trajectory config")
+    parser.add_argument("--table", help="play back a compiled gait table (.npz) instead of running the gait")
+    parser.add_argument("--output", help="write the recorded arrays to this file (.npz)")
+    args = parser.parse_args()
+
+    leg_config = gait_cfg.LEG_CONFIG_Forward if args.config == "forward" else gait_cfg.LEG_CONFIG_Sidle
+    controller = GaitController(
+        gait=CPGGait(args.gait, leg_config=leg_config),
+        control_hz=args.hz,
+        pub_bind=None,
+        gait_table=GaitTable.load(args.table) if args.table else None,
+    )
+    result = simulate(controller, args.duration)
+    problems = int((result.status != 0).sum())
+    print(f"Simulated {result.simulated_time:.1f} s ({result.ticks} ticks) in {result.wall_time:.2f} s: "
+          f"{result.realtime_factor:.1f} simulated s per s, {problems} leg-ticks with a non-OK IK status")
+    if args.output:
+        result.save(args.output)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
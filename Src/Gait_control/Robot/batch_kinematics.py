@@ -0,0 +1,155 @@
+"""
+Vectorized leg kinematics.
+
+Every function works on stacked inputs so that the six legs (or any number of
+sample points) are solved in a single NumPy pass. Geometry parameters may be
+scalars or arrays broadcastable against the number of points.
+
+unit: mm / degree
+"""
+import numpy as np
+
+
+ALLOWABLE_WARNING = 2.0     # degree, distance to a servo limit that counts as "close"
+
+# per-leg solve status, returned instead of raising / warning in the hot path
+IK_OK = 0
+IK_NEAR_LIMIT = 1           # solved, a servo output is within ALLOWABLE_WARNING of its limit
+IK_UNREACHABLE = 2          # no inverse kinematic solution
+IK_LIMIT_EXCEEDED = 3       # solved, but a servo output is outside its limitation (or the linkage has no solution)
+IK_STATUS_NAMES = ("ok", "near_limit", "unreachable", "limit_exceeded")
+
+
+def inverse_kinematic_batch(ends_coordinate: np.ndarray, coxa_length, femur_length, tibia_length):
+    """
+    ends_coordinate: (N, 3) foot targets in the leg frame
+    return: (joints (N, 3) [theta_1, theta_2, theta_3] in degree, reachable (N,) bool)
+    """
+    ends = np.asarray(ends_coordinate, dtype=float).reshape(-1, 3)
+    x, y, z = ends[:, 0], ends[:, 1], ends[:, 2]
+
+    r = np.hypot(x, y) - coxa_length
+    distance_2 = r * r + z * z       # squared distance from end_coordinate to Femur joint
+    reachable = (distance_2 <= (femur_length + tibia_length)**2) & (distance_2 >= (femur_length - tibia_length)**2)
+
+    joints = np.empty((ends.shape[0], 3))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        joints[:, 0] = np.arctan2(y, x)
+        beta = np.arccos((distance_2 + (femur_length**2 - tibia_length**2)) / ((2 * femur_length) * np.sqrt(distance_2)))
+        joints[:, 1] = np.pi - beta - np.arctan2(r, -z)
+        joints[:, 2] = np.arccos(((tibia_length**2 + femur_length**2) - distance_2) / (2 * tibia_length * femur_length)) - joints[:, 1]
+    np.rad2deg(joints, out=joints)
+    return joints, reachable
+
+
+def link_kinematic_batch(theta_23, link_ground_length, link_crank_length, link_coupler_length,
+                         link_rocker_length, tibia_servo_output_offset):
+    """
+    theta_23: (N,) theta_2 + theta_3 in degree
+    return: (N,) tibia servo output of a left leg in degree.
+            The right leg output is 180 - left output (theta_3r = pi - theta_3l).
+    """
+    theta_3l = np.deg2rad(theta_23)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # cos(pi - theta_3l) == -cos(theta_3l)
+        distance_2 = (link_rocker_length**2 + link_ground_length**2) + (2 * link_rocker_length * link_ground_length) * np.cos(theta_3l)
+        distance = np.sqrt(distance_2)
+        alpha = np.arccos((distance_2 + (link_ground_length**2 - link_rocker_length**2)) / ((2 * link_ground_length) * distance))
+        beta = np.arccos((distance_2 + (link_crank_length**2 - link_coupler_length**2)) / ((2 * link_crank_length) * distance))
+    return np.rad2deg(alpha + beta) + tibia_servo_output_offset
+
+
+def servo_output_convert_batch(joints: np.ndarray, is_right, tibia_servo_left: np.ndarray) -> np.ndarray:
+    """
+    joints: (N, 3) joint angles in degree
+    is_right: (N,) bool, mirror femur and tibia outputs for right legs
+    tibia_servo_left: (N,) left-side tibia servo output from link_kinematic_batch()
+    return: (N, 3) servo outputs [coxa, femur, tibia] in degree
+    """
+    servo_output = np.array(joints, dtype=float).reshape(-1, 3)
+    servo_output[:, 2] = tibia_servo_left
+    servo_output[is_right, 1:] = 180.0 - servo_output[is_right, 1:]
+    return servo_output
+
+
+def check_servo_output_limitation_batch(servo_output: np.ndarray, min_output: np.ndarray, max_output: np.ndarray,
+                                        allowable_warning: float = ALLOWABLE_WARNING):
+    """
+    servo_output, min_output, max_output: (N, 3) in degree
+    return: (within_limit (N,) bool, near_limit (N,) bool)
+    NaN outputs (no linkage solution) count as exceeding the limitation.
+    """
+    with np.errstate(invalid="ignore"):
+        within_limit = ((servo_output >= min_output) & (servo_output <= max_output)).all(axis=1)
+        comfortable = ((servo_output >= min_output + allowable_warning) & (servo_output <= max_output - allowable_warning)).all(axis=1)
+    return within_limit, within_limit & ~comfortable
+
+
+def ik_status_batch(reachable: np.ndarray, within_limit: np.ndarray, near_limit: np.ndarray) -> np.ndarray:
+    """
+    return: (N,) int8 status codes, IK_UNREACHABLE > IK_LIMIT_EXCEEDED > IK_NEAR_LIMIT > IK_OK in precedence
+    """
+    status = np.where(near_limit, IK_NEAR_LIMIT, IK_OK).astype(np.int8)
+    status[~within_limit] = IK_LIMIT_EXCEEDED
+    status[~reachable] = IK_UNREACHABLE
+    return status
+
+
+def jacobian_batch(joints: np.ndarray, coxa_length, femur_length, tibia_length) -> np.ndarray:
+    """
+    analytic Jacobian of the forward kinematic (Docs/robot geometry.md)
+        r = Femur*sin(theta_2) + Tibia*sin(theta_3), R = r + Coxa
+        x = R*cos(theta_1), y = R*sin(theta_1), z = Femur*cos(theta_2) - Tibia*cos(theta_3)
+    joints: (N, 3) joint angles in degree
+    return: (N, 3, 3) d(x, y, z) / d(theta_1, theta_2, theta_3) in mm/degree
+    """
+    q = np.deg2rad(np.asarray(joints, dtype=float).reshape(-1, 3))
+    s = np.sin(q)
+    c = np.cos(q)
+    R = coxa_length + femur_length * s[:, 1] + tibia_length * s[:, 2]
+    femur_c = femur_length * c[:, 1]
+    tibia_c = tibia_length * c[:, 2]
+
+    jacobian = np.empty((q.shape[0], 3, 3))
+    jacobian[:, 0, 0] = -R * s[:, 0]
+    jacobian[:, 1, 0] = R * c[:, 0]
+    jacobian[:, 2, 0] = 0.0
+    jacobian[:, 0, 1] = femur_c * c[:, 0]
+    jacobian[:, 1, 1] = femur_c * s[:, 0]
+    jacobian[:, 2, 1] = -femur_length * s[:, 1]
+    jacobian[:, 0, 2] = tibia_c * c[:, 0]
+    jacobian[:, 1, 2] = tibia_c * s[:, 0]
+    jacobian[:, 2, 2] = tibia_length * s[:, 2]
+    jacobian *= np.pi / 180.0
+    return jacobian
+
+
+def solve_jacobian_batch(joints: np.ndarray, delta: np.ndarray, coxa_length, femur_length, tibia_length,
+                         min_determinant: float = 1e-6):
+    """
+    delta_q = J^-1 * delta_p for every leg, using the closed-form inverse of the leg Jacobian:
+        theta_1 only moves the foot tangentially:   d_theta_1 = (-sin(theta_1)*dx + cos(theta_1)*dy) / R
+        theta_2, theta_3 act in the (R, z) plane:   [dR, dz] = [[F*cos(theta_2), T*cos(theta_3)],
+                                                                [-F*sin(theta_2), T*sin(theta_3)]] * [d_theta_2, d_theta_3]
+        whose determinant is F*T*sin(theta_2 + theta_3)
+    joints: (N, 3) in degree, delta: (N, 3) in mm (or mm/s)
+    return: (delta_q (N, 3) in degree (or degree/s), regular (N,) bool), rows at a singular configuration are NaN
+    """
+    q = np.deg2rad(np.asarray(joints, dtype=float).reshape(-1, 3))
+    delta = np.asarray(delta, dtype=float).reshape(-1, 3)
+    s = np.sin(q)
+    c = np.cos(q)
+    R = coxa_length + femur_length * s[:, 1] + tibia_length * s[:, 2]
+    determinant = femur_length * tibia_length * np.sin(q[:, 1] + q[:, 2])
+    regular = (np.abs(determinant) > min_determinant) & (np.abs(R) > min_determinant)
+
+    d_R = c[:, 0] * delta[:, 0] + s[:, 0] * delta[:, 1]
+    d_z = delta[:, 2]
+    delta_q = np.empty_like(delta)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        delta_q[:, 0] = (c[:, 0] * delta[:, 1] - s[:, 0] * delta[:, 0]) / R
+        delta_q[:, 1] = tibia_length * (s[:, 2] * d_R - c[:, 2] * d_z) / determinant
+        delta_q[:, 2] = femur_length * (s[:, 1] * d_R + c[:, 1] * d_z) / determinant
+    np.rad2deg(delta_q, out=delta_q)
+    delta_q[~regular] = np.nan
+    return delta_q, regular
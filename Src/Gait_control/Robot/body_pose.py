@@ -0,0 +1,120 @@
+'''
+Body frame <-> leg frame transforms and body pose.
+
+Body frame: origin at the centre of the top plate hexagon, x forward, y left,
+z up. Leg frames follow Docs/robot geometry.md: origin on the coxa axis in the
+top plate plane, y radially outward, z up, x = y cross z. A leg mounted at
+angle a (direction of its y axis, measured from body x towards body y) has
+
+    x_leg = ( sin a, -cos a, 0),  y_leg = (cos a, sin a, 0),  origin = BODY_HEXAGON_RADIUS * y_leg
+
+The body pose (roll, pitch, yaw, translation) moves the body relative to the
+frame the foot targets are given in, so with the feet on the ground a pose
+change shifts or tilts the body. Every per-leg transform is reduced to one
+(3, 3) matrix and an offset, so all feet are converted by one batched matmul.
+
+unit: mm / degree
+'''
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from Src.Gait_control.Robot import config as cfg
+
+
+def mount_transforms(leg_names: List[str],
+                     radius: float = cfg.BODY_HEXAGON_RADIUS,
+                     mount_angle: Dict[str, float] = cfg.LEG_MOUNT_ANGLE) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    return: (rotations (n, 3, 3) leg -> body, columns are the leg axes in the body frame,
+             origins (n, 3) leg frame origins in the body frame)
+    '''
+    angle = np.deg2rad([mount_angle[name] for name in leg_names])
+    s, c = np.sin(angle), np.cos(angle)
+    rotations = np.zeros((len(leg_names), 3, 3))
+    rotations[:, 0, 0], rotations[:, 1, 0] = s, -c      # x_leg
+    rotations[:, 0, 1], rotations[:, 1, 1] = c, s       # y_leg
+    rotations[:, 2, 2] = 1.0                            # z_leg
+    origins = radius * rotations[:, :, 1]
+    return rotations, origins
+
+
+def rotation_matrix(roll: float, pitch: float, yaw: float) -> np.ndarray:
+    '''
+    body orientation, R = Rz(yaw) * Ry(pitch) * Rx(roll), angles in degree
+    '''
+    sr, sp, sy = np.sin(np.deg2rad([roll, pitch, yaw]))
+    cr, cp, cy = np.cos(np.deg2rad([roll, pitch, yaw]))
+    return np.array([
+        [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+        [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+        [-sp, cp * sr, cp * cr],
+    ])
+
+
+class BodyPoseTransform:
+    '''
+    precomputed per-leg affine maps p' = A_i p + b_i for the current body pose
+    '''
+    def __init__(self, leg_names: List[str],
+                 radius: float = cfg.BODY_HEXAGON_RADIUS,
+                 mount_angle: Dict[str, float] = cfg.LEG_MOUNT_ANGLE):
+        self.leg_names = list(leg_names)
+        self.rotations, self.origins = mount_transforms(self.leg_names, radius, mount_angle)
+        self._rotations_t = np.ascontiguousarray(self.rotations.transpose(0, 2, 1))
+        self.set_pose()
+
+    def set_pose(self, roll: float = 0.0, pitch: float = 0.0, yaw: float = 0.0, translation: Sequence[float] = (0.0, 0.0, 0.0)):
+        '''
+        roll, pitch, yaw in degree, translation (3,) of the body in mm
+        '''
+        body_rotation_t = rotation_matrix(roll, pitch, yaw).T
+        translation = np.asarray(translation, dtype=float).reshape(3)
+        # body -> leg: p_leg = M^T (R^T (p - t) - o)
+        to_leg = self._rotations_t @ body_rotation_t
+        to_leg_offset = -(self._rotations_t @ (body_rotation_t @ translation + self.origins)[:, :, None])[:, :, 0]
+        # leg (neutral pose) -> leg (posed): p' = M^T (R^T (M p + o - t) - o)
+        posed = to_leg @ self.rotations
+        posed_offset = (to_leg @ self.origins[:, :, None])[:, :, 0] + to_leg_offset
+        # replaced as one tuple so a reader on another thread never sees half of an update
+        self._maps = (to_leg, to_leg_offset, posed, posed_offset)
+        self.pose = (float(roll), float(pitch), float(yaw), tuple(translation.tolist()))
+        self.is_neutral = not (roll or pitch or yaw or translation.any())
+
+    def body_to_leg(self, points: np.ndarray) -> np.ndarray:
+        '''
+        points: (n, 3) or (N, n, 3) foot targets in the (ground fixed) body frame, legs in leg_names order
+        return: same shape in the leg frames, body pose applied
+        '''
+        to_leg, to_leg_offset, _, _ = self._maps
+        return _apply(to_leg, to_leg_offset, points)
+
+    def leg_to_body(self, points: np.ndarray) -> np.ndarray:
+        '''
+        inverse of body_to_leg()
+        '''
+        to_leg, to_leg_offset, _, _ = self._maps
+        points = np.asarray(points, dtype=float)
+        return _apply(to_leg.transpose(0, 2, 1), -(to_leg.transpose(0, 2, 1) @ to_leg_offset[:, :, None])[:, :, 0], points)
+
+    def apply(self, points: np.ndarray) -> np.ndarray:
+        '''
+        points: (n, 3) or (N, n, 3) foot targets in the leg frames for the neutral body pose
+        return: the same ground points in the leg frames of the posed body
+        '''
+        _, _, posed, posed_offset = self._maps
+        return _apply(posed, posed_offset, points)
+
+
+def _apply(matrices: np.ndarray, offsets: np.ndarray, points: np.ndarray) -> np.ndarray:
+    # one batched matmul for all legs (and samples): p' = A_i p + b_i
+    points = np.asarray(points, dtype=float)
+    return (matrices @ points[..., None])[..., 0] + offsets
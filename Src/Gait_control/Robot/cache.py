@@ -0,0 +1,36 @@
+"""
+Disk cache helpers for precomputed geometry tables (IK grid, reachability map).
+
+Tables are keyed by a hash of everything they are computed from, written
+atomically and loaded memory-mapped.
+"""
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import hashlib
+import json
+import os
+
+
+def cache_key(description: dict) -> str:
+    return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def cache_directory(cache_dir: str) -> Path:
+    directory = Path(cache_dir)
+    if not directory.is_absolute():
+        directory = ROOT / directory
+    return directory
+
+
+def atomic_write(path: Path, write) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
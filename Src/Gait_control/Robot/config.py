@@ -25,3 +25,25 @@ MIN_FEMUR_SERVO_OUTPUT = {"left": 0.0, "right": 0.0}
 MAX_TIBIA_SERVO_OUTPUT = {"left": 180.0, "right": 180.0}         
 MIN_TIBIA_SERVO_OUTPUT = {"left": 0.0, "right": 0.0}
 
+
+# IK lookup grid (optional Leg IK backend), unit: mm
+# IK is symmetric about the coxa axis, so the grid spans the horizontal distance R = hypot(x, y) and z only
+USE_IK_LOOKUP = False
+IK_LOOKUP_BOUNDS = ((0.0, 250.0), (-250.0, 100.0))     # (min, max) of R and z in the leg frame
+IK_LOOKUP_STEP = 0.5
+IK_LOOKUP_CACHE_DIR = ".cache/ik_lookup"       # relative to the repository root
+
+# reachability / servo limit voxel map (per leg side), unit: mm
+REACHABILITY_BOUNDS = ((-250.0, 250.0), (-60.0, 250.0), (-250.0, 100.0))    # (min, max) of x, y, z in the leg frame
+REACHABILITY_STEP = 5.0
+REACHABILITY_CACHE_DIR = ".cache/reachability"
+
+# IK diagnostics: non-ok solve statuses are counted and printed at most once per interval, unit: s
+IK_DIAGNOSTICS_INTERVAL = 1.0
+
+# body frame: origin at the top plate hexagon centre, x forward, y left, z up, unit: mm / degree
+BODY_HEXAGON_RADIUS = 100.0     # hexagon centre to coxa axis, placeholder until measured on the robot
+LEG_MOUNT_ANGLE = {             # direction of each leg frame y axis, from body x towards body y
+    "L1": 30.0, "L2": 90.0, "L3": 150.0,
+    "R1": -30.0, "R2": -90.0, "R3": -150.0,
+}
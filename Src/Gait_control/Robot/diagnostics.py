@@ -0,0 +1,98 @@
+'''
+IK status counters and rate-limited diagnostics.
+
+The solve paths return one status code per leg instead of raising or warning
+on every tick. IKDiagnostics accumulates those codes into per-leg counters and
+prints at most one aggregated message per report interval; summary() can be
+queried or published periodically.
+'''
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from Src.Gait_control.Robot import config as cfg
+from Src.Gait_control.Robot.batch_kinematics import IK_STATUS_NAMES, IK_OK
+
+
+class IKDiagnostics:
+    def __init__(self, leg_names: List[str], report_interval: float = cfg.IK_DIAGNOSTICS_INTERVAL):
+        self.leg_names = list(leg_names)
+        self.index = {name: i for i, name in enumerate(self.leg_names)}
+        self.report_interval = report_interval      # s, None or <= 0 disables printing
+
+        self._lock = threading.Lock()
+        self._rows = np.arange(len(self.leg_names))
+        self.counts = np.zeros((len(self.leg_names), len(IK_STATUS_NAMES)), dtype=np.int64)    # since reset()
+        self.last_status = np.zeros(len(self.leg_names), dtype=np.int8)
+        self._pending = np.zeros_like(self.counts)      # since the last report
+        self._last_report = time.monotonic()
+
+    def record(self, status: np.ndarray):
+        '''
+        status: (n_legs,) status codes of one solve, legs in leg_names order
+        '''
+        with self._lock:
+            self.last_status[:] = status
+            self.counts[self._rows, status] += 1
+            self._pending[self._rows, status] += 1
+        if status.any():
+            self.maybe_report()
+
+    def record_leg(self, leg_name: str, status: int):
+        row = self.index[leg_name]
+        with self._lock:
+            self.last_status[row] = status
+            self.counts[row, status] += 1
+            self._pending[row, status] += 1
+        if status != IK_OK:
+            self.maybe_report()
+
+    def maybe_report(self, now: Optional[float] = None) -> Optional[str]:
+        '''
+        print the problems counted since the last report, at most once per report_interval
+        return: the printed message, None if nothing was printed
+        '''
+        if not self.report_interval or self.report_interval <= 0:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            elapsed = now - self._last_report
+            if elapsed < self.report_interval:
+                return None
+            rows, statuses = np.nonzero(self._pending)
+            problems = [f"{self.leg_names[row]} {IK_STATUS_NAMES[status]} x{int(self._pending[row, status])}"
+                        for row, status in zip(rows.tolist(), statuses.tolist()) if status != IK_OK]
+            self._pending[:] = 0
+            self._last_report = now
+        if not problems:
+            return None
+        message = f"[IKDiagnostics] last {elapsed:.1f} s: " + ", ".join(problems)
+        print(message)
+        return message
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        '''
+        return: { "L1": {"ok": ..., "near_limit": ..., "unreachable": ..., "limit_exceeded": ..., "last": "ok"}, ... }
+        '''
+        with self._lock:
+            counts = self.counts.tolist()
+            last = self.last_status.tolist()
+        return {name: {**dict(zip(IK_STATUS_NAMES, counts[i])), "last": IK_STATUS_NAMES[last[i]]}
+                for i, name in enumerate(self.leg_names)}
+
+    def reset(self):
+        with self._lock:
+            self.counts[:] = 0
+            self._pending[:] = 0
+            self.last_status[:] = IK_OK
+            self._last_report = time.monotonic()
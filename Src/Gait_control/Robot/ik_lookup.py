@@ -0,0 +1,193 @@
+"""
+Precomputed IK lookup grid.
+
+The analytic IK + linkage solution is sampled once per geometry on a regular
+grid, cached to disk and memory-mapped on later startups. Queries are answered
+by interpolation instead of the arccos/law-of-cosines solve.
+
+theta_1 is just atan2(y, x); everything else only depends on the horizontal
+distance R = hypot(x, y) and z, so the grid spans (R, z) and is interpolated
+bilinearly. This is the 3D trilinear lookup reduced by the rotational symmetry
+of the leg: far fewer samples for the same resolution and no coxa-axis
+singularity in the table.
+
+Grid channels: [theta_2, theta_3, tibia servo output (left side)].
+Right-side servo outputs are mirrored after interpolation, which is exact
+because the mirroring is linear. Cells without a solution are NaN, so a query
+touching them returns NaN and the caller falls back to the analytic solve.
+
+unit: mm / degree
+"""
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import json
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from Src.Gait_control.Robot import batch_kinematics as bk
+from Src.Gait_control.Robot import config as cfg
+from Src.Gait_control.Robot.cache import atomic_write, cache_directory, cache_key
+
+
+CHANNELS = 3
+_GRIDS: Dict[str, "IKLookupGrid"] = {}
+
+
+class IKLookupGrid:
+    """Bilinear (R, z) IK lookup, shared by all legs with the same geometry."""
+
+    def __init__(self, values: np.ndarray, lower, step: float, max_error):
+        self.values = values                                # (nR, nz, CHANNELS)
+        self.r_min, self.z_min = (float(v) for v in lower)
+        self.step = float(step)
+        self.n_r, self.n_z = values.shape[:2]
+        self.max_error = np.asarray(max_error, dtype=float)     # per channel, measured at cell centres
+
+    @classmethod
+    def build(cls, geometry: Dict[str, float], bounds=cfg.IK_LOOKUP_BOUNDS, step: float = cfg.IK_LOOKUP_STEP) -> "IKLookupGrid":
+        axes = [np.arange(lo, hi + 0.5 * step, step) for lo, hi in bounds]
+        r, z = np.meshgrid(*axes, indexing="ij")
+        values = solve_points(r.ravel(), z.ravel(), geometry).reshape(r.shape + (CHANNELS,))
+        grid = cls(values.astype(np.float32), [b[0] for b in bounds], step, np.zeros(CHANNELS))
+
+        # error estimate: compare interpolation against the exact solution at every cell centre
+        r_c, z_c = (a.ravel() for a in np.meshgrid(*[a[:-1] + 0.5 * step for a in axes], indexing="ij"))
+        with np.errstate(invalid="ignore"):
+            error = np.abs(grid.interpolate_rz(r_c, z_c) - solve_points(r_c, z_c, geometry))
+        error = error[~np.isnan(error).any(axis=1)]
+        grid.max_error = error.max(axis=0) if error.size else np.full(CHANNELS, np.nan)
+        return grid
+
+    def interpolate_rz(self, r: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """
+        r, z: (N,) horizontal distance and height in the leg frame
+        return: (N, CHANNELS), NaN rows for points outside the grid or next to an unsolvable cell
+        """
+        u = (np.asarray(r, dtype=float) - self.r_min) / self.step
+        v = (np.asarray(z, dtype=float) - self.z_min) / self.step
+        i = np.floor(u).astype(np.intp)
+        j = np.floor(v).astype(np.intp)
+        inside = (i >= 0) & (i < self.n_r - 1) & (j >= 0) & (j < self.n_z - 1)
+        i = np.clip(i, 0, self.n_r - 2)
+        j = np.clip(j, 0, self.n_z - 2)
+        fu = (u - i)[:, None]
+        fv = (v - j)[:, None]
+        g = self.values
+        result = (g[i, j] * (1 - fu) + g[i + 1, j] * fu) * (1 - fv) + (g[i, j + 1] * (1 - fu) + g[i + 1, j + 1] * fu) * fv
+        result[~inside] = np.nan
+        return result
+
+    def interpolate(self, points: np.ndarray) -> np.ndarray:
+        """
+        points: (N, 3) foot targets in the leg frame
+        return: (N, 4) [theta_1, theta_2, theta_3, tibia servo output (left side)]
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        result = np.empty((points.shape[0], CHANNELS + 1))
+        result[:, 0] = np.rad2deg(np.arctan2(points[:, 1], points[:, 0]))
+        result[:, 1:] = self.interpolate_rz(np.hypot(points[:, 0], points[:, 1]), points[:, 2])
+        return result
+
+    def lookup(self, end_coordinate, side: str) -> Optional[Tuple[Tuple[float, float, float], Tuple[float, float, float]]]:
+        """
+        single-leg query in plain Python floats
+        return: ((coxa, femur, tibia) joint angles, (coxa, femur, tibia) servo outputs) or None if not covered
+        """
+        x, y, z = end_coordinate
+        u = (math.hypot(x, y) - self.r_min) / self.step
+        v = (z - self.z_min) / self.step
+        i = math.floor(u)
+        j = math.floor(v)
+        if not (0 <= i < self.n_r - 1 and 0 <= j < self.n_z - 1):
+            return None
+        fu = u - i
+        fv = v - j
+        (c00, c01), (c10, c11) = self.values[i:i + 2, j:j + 2].tolist()
+        w00, w10, w01, w11 = (1 - fu) * (1 - fv), fu * (1 - fv), (1 - fu) * fv, fu * fv
+        theta_2, theta_3, tibia_servo = (w00 * a + w10 * b + w01 * c + w11 * d for a, b, c, d in zip(c00, c10, c01, c11))
+        if theta_2 != theta_2 or tibia_servo != tibia_servo:        # NaN
+            return None
+        theta_1 = math.degrees(math.atan2(y, x))
+        if side == "right":
+            return (theta_1, theta_2, theta_3), (theta_1, 180.0 - theta_2, 180.0 - tibia_servo)
+        return (theta_1, theta_2, theta_3), (theta_1, theta_2, tibia_servo)
+
+
+def solve_points(r: np.ndarray, z: np.ndarray, geometry: Dict[str, float]) -> np.ndarray:
+    """exact grid channels at (R, z), NaN where the target has no solution"""
+    points = np.stack((np.zeros_like(r), r, z), axis=1)     # any azimuth gives the same theta_2, theta_3
+    joints, reachable = bk.inverse_kinematic_batch(points, geometry["coxa"], geometry["femur"], geometry["tibia"])
+    tibia_servo = bk.link_kinematic_batch(joints[:, 1] + joints[:, 2],
+                                          geometry["link_ground"], geometry["link_crank"],
+                                          geometry["link_coupler"], geometry["link_rocker"],
+                                          geometry["tibia_servo_output_offset"])
+    values = np.concatenate((joints[:, 1:], tibia_servo[:, None]), axis=1)
+    values[~reachable] = np.nan
+    return values
+
+
+def get_ik_lookup_grid(geometry: Dict[str, float],
+                       bounds=cfg.IK_LOOKUP_BOUNDS,
+                       step: float = cfg.IK_LOOKUP_STEP,
+                       cache_dir: Optional[str] = cfg.IK_LOOKUP_CACHE_DIR) -> IKLookupGrid:
+    """
+    return the grid of this geometry: from the in-process cache, from disk (memory-mapped),
+    or build it and write it to disk. cache_dir=None disables the disk cache.
+    """
+    key = _cache_key(geometry, bounds, step)
+    grid = _GRIDS.get(key)
+    if grid is not None:
+        return grid
+
+    if cache_dir is None:
+        grid = IKLookupGrid.build(geometry, bounds, step)
+    else:
+        directory = cache_directory(cache_dir)
+        grid = load_cached_grid(directory, key)
+        if grid is None:
+            grid = IKLookupGrid.build(geometry, bounds, step)
+            meta = {"lower": [grid.r_min, grid.z_min], "step": grid.step, "max_error": grid.max_error.tolist(), "geometry": geometry}
+            try:
+                atomic_write(directory / f"ik_grid_{key}.npy", lambda f: np.save(f, grid.values))
+                atomic_write(directory / f"ik_grid_{key}.json", lambda f: f.write(json.dumps(meta, indent=2).encode()))
+            except OSError as e:
+                print(f"[ik_lookup] failed to write grid cache: {e}")
+
+    _GRIDS[key] = grid
+    return grid
+
+
+def load_cached_grid(directory: Path, key: str) -> Optional[IKLookupGrid]:
+    values_path = directory / f"ik_grid_{key}.npy"
+    meta_path = directory / f"ik_grid_{key}.json"
+    if not (values_path.exists() and meta_path.exists()):
+        return None
+    try:
+        meta = json.loads(meta_path.read_text())
+        return IKLookupGrid(np.load(values_path, mmap_mode="r"), meta["lower"], meta["step"], meta["max_error"])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[ik_lookup] failed to load cached grid, rebuilding: {e}")
+        return None
+
+
+def _cache_key(geometry: Dict[str, float], bounds, step: float) -> str:
+    return cache_key({"geometry": {k: round(float(v), 9) for k, v in geometry.items()},
+                      "bounds": [[float(lo), float(hi)] for lo, hi in bounds],
+                      "step": float(step),
+                      "channels": CHANNELS})
+
+
+if __name__ == "__main__":
+    from Src.Gait_control.Robot.robot_geometry_model import Leg
+
+    leg = Leg("L1", use_ik_lookup=True)
+    grid = leg.ik_lookup
+    print(f"grid shape: {tuple(grid.values.shape)}, max error [theta_2, theta_3, tibia servo] (deg): {grid.max_error}")
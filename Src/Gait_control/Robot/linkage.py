@@ -0,0 +1,153 @@
+"""
+Tibia four-bar linkage model.
+
+Maps theta_2 + theta_3 (theta_3l in Docs/robot geometry.md) to the tibia servo
+output through a 1D monotone table, plus the inverse mapping. The table,
+the servo output offset and the linkage limits are computed once per linkage
+geometry and shared by every leg through get_linkage_model().
+
+The linkage only sees cos(theta_3l), so the mapping is even and 360° periodic
+in theta_3l: the table covers [0°, 180°] and inputs are folded into it.
+Angles without a linkage solution map to NaN.
+
+unit: mm / degree
+"""
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+from Src.Gait_control.Robot import batch_kinematics as bk
+
+
+LINKAGE_TABLE_STEP = 0.01       # degree
+
+
+class LinkageModel:
+    def __init__(self, link_ground_length: float, link_crank_length: float,
+                 link_coupler_length: float, link_rocker_length: float,
+                 table_step: float = LINKAGE_TABLE_STEP):
+        self.Link_ground_length = link_ground_length
+        self.Link_crank_length = link_crank_length
+        self.Link_coupler_length = link_coupler_length
+        self.Link_rocker_length = link_rocker_length
+
+        self.tibia_servo_output_offset = self._calculate_tibia_servo_output_offset()
+        self.tibia_servo_output_range: Dict[str, Tuple[float, float]] = {
+            "left": self._calculate_tibia_servo_output_range("left"),
+            "right": self._calculate_tibia_servo_output_range("right"),
+        }
+
+        # forward table: theta_3l -> left tibia servo output, NaN where the linkage has no solution
+        self.table_theta = np.arange(0.0, 180.0 + 0.5 * table_step, table_step)
+        self.table_servo = self._exact(self.table_theta)
+        self._insert_valid_edges()
+        # d(servo)/d(theta_3l) for velocity estimates
+        self.table_slope = np.gradient(self.table_servo, self.table_theta)
+
+        # inverse table over the valid (monotone) part
+        valid = ~np.isnan(self.table_servo)
+        theta_valid = self.table_theta[valid]
+        servo_valid = self.table_servo[valid]
+        if not (np.all(np.diff(theta_valid) <= table_step * 1.5) and np.all(np.diff(servo_valid) > 0)):
+            raise ValueError("tibia linkage mapping is not monotone over a single branch, lookup table not applicable")
+        self._inverse_servo = servo_valid
+        self._inverse_theta = theta_valid
+
+        midpoints = self.table_theta[:-1] + 0.5 * table_step
+        with np.errstate(invalid="ignore"):
+            error = np.abs(self.tibia_servo_left(midpoints) - self._exact(midpoints))
+        self.max_error = float(np.nanmax(error)) if np.any(~np.isnan(error)) else float("nan")
+
+    def _exact(self, theta_3l):
+        return bk.link_kinematic_batch(theta_3l, self.Link_ground_length, self.Link_crank_length,
+                                       self.Link_coupler_length, self.Link_rocker_length,
+                                       self.tibia_servo_output_offset)
+
+    def _insert_valid_edges(self):
+        # a sample next to a NaN would make the whole interval NaN, so add the exact edge of the
+        # valid range (found by bisection) to keep the table domain identical to the analytic one
+        valid = ~np.isnan(self.table_servo)
+        edges = []
+        for i in np.flatnonzero(valid[:-1] != valid[1:]):
+            inside, outside = (self.table_theta[i], self.table_theta[i + 1]) if valid[i] else (self.table_theta[i + 1], self.table_theta[i])
+            for _ in range(60):
+                middle = 0.5 * (inside + outside)
+                if np.isnan(self._exact(middle)):
+                    outside = middle
+                else:
+                    inside = middle
+            edges.append(inside)
+        if edges:
+            self.table_theta = np.sort(np.concatenate((self.table_theta, edges)))
+            self.table_servo = self._exact(self.table_theta)
+
+    def tibia_servo_left(self, theta_3l):
+        """theta_2 + theta_3 (degree, scalar or array) -> left tibia servo output (degree)"""
+        folded = np.abs(np.mod(np.asarray(theta_3l, dtype=float) + 180.0, 360.0) - 180.0)
+        return np.interp(folded, self.table_theta, self.table_servo, left=np.nan, right=np.nan)
+
+    def tibia_servo_slope(self, theta_3l, side: str):
+        """d(tibia servo output)/d(theta_2 + theta_3) of the given side, dimensionless"""
+        wrapped = np.mod(np.asarray(theta_3l, dtype=float) + 180.0, 360.0) - 180.0
+        slope = np.interp(np.abs(wrapped), self.table_theta, self.table_slope, left=np.nan, right=np.nan) * np.where(wrapped < 0.0, -1.0, 1.0)
+        return -slope if side == "right" else slope
+
+    def tibia_servo_output(self, theta_3l, side: str):
+        """theta_2 + theta_3 (degree) -> tibia servo output of the given side (degree)"""
+        if side == "right":
+            return 180.0 - self.tibia_servo_left(theta_3l)
+        return self.tibia_servo_left(theta_3l)
+
+    def theta_3l(self, tibia_servo_output, side: str):
+        """inverse of tibia_servo_output(), returns theta_2 + theta_3 in [0°, 180°] or NaN"""
+        servo_left = np.asarray(tibia_servo_output, dtype=float)
+        if side == "right":
+            servo_left = 180.0 - servo_left
+        return np.interp(servo_left, self._inverse_servo, self._inverse_theta, left=np.nan, right=np.nan)
+
+    def _calculate_tibia_servo_output_offset(self) -> float:
+        # unit degree
+        Distance = np.hypot(self.Link_rocker_length, self.Link_ground_length)
+        alpha = np.arccos(self.Link_ground_length / Distance)
+        beta = np.arccos((Distance**2 + self.Link_crank_length**2 - self.Link_coupler_length**2) / (2 * Distance * self.Link_crank_length))
+        return float(np.rad2deg(np.pi/2 - alpha - beta))
+
+    def _calculate_tibia_servo_output_range(self, side: str) -> Tuple[float, float]:
+        '''
+        tibia servo output range allowed by the linkage, (min, max) in degree
+        '''
+        phi_0 = self.tibia_servo_output_offset       # degree
+        if side == "left":
+            if self.Link_ground_length + self.Link_crank_length < self.Link_rocker_length + self.Link_coupler_length:
+                max_theta_s = 180.0
+            else:
+                max_theta_s = np.rad2deg(np.arccos((self.Link_ground_length**2 + self.Link_crank_length**2 - (self.Link_rocker_length + self.Link_coupler_length)**2) / (2 * self.Link_ground_length * self.Link_crank_length))) + phi_0
+            if self.Link_ground_length + self.Link_rocker_length < self.Link_crank_length + self.Link_coupler_length:
+                min_theta_s = 0.0
+            else:
+                min_theta_s = np.rad2deg(np.arccos((self.Link_ground_length**2 + (self.Link_crank_length + self.Link_coupler_length)**2 - self.Link_rocker_length**2) / (2 * self.Link_ground_length * (self.Link_crank_length + self.Link_coupler_length)))) + phi_0
+        else:
+            if self.Link_ground_length + self.Link_rocker_length < self.Link_crank_length + self.Link_coupler_length:
+                max_theta_s = 180.0
+            else:
+                max_theta_s = np.rad2deg(np.pi - np.arccos((self.Link_ground_length**2 + (self.Link_crank_length + self.Link_coupler_length)**2 - self.Link_rocker_length**2) / (2 * self.Link_ground_length * (self.Link_crank_length + self.Link_coupler_length)))) - phi_0
+            if self.Link_ground_length + self.Link_crank_length < self.Link_rocker_length + self.Link_coupler_length:
+                min_theta_s = 0.0
+            else:
+                min_theta_s = np.rad2deg(np.pi - np.arccos((self.Link_ground_length**2 + self.Link_crank_length**2 - (self.Link_coupler_length + self.Link_rocker_length)**2) / (2 * self.Link_ground_length * self.Link_crank_length))) - phi_0
+        return float(min_theta_s), float(max_theta_s)
+
+
+@lru_cache(maxsize=None)
+def get_linkage_model(link_ground_length: float, link_crank_length: float,
+                      link_coupler_length: float, link_rocker_length: float) -> LinkageModel:
+    return LinkageModel(link_ground_length, link_crank_length, link_coupler_length, link_rocker_length)
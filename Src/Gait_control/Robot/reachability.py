@@ -0,0 +1,168 @@
+"""
+Voxelized reachability and servo-limit map of a leg side.
+
+Computed once from the geometry and servo limits in Robot/config.py, cached to
+disk and memory-mapped on later startups. Gait planners can check feasibility
+of many foot targets with O(1) lookups instead of paying for a full IK solve
+plus an exception, and project infeasible targets onto the nearest feasible
+voxel.
+
+A voxel counts as feasible when all 8 of its corner nodes have an IK solution
+within the servo limits. The nearest feasible voxel of every voxel is
+precomputed with jump flooding, so projection is a lookup as well.
+
+unit: mm
+"""
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import json
+from typing import Dict, Optional
+
+import numpy as np
+
+from Src.Gait_control.Robot import batch_kinematics as bk
+from Src.Gait_control.Robot import config as cfg
+from Src.Gait_control.Robot import linkage
+from Src.Gait_control.Robot.cache import atomic_write, cache_directory, cache_key
+
+
+_MAPS: Dict[str, "ReachabilityMap"] = {}
+
+
+class ReachabilityMap:
+    def __init__(self, feasible: np.ndarray, nearest: np.ndarray, lower, step: float):
+        # np.asarray keeps a memory-mapped file as backing but drops the slower np.memmap subclass
+        self.feasible = np.asarray(feasible)        # (nx, ny, nz) bool
+        self.nearest = np.asarray(nearest)          # (nx, ny, nz, 3) int16, index of the nearest feasible voxel
+        self.lower = np.asarray(lower, dtype=float)
+        self.step = float(step)
+        self.shape = np.array(feasible.shape)
+
+    @classmethod
+    def build(cls, side: str, geometry: Dict[str, float], limitation: Dict[str, float],
+              bounds=cfg.REACHABILITY_BOUNDS, step: float = cfg.REACHABILITY_STEP) -> "ReachabilityMap":
+        axes = [np.arange(lo, hi + 0.5 * step, step) for lo, hi in bounds]
+        nodes = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1)
+        node_ok = feasible_points(nodes.reshape(-1, 3), side, geometry, limitation).reshape(nodes.shape[:3])
+        feasible = (node_ok[:-1, :-1, :-1] & node_ok[1:, :-1, :-1] & node_ok[:-1, 1:, :-1] & node_ok[:-1, :-1, 1:]
+                    & node_ok[1:, 1:, :-1] & node_ok[1:, :-1, 1:] & node_ok[:-1, 1:, 1:] & node_ok[1:, 1:, 1:])
+        return cls(feasible, _nearest_feasible(feasible), [b[0] for b in bounds], step)
+
+    def _index(self, points: np.ndarray):
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        index = np.floor((points - self.lower) / self.step).astype(np.intp)
+        inside = ((index >= 0) & (index < self.shape)).all(axis=1)
+        return points, np.clip(index, 0, self.shape - 1), inside
+
+    def is_feasible(self, points: np.ndarray) -> np.ndarray:
+        """points: (N, 3) foot targets in the leg frame -> (N,) bool"""
+        _, index, inside = self._index(points)
+        return inside & self.feasible[index[:, 0], index[:, 1], index[:, 2]]
+
+    def project(self, points: np.ndarray) -> np.ndarray:
+        """
+        points: (N, 3) foot targets in the leg frame
+        return: (N, 3) feasible points unchanged, others moved to the centre of the nearest feasible voxel
+        """
+        points, index, inside = self._index(points)
+        ok = inside & self.feasible[index[:, 0], index[:, 1], index[:, 2]]
+        nearest = self.nearest[index[:, 0], index[:, 1], index[:, 2]].astype(float)
+        projected = self.lower + (nearest + 0.5) * self.step
+        projected[ok] = points[ok]
+        return projected
+
+
+def feasible_points(points: np.ndarray, side: str, geometry: Dict[str, float], limitation: Dict[str, float]) -> np.ndarray:
+    """exact check: IK solution exists and every servo output is within the limitation"""
+    joints, reachable = bk.inverse_kinematic_batch(points, geometry["coxa"], geometry["femur"], geometry["tibia"])
+    model = linkage.get_linkage_model(geometry["link_ground"], geometry["link_crank"], geometry["link_coupler"], geometry["link_rocker"])
+    servo_output = bk.servo_output_convert_batch(joints, side == "right", model.tibia_servo_left(joints[:, 1] + joints[:, 2]))
+    min_output = np.array([limitation["min_coxa"], limitation["min_femur"], limitation["min_tibia"]])
+    max_output = np.array([limitation["max_coxa"], limitation["max_femur"], limitation["max_tibia"]])
+    within_limit, _ = bk.check_servo_output_limitation_batch(servo_output, min_output, max_output)
+    return reachable & within_limit
+
+
+def _nearest_feasible(feasible: np.ndarray) -> np.ndarray:
+    """
+    index of the nearest feasible voxel for every voxel (jump flooding, approximate at a few voxels).
+    all zeros if nothing is feasible.
+    """
+    shape = feasible.shape
+    coords = np.stack(np.meshgrid(*[np.arange(n) for n in shape], indexing="ij"), axis=-1)
+    unset = np.iinfo(np.int32).max // 4
+    nearest = np.where(feasible[..., None], coords, unset).astype(np.int32)
+    if not feasible.any():
+        return np.zeros(shape + (3,), dtype=np.int16)
+
+    def distance(seed):
+        return ((seed - coords) ** 2).sum(axis=-1, dtype=np.int64)
+
+    best = distance(nearest)
+    levels = int(np.ceil(np.log2(max(shape))))
+    steps = [1 << k for k in range(levels - 1, -1, -1)] + [1]      # extra step-1 pass (JFA+1) removes most errors
+    offsets = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) if (dx, dy, dz) != (0, 0, 0)]
+    for step in steps:
+        for dx, dy, dz in offsets:
+            if any(d and step >= n for d, n in zip((dx, dy, dz), shape)):
+                continue
+            # target[i] takes the seed of source[i + offset * step]
+            src = tuple(slice(max(0, d * step), n + min(0, d * step)) for d, n in zip((dx, dy, dz), shape))
+            dst = tuple(slice(max(0, -d * step), n + min(0, -d * step)) for d, n in zip((dx, dy, dz), shape))
+            candidate = nearest[src]
+            candidate_distance = ((candidate - coords[dst]) ** 2).sum(axis=-1, dtype=np.int64)
+            better = candidate_distance < best[dst]
+            nearest[dst][better] = candidate[better]
+            best[dst][better] = candidate_distance[better]
+    return nearest.astype(np.int16)
+
+
+def get_reachability_map(side: str, geometry: Dict[str, float], limitation: Dict[str, float],
+                         bounds=cfg.REACHABILITY_BOUNDS,
+                         step: float = cfg.REACHABILITY_STEP,
+                         cache_dir: Optional[str] = cfg.REACHABILITY_CACHE_DIR) -> ReachabilityMap:
+    """
+    return the map of this side/geometry/limitation: from the in-process cache, from disk
+    (memory-mapped), or build it and write it to disk. cache_dir=None disables the disk cache.
+    """
+    key = cache_key({"side": side,
+                     "geometry": {k: round(float(v), 9) for k, v in geometry.items()},
+                     "limitation": {k: round(float(v), 9) for k, v in limitation.items()},
+                     "bounds": [[float(lo), float(hi)] for lo, hi in bounds],
+                     "step": float(step)})
+    reachability = _MAPS.get(key)
+    if reachability is not None:
+        return reachability
+
+    if cache_dir is None:
+        reachability = ReachabilityMap.build(side, geometry, limitation, bounds, step)
+    else:
+        directory = cache_directory(cache_dir)
+        paths = {name: directory / f"reachability_{key}_{name}.npy" for name in ("feasible", "nearest")}
+        meta_path = directory / f"reachability_{key}.json"
+        if meta_path.exists() and all(path.exists() for path in paths.values()):
+            try:
+                meta = json.loads(meta_path.read_text())
+                reachability = ReachabilityMap(np.load(paths["feasible"], mmap_mode="r"), np.load(paths["nearest"], mmap_mode="r"),
+                                               meta["lower"], meta["step"])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[reachability] failed to load cached map, rebuilding: {e}")
+        if reachability is None:
+            reachability = ReachabilityMap.build(side, geometry, limitation, bounds, step)
+            meta = {"side": side, "lower": reachability.lower.tolist(), "step": reachability.step,
+                    "geometry": geometry, "limitation": limitation}
+            try:
+                atomic_write(paths["feasible"], lambda f: np.save(f, reachability.feasible))
+                atomic_write(paths["nearest"], lambda f: np.save(f, reachability.nearest))
+                atomic_write(meta_path, lambda f: f.write(json.dumps(meta, indent=2).encode()))
+            except OSError as e:
+                print(f"[reachability] failed to write map cache: {e}")
+
+    _MAPS[key] = reachability
+    return reachability
@@ -8,23 +8,283 @@ if str(ROOT) not in sys.path:
 
 
 import numpy as np
-from typing import List
+from typing import List, Mapping
 from Src.Gait_control.Robot import config as cfg
-import threading
+from Src.Gait_control.Robot import batch_kinematics as bk
+from Src.Gait_control.Robot import ik_lookup
+from Src.Gait_control.Robot import linkage
+from Src.Gait_control.Robot import reachability
+from Src.Gait_control.Robot.body_pose import BodyPoseTransform
+from Src.Gait_control.Robot.diagnostics import IKDiagnostics
+from Src.Gait_control.Robot.robot_state import JOINT_NAMES, RobotState
 import warnings
 
 class Spider_robot:
-    def __init__(self):
+    def __init__(self, use_ik_lookup: bool = cfg.USE_IK_LOOKUP):
+        # joint angles, servo outputs and end coordinates of all legs, the legs hold views into it
+        self.state = RobotState(["L1", "L2", "L3", "R1", "R2", "R3"])
+        # per-leg IK status counters, problems are printed at most once per cfg.IK_DIAGNOSTICS_INTERVAL
+        self.diagnostics = IKDiagnostics(self.state.leg_names)
         self.legs = {
-            "L1": Leg("L1"), 
-            "L2": Leg("L2"),
-            "L3": Leg("L3"),
-            "R1": Leg("R1"),
-            "R2": Leg("R2"),
-            "R3": Leg("R3")
+            "L1": Leg("L1", use_ik_lookup=use_ik_lookup, state=self.state, diagnostics=self.diagnostics), 
+            "L2": Leg("L2", use_ik_lookup=use_ik_lookup, state=self.state, diagnostics=self.diagnostics),
+            "L3": Leg("L3", use_ik_lookup=use_ik_lookup, state=self.state, diagnostics=self.diagnostics),
+            "R1": Leg("R1", use_ik_lookup=use_ik_lookup, state=self.state, diagnostics=self.diagnostics),
+            "R2": Leg("R2", use_ik_lookup=use_ik_lookup, state=self.state, diagnostics=self.diagnostics),
+            "R3": Leg("R3", use_ik_lookup=use_ik_lookup, state=self.state, diagnostics=self.diagnostics)
         }
+        self.leg_names = list(self.legs.keys())
+        self._build_batch_parameters()
+        # hexagon mounting transforms + current body pose (roll, pitch, yaw, translation)
+        self.body = BodyPoseTransform(self.leg_names)
+        self._reachability_maps = {}        # leg name -> ReachabilityMap, loaded on first use
+        self._reachability_group_cache = None
         pass
 
+    def _build_batch_parameters(self):
+        # per-leg geometry and limitation stacked in leg_names order, used by the batch IK
+        legs = [self.legs[name] for name in self.leg_names]
+        self._coxa_length = self._stack_parameter([leg.Coxa_length for leg in legs])
+        self._femur_length = self._stack_parameter([leg.Femur_length for leg in legs])
+        self._tibia_length = self._stack_parameter([leg.Tibia_length for leg in legs])
+        self._link_ground_length = self._stack_parameter([leg.Link_ground_length for leg in legs])
+        self._link_crank_length = self._stack_parameter([leg.Link_crank_length for leg in legs])
+        self._link_coupler_length = self._stack_parameter([leg.Link_coupler_length for leg in legs])
+        self._link_rocker_length = self._stack_parameter([leg.Link_rocker_length for leg in legs])
+        self._tibia_servo_output_offset = self._stack_parameter([leg.tibia_servo_output_offset for leg in legs])
+        self._is_right = np.array([leg.side == "right" for leg in legs])
+        limitations = [leg.read_servo_output_limitation() for leg in legs]
+        self._min_servo_output = np.array([[lim["min_coxa"], lim["min_femur"], lim["min_tibia"]] for lim in limitations])
+        self._max_servo_output = np.array([[lim["max_coxa"], lim["max_femur"], lim["max_tibia"]] for lim in limitations])
+        # the lookup grid is only used for the batch when every leg shares the same one
+        grids = [leg.ik_lookup for leg in legs]
+        self._ik_lookup = grids[0] if grids[0] is not None and all(g is grids[0] for g in grids) else None
+        self._geometry = legs[0].geometry()
+        # same for the shared tibia linkage table
+        models = [leg.linkage for leg in legs]
+        self._linkage = models[0] if all(m is models[0] for m in models) else None
+
+    @staticmethod
+    def _stack_parameter(values: list):
+        # all legs usually share one geometry, a scalar keeps the batch math on cheap float operations
+        if all(v == values[0] for v in values):
+            return float(values[0])
+        return np.array(values, dtype=float)
+
+    def solve_all_ends_array(self, ends_coordinate: np.ndarray):
+        '''
+        batch inverse kinematic + servo output convert for all legs, leg state is not touched
+        param: ends_coordinate (6, 3), rows in self.leg_names order
+        return: (joints (6, 3), servo_outputs (6, 3), valid (6,), near_limit (6,))
+        '''
+        joints, servo_outputs, status = self.solve_all_ends_status(ends_coordinate)
+        return joints, servo_outputs, status <= bk.IK_NEAR_LIMIT, status == bk.IK_NEAR_LIMIT
+
+    def solve_all_ends_status(self, ends_coordinate: np.ndarray):
+        '''
+        non-throwing batch inverse kinematic + servo output convert, leg state is not touched
+        param: ends_coordinate (6, 3), rows in self.leg_names order
+        return: (joints (6, 3), servo_outputs (6, 3), status (6,) int8 bk.IK_* codes)
+        '''
+        ends = np.asarray(ends_coordinate, dtype=float).reshape(len(self.leg_names), 3)
+        if self._ik_lookup is not None:
+            joints, reachable, tibia_servo_left = self._lookup_all_ends_array(ends)
+        else:
+            joints, reachable = bk.inverse_kinematic_batch(ends, self._coxa_length, self._femur_length, self._tibia_length)
+            tibia_servo_left = self._tibia_servo_left(joints)
+        servo_outputs = bk.servo_output_convert_batch(joints, self._is_right, tibia_servo_left)
+        within_limit, near_limit = bk.check_servo_output_limitation_batch(servo_outputs, self._min_servo_output, self._max_servo_output)
+        return joints, servo_outputs, bk.ik_status_batch(reachable, within_limit, near_limit)
+
+    def _tibia_servo_left(self, joints: np.ndarray) -> np.ndarray:
+        if self._linkage is not None:
+            return self._linkage.tibia_servo_left(joints[:, 1] + joints[:, 2])
+        return bk.link_kinematic_batch(joints[:, 1] + joints[:, 2],
+                                       self._link_ground_length, self._link_crank_length,
+                                       self._link_coupler_length, self._link_rocker_length,
+                                       self._tibia_servo_output_offset)
+
+    def _lookup_all_ends_array(self, ends: np.ndarray):
+        # interpolate from the IK grid, targets not covered by it are solved analytically
+        values = self._ik_lookup.interpolate(ends)
+        missing = np.isnan(values).any(axis=1)
+        if missing.any():
+            values[missing, 1:] = ik_lookup.solve_points(np.hypot(ends[missing, 0], ends[missing, 1]), ends[missing, 2], self._geometry)
+        joints = values[:, :3]
+        reachable = ~np.isnan(joints).any(axis=1)
+        return joints, reachable, values[:, 3]
+
+    def write_all_ends_array(self, ends_coordinate: np.ndarray):
+        '''
+        batch version of Leg.write_end_coordinate() for all legs, never raises.
+        a leg whose target is unreachable or exceeds servo limitation keeps its previous state,
+        the status codes go to self.diagnostics.
+        param: ends_coordinate (6, 3), rows in self.leg_names order
+        return: (joints (6, 3), servo_outputs (6, 3) currently held by the legs, status (6,) bk.IK_* codes)
+        '''
+        ends = np.asarray(ends_coordinate, dtype=float).reshape(len(self.leg_names), 3)
+        joints, servo_outputs, status = self.solve_all_ends_status(ends)
+        valid = status <= bk.IK_NEAR_LIMIT
+        with self.state.lock:
+            self.state.write(valid, ends[valid], joints[valid], servo_outputs[valid])
+            joints = self.state.joints.copy()
+            servo_outputs = self.state.servo_outputs.copy()
+        self.diagnostics.record(status)
+        return joints, servo_outputs, status
+
+    def write_all_ends_array_incremental(self, ends_coordinate: np.ndarray):
+        '''
+        velocity-level IK update: joints += J^-1 * (target - current end) for all legs.
+        only valid for small steps, call write_all_ends_array() periodically to remove the drift.
+        falls back to the full solve if a Jacobian is singular or a servo limit would be exceeded.
+        param: ends_coordinate (6, 3), rows in self.leg_names order
+        return: (joints (6, 3), servo_outputs (6, 3), status (6,) bk.IK_* codes)
+        '''
+        ends = np.asarray(ends_coordinate, dtype=float).reshape(len(self.leg_names), 3)
+        _, joints, _, current_ends = self.state.snapshot()
+        delta_q, regular = bk.solve_jacobian_batch(joints, ends - current_ends,
+                                                   self._coxa_length, self._femur_length, self._tibia_length)
+        joints = joints + delta_q
+        servo_outputs = bk.servo_output_convert_batch(joints, self._is_right, self._tibia_servo_left(joints))
+        within_limit, near_limit = bk.check_servo_output_limitation_batch(servo_outputs, self._min_servo_output, self._max_servo_output)
+        if not (regular & within_limit).all() or near_limit.any():
+            return self.write_all_ends_array(ends)
+        self.state.write(slice(None), ends, joints, servo_outputs)
+        status = np.zeros(len(self.leg_names), dtype=np.int8)
+        self.diagnostics.record(status)
+        return joints, servo_outputs, status
+
+    def read_all_joints_array(self) -> np.ndarray:
+        # (6, 3) [coxa, femur, tibia] in degree, rows in self.leg_names order
+        return self.state.read_joints()
+
+    def read_all_ends_array(self) -> np.ndarray:
+        # (6, 3) end coordinates, rows in self.leg_names order
+        return self.state.read_ends()
+
+    def read_all_servo_outputs_array(self) -> np.ndarray:
+        # (6, 3) [coxa, femur, tibia] servo outputs in degree, rows in self.leg_names order
+        return self.state.read_servo_outputs()
+
+    def jacobian_all(self, joints: np.ndarray = None) -> np.ndarray:
+        '''
+        return: (6, 3, 3) d(x, y, z) / d(coxa, femur, tibia) of every leg in mm/degree
+        '''
+        if joints is None:
+            joints = self.read_all_joints_array()
+        return bk.jacobian_batch(joints, self._coxa_length, self._femur_length, self._tibia_length)
+
+    def joint_velocities(self, ends_velocity: np.ndarray) -> np.ndarray:
+        '''
+        param: ends_velocity (6, 3) foot velocities in mm/s
+        return: (6, 3) joint velocities in degree/s, NaN rows at a singular configuration
+        '''
+        joint_velocity, _ = bk.solve_jacobian_batch(self.read_all_joints_array(), ends_velocity,
+                                                    self._coxa_length, self._femur_length, self._tibia_length)
+        return joint_velocity
+
+    def servo_velocities(self, ends_velocity: np.ndarray) -> np.ndarray:
+        '''
+        param: ends_velocity (6, 3) foot velocities in mm/s
+        return: (6, 3) servo output velocities in degree/s (femur mirrored and tibia through the linkage)
+        '''
+        joints = self.read_all_joints_array()
+        joint_velocity, _ = bk.solve_jacobian_batch(joints, ends_velocity, self._coxa_length, self._femur_length, self._tibia_length)
+        servo_velocity = joint_velocity.copy()
+        servo_velocity[self._is_right, 1] *= -1.0
+        theta_3l_velocity = joint_velocity[:, 1] + joint_velocity[:, 2]
+        for i, name in enumerate(self.leg_names):
+            leg = self.legs[name]
+            servo_velocity[i, 2] = theta_3l_velocity[i] * leg.linkage.tibia_servo_slope(joints[i, 1] + joints[i, 2], leg.side)
+        return servo_velocity
+
+    def time_to_servo_limit(self, servo_velocities: np.ndarray) -> np.ndarray:
+        '''
+        predict servo saturation at the current servo velocities
+        return: (6, 3) seconds until each servo reaches the limit it moves towards, inf if it moves away or stands still
+        '''
+        velocity = np.asarray(servo_velocities, dtype=float).reshape(len(self.leg_names), 3)
+        servo_outputs = self.state.read_servo_outputs()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            remaining = np.where(velocity > 0.0, self._max_servo_output - servo_outputs, self._min_servo_output - servo_outputs)
+            seconds = remaining / velocity
+        seconds[~(seconds >= 0.0) | (np.abs(velocity) < 1e-9)] = np.inf
+        return seconds
+
+    def reachability_map(self, leg_name: str) -> reachability.ReachabilityMap:
+        # built (or loaded from the disk cache) on first use, shared by legs with the same side, geometry and limits
+        reachability_map = self._reachability_maps.get(leg_name)
+        if reachability_map is None:
+            leg = self.legs[leg_name]
+            reachability_map = reachability.get_reachability_map(leg.side, leg.geometry(), leg.read_servo_output_limitation())
+            self._reachability_maps[leg_name] = reachability_map
+        return reachability_map
+
+    def is_feasible_all(self, ends_coordinate: np.ndarray) -> np.ndarray:
+        '''
+        param: ends_coordinate (6, 3) or (N, 6, 3) foot targets, legs in self.leg_names order
+        return: (6,) or (N, 6) bool, O(1) voxel lookups, no IK solve
+        '''
+        ends = np.asarray(ends_coordinate, dtype=float)
+        flat = ends.reshape(-1, len(self.leg_names), 3)
+        feasible = np.empty(flat.shape[:2], dtype=bool)
+        for reachability_map, index in self._reachability_groups():
+            feasible[:, index] = reachability_map.is_feasible(flat[:, index]).reshape(flat.shape[0], -1)
+        return feasible.reshape(ends.shape[:-1])
+
+    def project_all_ends(self, ends_coordinate: np.ndarray) -> np.ndarray:
+        '''
+        param: ends_coordinate (6, 3) or (N, 6, 3) foot targets, legs in self.leg_names order
+        return: same shape, infeasible targets moved to the nearest feasible voxel
+        '''
+        ends = np.asarray(ends_coordinate, dtype=float)
+        flat = ends.reshape(-1, len(self.leg_names), 3)
+        projected = np.empty_like(flat)
+        for reachability_map, index in self._reachability_groups():
+            projected[:, index] = reachability_map.project(flat[:, index]).reshape(flat.shape[0], -1, 3)
+        return projected.reshape(ends.shape)
+
+    def _reachability_groups(self):
+        # legs sharing a map (same side, geometry and limits) are looked up together
+        if self._reachability_group_cache is None:
+            groups = {}
+            for i, name in enumerate(self.leg_names):
+                reachability_map = self.reachability_map(name)
+                groups.setdefault(id(reachability_map), (reachability_map, []))[1].append(i)
+            self._reachability_group_cache = [(reachability_map, np.array(index)) for reachability_map, index in groups.values()]
+        return self._reachability_group_cache
+
+    def set_body_pose(self, roll: float = 0.0, pitch: float = 0.0, yaw: float = 0.0, translation=(0.0, 0.0, 0.0)):
+        '''
+        roll, pitch, yaw in degree, translation (3,) in mm, relative to the ground fixed body frame.
+        takes effect on the next apply_body_pose() / body_to_leg() call.
+        '''
+        self.body.set_pose(roll, pitch, yaw, translation)
+
+    def apply_body_pose(self, ends_coordinate: np.ndarray) -> np.ndarray:
+        '''
+        param: ends_coordinate (6, 3) or (N, 6, 3) leg frame targets for the neutral body pose
+        return: the same ground points in the leg frames of the posed body (one batched matmul)
+        '''
+        if self.body.is_neutral:
+            return np.asarray(ends_coordinate, dtype=float)
+        return self.body.apply(ends_coordinate)
+
+    def body_to_leg(self, ends_body: np.ndarray) -> np.ndarray:
+        # (6, 3) or (N, 6, 3) body frame targets -> leg frames, body pose applied
+        return self.body.body_to_leg(ends_body)
+
+    def leg_to_body(self, ends_coordinate: np.ndarray) -> np.ndarray:
+        # (6, 3) or (N, 6, 3) leg frame coordinates -> body frame, inverse of body_to_leg()
+        return self.body.leg_to_body(ends_coordinate)
+
+    def write_all_ends_body(self, ends_body: np.ndarray):
+        '''
+        write_all_ends_array() with the foot targets given in the body frame
+        param: ends_body (6, 3), rows in self.leg_names order
+        '''
+        return self.write_all_ends_array(self.body.body_to_leg(ends_body))
+
     def write_all_ends_coordinate(self, ends_coordinate: dict):
         '''
         param shoud be:
@@ -33,71 +293,38 @@ class Spider_robot:
             "L2": [xxx, xxx, xxx],
             ......
         }
+        legs missing from the dict keep their current end coordinate
         '''
         try:
-            self.legs["L1"].write_end_coordinate(ends_coordinate["L1"])
-            self.legs["L2"].write_end_coordinate(ends_coordinate["L2"])
-            self.legs["L3"].write_end_coordinate(ends_coordinate["L3"])
-            self.legs["R1"].write_end_coordinate(ends_coordinate["R1"])
-            self.legs["R2"].write_end_coordinate(ends_coordinate["R2"])
-            self.legs["R3"].write_end_coordinate(ends_coordinate["R3"])
+            ends = self.state.read_ends()
+            for i, name in enumerate(self.leg_names):
+                if name in ends_coordinate:
+                    ends[i] = ends_coordinate[name]
+            self.write_all_ends_array(ends)
         except Exception:
             pass
         pass
 
     def read_all_ends_coordinate(self) -> dict:
-        try:
-            ends_coordinate = {
-                "L1": self.legs["L1"].read_end_coordinate(),
-                "L2": self.legs["L2"].read_end_coordinate(),
-                "L3": self.legs["L3"].read_end_coordinate(),
-                "R1": self.legs["R1"].read_end_coordinate(),
-                "R2": self.legs["R2"].read_end_coordinate(),
-                "R3": self.legs["R3"].read_end_coordinate(),
-            }
-            return ends_coordinate 
-        except Exception:
-            pass           
+        # { "L1": [x, y, z], ... }
+        return dict(zip(self.leg_names, self.state.read_ends().tolist()))
 
     def _write_all_joints_angle(self):
         pass
     
-    def read_all_joints_angle(self) -> dict:        
+    def read_all_joints_angle(self) -> Mapping[str, float]:
         """
-        return:
+        return (read-only, cached per state version):
         { "L1_coxa": ..., "L1_femur": ..., "L1_tibia": ..., "R3_tibia": ... }
         """
-        all_joint_angle = {}
-        try:
-            for name, leg in self.legs.items():
-                try:
-                    joint_dict = leg.read_all_joints_angle()
-                    if isinstance(joint_dict, dict):
-                        for joint_name, angle in joint_dict.items():
-                            all_joint_angle[f"{name}_{joint_name}"] = angle
-                except Exception:
-                    continue
-            return all_joint_angle
-        except Exception:
-            return {}
+        return self.state.joint_angle_dict()
 
-    def read_servo_outputs(self) -> dict:
+    def read_servo_outputs(self) -> Mapping[str, float]:
         """
-        return:
+        return (read-only, cached per state version):
         { "L1_coxa": val, "L1_femur": val, ... }
         """
-        outputs = {}
-        try:
-            for name, leg in self.legs.items():
-                try:
-                    so = leg.read_servo_output()
-                    if isinstance(so, dict):
-                        outputs.update(so)
-                except Exception:
-                    continue
-            return outputs
-        except Exception:
-            return {}
+        return self.state.servo_output_dict()
 
     def publish_joints_angle(self):
         pass
@@ -127,7 +354,10 @@ class Leg:
                  Max_femur_servo_output: dict = cfg.MAX_FEMUR_SERVO_OUTPUT,
                  Min_femur_servo_output: dict = cfg.MIN_FEMUR_SERVO_OUTPUT,
                  Max_tibia_servo_output: dict = cfg.MAX_TIBIA_SERVO_OUTPUT,
-                 Min_tibia_servo_output: dict = cfg.MIN_TIBIA_SERVO_OUTPUT):
+                 Min_tibia_servo_output: dict = cfg.MIN_TIBIA_SERVO_OUTPUT,
+                 use_ik_lookup: bool = cfg.USE_IK_LOOKUP,
+                 state: RobotState = None,
+                 diagnostics: IKDiagnostics = None):
         
         self.name = name     
         if 'L' in self.name:
@@ -137,7 +367,13 @@ class Leg:
         else:
             raise Exception
         
-        self._lock = threading.RLock()
+        # joint angles, servo outputs and end coordinate are rows of a RobotState, shared with the
+        # other legs of a Spider_robot (one lock for all of them) or private to a standalone leg
+        self.state = state if state is not None else RobotState([self.name])
+        self._state = self.state.view(self.name)
+        self._lock = self.state.lock
+        self.servo_names = [f"{self.name}_{joint}" for joint in JOINT_NAMES]
+        self.diagnostics = diagnostics if diagnostics is not None else IKDiagnostics([self.name])
 
         self.Coxa_length = Coxa_length
         self.Femur_length = Femur_length
@@ -148,17 +384,8 @@ class Leg:
         self.Link_coupler_length = Link_coupler_length
         self.Link_rocker_length = Link_rocker_length
 
-        self.__joint = {
-            "coxa": Default_Coxa_Angle,
-            "femur": Default_Femur_Angle,
-            "tibia": Default_Tibia_Angle
-        }
-
-        self.__servo_output = {
-            self.name + "_coxa": Default_Coxa_Servo_Output,
-            self.name + "_femur": Default_Femur_Servo_Output,
-            self.name + "_tibia": Default_Tibia_Servo_Output
-        }
+        self._state.write(joints=(Default_Coxa_Angle, Default_Femur_Angle, Default_Tibia_Angle),
+                          servo_output=(Default_Coxa_Servo_Output, Default_Femur_Servo_Output, Default_Tibia_Servo_Output))
 
         self.__servo_output_limitation = {
             "max_coxa": Max_coxa_servo_output[self.side],
@@ -169,47 +396,90 @@ class Leg:
             "min_tibia": Min_tibia_servo_output[self.side],
         }
 
+        self.linkage = linkage.get_linkage_model(Link_ground_length, Link_crank_length, Link_coupler_length, Link_rocker_length)
         self.tibia_servo_output_offset = self.calculate_tibia_servo_output_offset()
         self.calculate_servo_output_limitation()      
 
-        self.__end_coordinate = self.forward_kinematic()
-        self.write_end_coordinate(self.__end_coordinate)
+        # optional precomputed IK backend, shared by every leg with the same geometry
+        self.ik_lookup = ik_lookup.get_ik_lookup_grid(self.geometry()) if use_ik_lookup else None
+
+        self.write_end_coordinate(self.forward_kinematic())
 
 
 
     def read_end_coordinate(self) -> List[float]:
         with self._lock:
-            #print(self.__end_coordinate)
-            return self.__end_coordinate
+            return self._state.end_coordinate.tolist()
 
     def read_joint_angle(self, name: str) -> float:
         try:
-            with self._lock:
-                #print(self.__joint[name])
-                return self.__joint[name]
+            return self._state.joint[JOINT_NAMES.index(name)].item()
         except Exception:
             pass
 
     def read_all_joints_angle(self) -> dict:
         with self._lock:
-            #print(self.__joint)
-            return self.__joint
+            return dict(zip(JOINT_NAMES, self._state.joint.tolist()))
 
     def read_servo_output(self) -> dict:
         with self._lock:
-            #print(self.__servo_output)
-            return self.__servo_output
-    
-    def write_end_coordinate(self, end_coordinate: List[float]):
-        # update all data
-        # conduct safty check in servo_output_convert()
+            return dict(zip(self.servo_names, self._state.servo_output.tolist()))
+
+    def read_servo_output_limitation(self) -> dict:
+        with self._lock:
+            return dict(self.__servo_output_limitation)
+
+    def write_end_coordinate(self, end_coordinate: List[float]) -> int:
+        '''
+        update all data, never raises. a target without valid solution keeps the previous state,
+        the status code goes to self.diagnostics.
+        return: bk.IK_* status code
+        '''
+        status, joints, servo_output = self.solve_end_coordinate(end_coordinate)
+        if status <= bk.IK_NEAR_LIMIT:
+            self._state.write(end_coordinate, joints, servo_output)
+        self.diagnostics.record_leg(self.name, status)
+        return status
+
+    def solve_end_coordinate(self, end_coordinate: List[float]):
+        '''
+        non-throwing inverse kinematic + servo output convert, leg state is not touched
+        return: (bk.IK_* status code, joints, servo_output), joints and servo_output are None if unreachable
+        '''
+        if self.ik_lookup is not None:
+            solution = self.ik_lookup.lookup(end_coordinate, self.side)
+            if solution is not None:
+                joints, servo_output = solution
+                return self.servo_output_status(*servo_output), joints, servo_output
+        joints = self._solve_inverse_kinematic(*end_coordinate)
+        if joints is None:
+            return bk.IK_UNREACHABLE, None, None
+        servo_output = self._convert_servo_output(joints)
+        return self.servo_output_status(*servo_output), joints, servo_output
+
+    def jacobian(self) -> np.ndarray:
+        '''
+        return: (3, 3) d(x, y, z) / d(coxa, femur, tibia) in mm/degree
+        '''
+        with self._lock:
+            joints = self._state.joint.copy()
+        return bk.jacobian_batch(joints, self.Coxa_length, self.Femur_length, self.Tibia_length)[0]
+
+    def joint_velocity(self, end_velocity: List[float]) -> np.ndarray:
+        # foot velocity (mm/s) -> joint velocity (degree/s), NaN at a singular configuration
+        with self._lock:
+            joints = self._state.joint.copy()
+        return bk.solve_jacobian_batch(joints, end_velocity, self.Coxa_length, self.Femur_length, self.Tibia_length)[0][0]
+
+    def incremental_inverse_kinematic(self, end_coordinate: List[float]) -> List[float]:
+        '''
+        joint angles for a nearby target from delta_q = J^-1 * delta_p, leg state is not touched
+        '''
         with self._lock:
-            self.__end_coordinate = end_coordinate
-            try:
-                self.__joint["coxa"], self.__joint["femur"], self.__joint["tibia"] = self.inverse_kinematic()
-                self.__servo_output[self.name + "_coxa"], self.__servo_output[self.name + "_femur"], self.__servo_output[self.name + "_tibia"] = self.servo_output_convert()
-            except Exception as e:
-                print("e")
+            joints = self._state.joint.copy()
+            delta_p = np.asarray(end_coordinate, dtype=float) - self._state.end_coordinate
+        delta_q = bk.solve_jacobian_batch(joints, delta_p, self.Coxa_length, self.Femur_length, self.Tibia_length)[0][0]
+        return (joints + delta_q).tolist()
 
     def _write_joint_angle(self, name: str, angle: float):
         pass
@@ -218,8 +488,13 @@ class Leg:
         pass
 
     def inverse_kinematic(self) -> List[float]:
-        x, y, z = self.read_end_coordinate()
-        
+        joints = self._solve_inverse_kinematic(*self.read_end_coordinate())
+        if joints is None:
+            raise Exception(f"{self.name} target coordinate has no inverse kinematic solution.")
+        return joints
+
+    def _solve_inverse_kinematic(self, x: float, y: float, z: float):
+        # None if the target has no solution
         #theta_1
         theta_1 = np.arctan2(y, x)
         
@@ -229,7 +504,7 @@ class Leg:
         Distance = np.hypot(r, z)       # Distance from end_coordinate to Femur joint
         
         if Distance > self.Femur_length + self.Tibia_length or Distance < np.abs(self.Femur_length - self.Tibia_length):
-            raise Exception(f"{self.name} target coordinate has no inverse kinematic solution.")
+            return None
         
         alpha = np.arctan2(r, -z)
         beta = np.arccos( (Distance**2 + self.Femur_length**2 - self.Tibia_length**2) / (2*Distance*self.Femur_length) )
@@ -241,12 +516,14 @@ class Leg:
         return np.rad2deg(theta_1), np.rad2deg(theta_2), np.rad2deg(theta_3)
 
     def forward_kinematic(self) -> List[float]:
-        r = self.Femur_length * np.sin(np.deg2rad(self.read_joint_angle("femur"))) + self.Tibia_length * np.sin(np.deg2rad(self.read_joint_angle("tibia")))
+        with self._lock:
+            theta_1, theta_2, theta_3 = np.deg2rad(self._state.joint).tolist()
+        r = self.Femur_length * np.sin(theta_2) + self.Tibia_length * np.sin(theta_3)
         R = self.Coxa_length + r
 
-        x = R * np.cos(np.deg2rad(self.read_joint_angle("coxa")))
-        y = R * np.sin(np.deg2rad(self.read_joint_angle("coxa")))
-        z = self.Femur_length * np.cos(np.deg2rad(self.read_joint_angle("femur"))) - self.Tibia_length * np.cos(np.deg2rad(self.read_joint_angle("tibia")))
+        x = R * np.cos(theta_1)
+        y = R * np.sin(theta_1)
+        z = self.Femur_length * np.cos(theta_2) - self.Tibia_length * np.cos(theta_3)
         
         return x, y, z
 
@@ -255,43 +532,66 @@ class Leg:
         check servo output limitation 
         '''
         
-        if self.side == "left":
-            coxa_servo_output = self.read_joint_angle("coxa")
-            femur_servo_output = self.read_joint_angle("femur")
-            tibia_servo_output = self.link_kinematic()
-        elif self.side == "right":
-            coxa_servo_output = self.read_joint_angle("coxa")
-            femur_servo_output = 180.0 - self.read_joint_angle("femur")
-            tibia_servo_output = self.link_kinematic()
-        else:
-            pass
-
-        ALLOWABLE_WARNING = 2.0
-        
-        # check angular limitation, raise error if exceed the limit, raise warning if close to the limit(2°)
-        if not (self.__servo_output_limitation["min_coxa"] <= coxa_servo_output <= self.__servo_output_limitation["max_coxa"]):
-            raise Exception(f"{self.name} coxa servo output exceed limitation!")
-        elif not (self.__servo_output_limitation["min_coxa"] + ALLOWABLE_WARNING <= coxa_servo_output <= self.__servo_output_limitation["max_coxa"] - ALLOWABLE_WARNING):
-            warnings.warn(f"{self.name} coxa servo output close to limitation!", UserWarning)
-
-        if not (self.__servo_output_limitation["min_femur"] <= femur_servo_output <= self.__servo_output_limitation["max_femur"]):
-            raise Exception(f"{self.name} femur servo output exceed limitation!")
-        elif not (self.__servo_output_limitation["min_femur"] + ALLOWABLE_WARNING <= femur_servo_output <= self.__servo_output_limitation["max_femur"] - ALLOWABLE_WARNING):
-            warnings.warn(f"{self.name} femur servo output close to limitation!", UserWarning)
-        
-        if not (self.__servo_output_limitation["min_tibia"] <= tibia_servo_output <= self.__servo_output_limitation["max_tibia"]):
-            raise Exception(f"{self.name} tibia servo output exceed limitation!")
-        elif not (self.__servo_output_limitation["min_tibia"] + ALLOWABLE_WARNING <= tibia_servo_output <= self.__servo_output_limitation["max_tibia"] - ALLOWABLE_WARNING):
-            warnings.warn(f"{self.name} tibia servo output close to limitation!", UserWarning)
+        servo_output = self._convert_servo_output(self.read_all_joints_angle().values())
+        self.check_servo_output_limitation(*servo_output)
+        return servo_output
+
+    def _convert_servo_output(self, joints) -> List[float]:
+        # joints: (coxa, femur, tibia) in degree, no limitation check
+        coxa, femur, tibia = joints
+        tibia_servo_output = float(self.linkage.tibia_servo_output(femur + tibia, self.side))
+        if self.side == "right":
+            return coxa, 180.0 - femur, tibia_servo_output
+        return coxa, femur, tibia_servo_output
+
+    def _servo_output_joint_status(self, servo_output):
+        # (joint, bk.IK_* status) for each of coxa, femur, tibia; NaN outputs count as exceeded
+        limitation = self.__servo_output_limitation
+        for joint, output in zip(("coxa", "femur", "tibia"), servo_output):
+            min_output, max_output = limitation["min_" + joint], limitation["max_" + joint]
+            if not (min_output <= output <= max_output):
+                yield joint, bk.IK_LIMIT_EXCEEDED
+            elif not (min_output + bk.ALLOWABLE_WARNING <= output <= max_output - bk.ALLOWABLE_WARNING):
+                yield joint, bk.IK_NEAR_LIMIT
+            else:
+                yield joint, bk.IK_OK
 
-        return coxa_servo_output, femur_servo_output, tibia_servo_output
+    def servo_output_status(self, coxa_servo_output: float, femur_servo_output: float, tibia_servo_output: float) -> int:
+        '''
+        non-throwing version of check_servo_output_limitation()
+        return: bk.IK_OK, bk.IK_NEAR_LIMIT or bk.IK_LIMIT_EXCEEDED (also for NaN outputs)
+        '''
+        status = bk.IK_OK
+        for _, joint_status in self._servo_output_joint_status((coxa_servo_output, femur_servo_output, tibia_servo_output)):
+            if joint_status == bk.IK_LIMIT_EXCEEDED:
+                return joint_status
+            if joint_status == bk.IK_NEAR_LIMIT:
+                status = joint_status
+        return status
+
+    def check_servo_output_limitation(self, coxa_servo_output: float, femur_servo_output: float, tibia_servo_output: float):
+        # check angular limitation, raise error if exceed the limit, raise warning if close to the limit (bk.ALLOWABLE_WARNING)
+        for joint, status in self._servo_output_joint_status((coxa_servo_output, femur_servo_output, tibia_servo_output)):
+            if status == bk.IK_LIMIT_EXCEEDED:
+                raise Exception(f"{self.name} {joint} servo output exceed limitation!")
+            if status == bk.IK_NEAR_LIMIT:
+                warnings.warn(f"{self.name} {joint} servo output close to limitation!", UserWarning)
+
+    def geometry(self) -> dict:
+        return {
+            "coxa": self.Coxa_length,
+            "femur": self.Femur_length,
+            "tibia": self.Tibia_length,
+            "link_ground": self.Link_ground_length,
+            "link_crank": self.Link_crank_length,
+            "link_coupler": self.Link_coupler_length,
+            "link_rocker": self.Link_rocker_length,
+            "tibia_servo_output_offset": float(self.tibia_servo_output_offset),
+        }
 
     def calculate_tibia_servo_output_offset(self) -> float:
-        # unit degree
-        Distance = np.hypot(self.Link_rocker_length, self.Link_ground_length)
-        alpha = np.arccos(self.Link_ground_length / Distance)
-        beta = np.arccos((Distance**2 + self.Link_crank_length**2 - self.Link_coupler_length**2) / (2 * Distance * self.Link_crank_length))
-        return np.rad2deg(np.pi/2 - alpha - beta)
+        # unit degree, computed once per linkage geometry in the shared LinkageModel
+        return self.linkage.tibia_servo_output_offset
 
     def calculate_servo_output_limitation(self):
         '''
@@ -299,53 +599,17 @@ class Leg:
         '''
         # tibia limitation
         with self._lock:
-            if self.side == "left":
-                phi_0 = self.tibia_servo_output_offset       # degree
-                if self.Link_ground_length + self.Link_crank_length < self.Link_rocker_length + self.Link_coupler_length:
-                    max_theta_s = 180.0
-                else:
-                    max_theta_s = np.rad2deg(np.arccos((self.Link_ground_length**2 + self.Link_crank_length**2 - (self.Link_rocker_length + self.Link_coupler_length)**2) / (2 * self.Link_ground_length * self.Link_crank_length))) + phi_0
-                if self.Link_ground_length + self.Link_rocker_length < self.Link_crank_length + self.Link_coupler_length:
-                    min_theta_s = 0.0
-                else:
-                    min_theta_s = np.rad2deg(np.arccos((self.Link_ground_length**2 + (self.Link_crank_length + self.Link_coupler_length)**2 - self.Link_rocker_length**2) / (2 * self.Link_ground_length * (self.Link_crank_length + self.Link_coupler_length)))) + phi_0
-                self.__servo_output_limitation["max_tibia"] = min(self.__servo_output_limitation["max_tibia"], max_theta_s)
-                self.__servo_output_limitation["min_tibia"] = max(self.__servo_output_limitation["min_tibia"], min_theta_s)
-
-            elif self.side == "right":
-                phi_0 = self.tibia_servo_output_offset       # degree
-                if self.Link_ground_length + self.Link_rocker_length < self.Link_crank_length + self.Link_coupler_length:
-                    max_theta_s = 180.0
-                else:
-                    max_theta_s = np.rad2deg(np.pi - np.arccos((self.Link_ground_length**2 + (self.Link_crank_length + self.Link_coupler_length)**2 - self.Link_rocker_length**2) / (2 * self.Link_ground_length * (self.Link_crank_length + self.Link_coupler_length)))) - phi_0
-                if self.Link_ground_length + self.Link_crank_length < self.Link_rocker_length + self.Link_coupler_length:
-                    min_theta_s = 0.0
-                else:
-                    min_theta_s = np.rad2deg(np.pi - np.arccos((self.Link_ground_length**2 + self.Link_crank_length**2 - (self.Link_coupler_length + self.Link_rocker_length)**2) / (2 * self.Link_ground_length * self.Link_crank_length))) - phi_0
-                self.__servo_output_limitation["max_tibia"] = min(self.__servo_output_limitation["max_tibia"], max_theta_s)
-                self.__servo_output_limitation["min_tibia"] = max(self.__servo_output_limitation["min_tibia"], min_theta_s)
-            else:
-                pass
+            min_theta_s, max_theta_s = self.linkage.tibia_servo_output_range[self.side]
+            self.__servo_output_limitation["max_tibia"] = min(self.__servo_output_limitation["max_tibia"], max_theta_s)
+            self.__servo_output_limitation["min_tibia"] = max(self.__servo_output_limitation["min_tibia"], min_theta_s)
 
     def link_kinematic(self) -> float:
         # input unit: degree
-        # output unit: degree       
-        phi_0 = np.deg2rad(self.tibia_servo_output_offset)     # rad
-        if self.side == "left":
-            theta_3l = np.deg2rad(self.read_joint_angle("femur") + self.read_joint_angle("tibia"))
-            Distance = np.sqrt(self.Link_rocker_length**2 + self.Link_ground_length**2 - 2 * self.Link_rocker_length * self.Link_ground_length * np.cos(np.pi - theta_3l))
-            alpha = np.arccos((self.Link_ground_length**2 + Distance**2 - self.Link_rocker_length**2) / (2 * self.Link_ground_length * Distance))
-            beta = np.arccos((self.Link_crank_length**2 + Distance**2 - self.Link_coupler_length**2) / (2 * Distance * self.Link_crank_length))
-            return np.rad2deg(alpha + beta + phi_0)
-        elif self.side == "right":
-            theta_3r = np.pi - np.deg2rad(self.read_joint_angle("femur") + self.read_joint_angle("tibia"))
-            Distance = np.sqrt(self.Link_rocker_length**2 + self.Link_ground_length**2 - 2 * self.Link_rocker_length * self.Link_ground_length * np.cos(theta_3r))
-            alpha = np.arccos((self.Link_ground_length**2 + Distance**2 - self.Link_rocker_length**2) / (2 * self.Link_ground_length * Distance))
-            beta = np.arccos((self.Link_crank_length**2 + Distance**2 - self.Link_coupler_length**2) / (2 * Distance * self.Link_crank_length))
-            return np.rad2deg(np.pi - alpha - beta - phi_0)
-        else:
-            pass
-        pass
+        # output unit: degree
+        # theta_3l = theta_2 + theta_3, mapped through the shared linkage table
+        with self._lock:
+            theta_3l = self._state.joint[1].item() + self._state.joint[2].item()
+        return float(self.linkage.tibia_servo_output(theta_3l, self.side))
     
 if __name__ == "__main__":
     robot = Spider_robot()
@@ -0,0 +1,131 @@
+'''
+Struct-of-arrays state of all legs.
+
+Joint angles, servo outputs and end coordinates of every leg live in three
+preallocated (n_legs, 3) arrays guarded by one lock and a version counter.
+Leg objects only hold a LegStateView (row views into these arrays), so a
+whole-robot update is a few array assignments under a single lock. The
+name-keyed read methods return a read-only mapping that is only rebuilt when
+the version changes and is shared by all readers of that version; hot paths
+use the array readers instead.
+
+rows follow leg_names, columns are [coxa, femur, tibia] / [x, y, z]
+unit: mm / degree
+'''
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import threading
+from types import MappingProxyType
+from typing import List, Mapping
+
+import numpy as np
+
+
+JOINT_NAMES = ("coxa", "femur", "tibia")
+
+
+class RobotState:
+    def __init__(self, leg_names: List[str]):
+        self.leg_names = list(leg_names)
+        self.index = {name: i for i, name in enumerate(self.leg_names)}
+        self.servo_names = [f"{leg}_{joint}" for leg in self.leg_names for joint in JOINT_NAMES]
+
+        self.joints = np.zeros((len(self.leg_names), 3))
+        self.servo_outputs = np.zeros((len(self.leg_names), 3))
+        self.ends = np.zeros((len(self.leg_names), 3))
+
+        self.lock = threading.RLock()
+        self.version = 0            # incremented by every write, readers can detect changes without copying
+
+        self._servo_dict_version = -1
+        self._servo_dict: Mapping[str, float] = MappingProxyType({})
+        self._joint_dict_version = -1
+        self._joint_dict: Mapping[str, float] = MappingProxyType({})
+
+    def view(self, leg_name: str) -> "LegStateView":
+        return LegStateView(self, self.index[leg_name])
+
+    def write(self, rows, ends: np.ndarray, joints: np.ndarray, servo_outputs: np.ndarray):
+        '''
+        rows: index, slice or bool mask of the legs to update
+        ends, joints, servo_outputs: values of those legs
+        '''
+        with self.lock:
+            self.ends[rows] = ends
+            self.joints[rows] = joints
+            self.servo_outputs[rows] = servo_outputs
+            self.version += 1
+
+    def snapshot(self):
+        '''
+        return: (version, joints (n, 3), servo_outputs (n, 3), ends (n, 3)) copies taken under the lock
+        '''
+        with self.lock:
+            return self.version, self.joints.copy(), self.servo_outputs.copy(), self.ends.copy()
+
+    def read_joints(self) -> np.ndarray:
+        with self.lock:
+            return self.joints.copy()
+
+    def read_servo_outputs(self) -> np.ndarray:
+        with self.lock:
+            return self.servo_outputs.copy()
+
+    def read_ends(self) -> np.ndarray:
+        with self.lock:
+            return self.ends.copy()
+
+    def servo_output_dict(self) -> Mapping[str, float]:
+        '''
+        return: read-only { "L1_coxa": ..., "L1_femur": ..., ... "R3_tibia": ... }, dict() it to modify
+        '''
+        with self.lock:
+            if self._servo_dict_version != self.version:
+                self._servo_dict = MappingProxyType(dict(zip(self.servo_names, self.servo_outputs.ravel().tolist())))
+                self._servo_dict_version = self.version
+            return self._servo_dict
+
+    def joint_angle_dict(self) -> Mapping[str, float]:
+        '''
+        return: read-only { "L1_coxa": ..., "L1_femur": ..., ... "R3_tibia": ... }, dict() it to modify
+        '''
+        with self.lock:
+            if self._joint_dict_version != self.version:
+                self._joint_dict = MappingProxyType(dict(zip(self.servo_names, self.joints.ravel().tolist())))
+                self._joint_dict_version = self.version
+            return self._joint_dict
+
+
+class LegStateView:
+    '''
+    one leg's rows of a RobotState, the arrays are views so writes go straight to the shared state
+    '''
+    __slots__ = ("state", "row", "joint", "servo_output", "end_coordinate")
+
+    def __init__(self, state: RobotState, row: int):
+        self.state = state
+        self.row = row
+        self.joint = state.joints[row]                  # (3,) view
+        self.servo_output = state.servo_outputs[row]    # (3,) view
+        self.end_coordinate = state.ends[row]           # (3,) view
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self.state.lock
+
+    def write(self, end_coordinate=None, joints=None, servo_output=None):
+        # None leaves that part unchanged
+        with self.state.lock:
+            if end_coordinate is not None:
+                self.end_coordinate[:] = end_coordinate
+            if joints is not None:
+                self.joint[:] = joints
+            if servo_output is not None:
+                self.servo_output[:] = servo_output
+            self.state.version += 1
@@ -47,3 +47,49 @@ def Bezier(p1, p3, theta, z_lift, z_down):
 
 
 
+class BezierBatch:
+    """Vectorized Bezier() for a stack of feet.
+
+    endpoints is an (L, 2, 3) tensor of [P1, P3] per foot. The quartic basis of
+    Bezier() with the mid control point P2 = (P1 + P3) / 2 (+ z_down / z_lift on z)
+    collapses to
+
+        P(s) = P1 + (3s^2 - 2s^3) * (P3 - P1) + 6s^2(1 - s)^2 * dz
+
+    so P1, P3 - P1 and dz are precomputed here and an evaluation is a few
+    elementwise operations over all feet (and any number of phases).
+
+    duty_factor (scalar or (L,)) is the stance share of the cycle: the phase is
+    remapped so stance spans [0, 2pi * duty_factor]. 0.5 is Bezier() itself.
+    """
+
+    def __init__(self, endpoints, z_lift, z_down, duty_factor=0.5):
+        endpoints = np.asarray(endpoints, dtype=float).reshape(-1, 2, 3)
+        self.start = endpoints[:, 0].copy()                      # (L, 3) P1
+        self.delta = endpoints[:, 1] - endpoints[:, 0]           # (L, 3) P3 - P1
+        self._start_z = self.start[:, 2].copy()
+        self._delta_z = self.delta[:, 2].copy()
+        self.heights = np.array([z_down, z_lift], dtype=float)  # dz of stance, swing
+        duty_factor = np.broadcast_to(np.asarray(duty_factor, dtype=float), (self.start.shape[0],))
+        if np.any((duty_factor <= 0.0) | (duty_factor >= 1.0)):
+            raise ValueError("duty factor must be in (0, 1)")
+        self._warp = bool(np.any(duty_factor != 0.5))
+        self._stance_end = 2.0 * duty_factor                   # in units of pi
+        self._stance_scale = 1.0 / self._stance_end
+        self._swing_scale = 1.0 / (2.0 - self._stance_end)
+
+    def evaluate(self, theta):
+        """theta: (..., L) phases in rad (any range) -> (..., L, 3) foot positions"""
+        t = np.asarray(theta, dtype=float) * (1.0 / np.pi) % 2.0     # [0, 2), stance up to 1
+        if self._warp:
+            stance = t <= self._stance_end
+            t = np.where(stance, t * self._stance_scale, 1.0 + (t - self._stance_end) * self._swing_scale)
+        swing = t > 1.0
+        s_z = t - swing                     # stance: theta/pi,  swing: (theta - pi)/pi
+        s_xy = 1.0 - np.abs(1.0 - t)        # stance: theta/pi,  swing: (2pi - theta)/pi
+
+        u_xy = s_xy * s_xy * (3.0 - 2.0 * s_xy)
+        positions = self.start + u_xy[..., None] * self.delta
+        positions[..., 2] = (self._start_z + s_z * s_z * (3.0 - 2.0 * s_z) * self._delta_z
+                             + 6.0 * (s_z * (1.0 - s_z))**2 * self.heights[swing.view(np.int8)])
+        return positions
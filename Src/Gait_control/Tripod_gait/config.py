@@ -13,76 +13,123 @@ Y_STEP = 20
 X_STEP = 10
 
 initial_pos = [0, 85, -135]
-# ——— 每条腿的轨迹端点及所属振荡器 ———
-LEG_CONFIG_Forward = {
-    # osc = 0
-    'L2':  {
-        'osc': 0,
-        'P1' : [ initial_pos[0] + 2*Y_STEP, initial_pos[1], initial_pos[2] ],
-        'P3' : [ initial_pos[0] - 2*Y_STEP, initial_pos[1], initial_pos[2] ]
-    },
-    'R3': {
-        'osc': 0,
-        'P1' : [ initial_pos[0] - Y_STEP, initial_pos[1] - Y_STEP*np.sqrt(3), initial_pos[2] ],
-        'P3' : [ initial_pos[0] + Y_STEP, initial_pos[1] + Y_STEP*np.sqrt(3), initial_pos[2] ]
-    },
-    'R1': {
-        'osc': 0,
-        'P1' : [ initial_pos[0] - Y_STEP, initial_pos[1] + Y_STEP*np.sqrt(3), initial_pos[2] ],
-        'P3' : [ initial_pos[0] + Y_STEP, initial_pos[1] - Y_STEP*np.sqrt(3), initial_pos[2] ]
-    },
-    # osc = 1
-    'R2': {
-        'osc': 1,
-        'P1' : [ initial_pos[0] - 2*Y_STEP, initial_pos[1], initial_pos[2] ],
-        'P3' : [ initial_pos[0] + 2*Y_STEP, initial_pos[1], initial_pos[2] ]
-    },
-    'L3':  {
-        'osc': 1,
-        'P1' : [ initial_pos[0] + Y_STEP, initial_pos[1] - Y_STEP*np.sqrt(3), initial_pos[2] ],
-        'P3' : [ initial_pos[0] - Y_STEP, initial_pos[1] + Y_STEP*np.sqrt(3), initial_pos[2] ]
-    },
-    'L1':  {
-        'osc': 1,
-        'P1' : [ initial_pos[0] + Y_STEP, initial_pos[1] + Y_STEP*np.sqrt(3), initial_pos[2] ],
-        'P3' : [ initial_pos[0] - Y_STEP, initial_pos[1] - Y_STEP*np.sqrt(3), initial_pos[2] ]
-    },
-}
 
-LEG_CONFIG_Sidle = {
-    # osc = 0
-    'L2':  {
-        'osc': 0,
-        'P1' : [ initial_pos[0], initial_pos[1] - 2*X_STEP, initial_pos[2] ],
-        'P3' : [ initial_pos[0], initial_pos[1] + 2*X_STEP, initial_pos[2] ]
-    },
-    'R1': {
-        'osc': 0,
-        'P1' : [ initial_pos[0] + X_STEP*np.sqrt(3), initial_pos[1] + X_STEP, initial_pos[2] ],
-        'P3' : [ initial_pos[0] - X_STEP*np.sqrt(3), initial_pos[1] - X_STEP, initial_pos[2] ]
-    },
-    'R3': {
-        'osc': 0,
-        'P1' : [ initial_pos[0] - X_STEP*np.sqrt(3), initial_pos[1] + X_STEP, initial_pos[2] ],
-        'P3' : [ initial_pos[0] + X_STEP*np.sqrt(3), initial_pos[1] - X_STEP, initial_pos[2] ]
-    },
-    # osc = 1
-    'R2': {
-        'osc': 1,
-        'P1' : [ initial_pos[0], initial_pos[1] + 2*X_STEP, initial_pos[2] ],
-        'P3' : [ initial_pos[0], initial_pos[1] - 2*X_STEP, initial_pos[2] ]
+# ——— CPG 积分 ———
+CPG_INTEGRATOR = 'rk4'    # euler / rk4 / steady，见 cpg.INTEGRATORS
+CPG_MAX_STEP   = 0.02     # 单个积分子步的最大时长 (s)，大 dt 自动拆分
+
+# ——— 全向速度指令 (vx, vy, yaw_rate) ———
+# 指令按分辨率量化成桶，最近用过的桶缓存其轨迹，重复指令不再重新计算
+COMMAND_RESOLUTION = (1.0, 1.0, 0.5)   # vx (mm/s), vy (mm/s), yaw_rate (deg/s)
+COMMAND_CACHE_SIZE = 64                # 缓存的指令桶数量 (LRU)
+COMMAND_MAX_STROKE = 4*Y_STEP          # 支撑相最大步幅 (mm)，超出时按比例缩小整个指令
+
+# ——— CPG 步态预设 ———
+# phases: 各振荡器的目标相位 (稳态相对相位)；legs: 每条腿所属振荡器；
+# duty_factor: 支撑相占周期的比例 (Bezier 轨迹 θ 的前 duty_factor 部分为支撑相)
+CPG_PRESETS = {
+    # 两组三足交替
+    'tripod': {
+        'phases': [0.0, np.pi],
+        'legs': {'L2': 0, 'R1': 0, 'R3': 0, 'R2': 1, 'L1': 1, 'L3': 1},
+        'duty_factor': 0.5,
     },
-    'L1':  {
-        'osc': 1,
-        'P1' : [ initial_pos[0] + X_STEP*np.sqrt(3), initial_pos[1] - X_STEP, initial_pos[2] ],
-        'P3' : [ initial_pos[0] - X_STEP*np.sqrt(3), initial_pos[1] + X_STEP, initial_pos[2] ]
+    # 每侧由后向前依次迈腿，左右相差半个周期，同时最多两条腿摆动
+    'ripple': {
+        'phases': [0.0, 4*np.pi/3, 2*np.pi/3, np.pi, np.pi/3, 5*np.pi/3],
+        'legs': {'L3': 0, 'L2': 1, 'L1': 2, 'R3': 3, 'R2': 4, 'R1': 5},
+        'duty_factor': 2/3,
     },
-    'L3':  {
-        'osc': 1,
-        'P1' : [ initial_pos[0] - X_STEP*np.sqrt(3), initial_pos[1] - X_STEP, initial_pos[2] ],
-        'P3' : [ initial_pos[0] + X_STEP*np.sqrt(3), initial_pos[1] + X_STEP, initial_pos[2] ]
+    # 六条腿依次迈腿，同时只有一条腿摆动
+    'wave': {
+        'phases': [0.0, 5*np.pi/3, 4*np.pi/3, np.pi, 2*np.pi/3, np.pi/3],
+        'legs': {'L3': 0, 'L2': 1, 'L1': 2, 'R3': 3, 'R2': 4, 'R1': 5},
+        'duty_factor': 5/6,
     },
 }
+# ——— 每条腿的轨迹端点及所属振荡器 ———
+def leg_config_forward(step=None, pos=None):
+    # 前进：step 对应 Y_STEP，pos 为足端中立位置
+    step = Y_STEP if step is None else step
+    pos = initial_pos if pos is None else pos
+    return {
+        # osc = 0
+        'L2':  {
+            'osc': 0,
+            'P1' : [ pos[0] + 2*step, pos[1], pos[2] ],
+            'P3' : [ pos[0] - 2*step, pos[1], pos[2] ]
+        },
+        'R3': {
+            'osc': 0,
+            'P1' : [ pos[0] - step, pos[1] - step*np.sqrt(3), pos[2] ],
+            'P3' : [ pos[0] + step, pos[1] + step*np.sqrt(3), pos[2] ]
+        },
+        'R1': {
+            'osc': 0,
+            'P1' : [ pos[0] - step, pos[1] + step*np.sqrt(3), pos[2] ],
+            'P3' : [ pos[0] + step, pos[1] - step*np.sqrt(3), pos[2] ]
+        },
+        # osc = 1
+        'R2': {
+            'osc': 1,
+            'P1' : [ pos[0] - 2*step, pos[1], pos[2] ],
+            'P3' : [ pos[0] + 2*step, pos[1], pos[2] ]
+        },
+        'L3':  {
+            'osc': 1,
+            'P1' : [ pos[0] + step, pos[1] - step*np.sqrt(3), pos[2] ],
+            'P3' : [ pos[0] - step, pos[1] + step*np.sqrt(3), pos[2] ]
+        },
+        'L1':  {
+            'osc': 1,
+            'P1' : [ pos[0] + step, pos[1] + step*np.sqrt(3), pos[2] ],
+            'P3' : [ pos[0] - step, pos[1] - step*np.sqrt(3), pos[2] ]
+        },
+    }
+
+
+def leg_config_sidle(step=None, pos=None):
+    # 侧移：step 对应 X_STEP，pos 为足端中立位置
+    step = X_STEP if step is None else step
+    pos = initial_pos if pos is None else pos
+    return {
+        # osc = 0
+        'L2':  {
+            'osc': 0,
+            'P1' : [ pos[0], pos[1] - 2*step, pos[2] ],
+            'P3' : [ pos[0], pos[1] + 2*step, pos[2] ]
+        },
+        'R1': {
+            'osc': 0,
+            'P1' : [ pos[0] + step*np.sqrt(3), pos[1] + step, pos[2] ],
+            'P3' : [ pos[0] - step*np.sqrt(3), pos[1] - step, pos[2] ]
+        },
+        'R3': {
+            'osc': 0,
+            'P1' : [ pos[0] - step*np.sqrt(3), pos[1] + step, pos[2] ],
+            'P3' : [ pos[0] + step*np.sqrt(3), pos[1] - step, pos[2] ]
+        },
+        # osc = 1
+        'R2': {
+            'osc': 1,
+            'P1' : [ pos[0], pos[1] + 2*step, pos[2] ],
+            'P3' : [ pos[0], pos[1] - 2*step, pos[2] ]
+        },
+        'L1':  {
+            'osc': 1,
+            'P1' : [ pos[0] + step*np.sqrt(3), pos[1] - step, pos[2] ],
+            'P3' : [ pos[0] - step*np.sqrt(3), pos[1] + step, pos[2] ]
+        },
+        'L3':  {
+            'osc': 1,
+            'P1' : [ pos[0] - step*np.sqrt(3), pos[1] - step, pos[2] ],
+            'P3' : [ pos[0] + step*np.sqrt(3), pos[1] + step, pos[2] ]
+        },
+    }
+
+LEG_CONFIG_Forward = leg_config_forward()
+
+LEG_CONFIG_Sidle = leg_config_sidle()
 
 # LEG_CONFIG_Turn = {
 #     # osc = 0
@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 # ——— 参数 ———
 omega = 0.5   # 基本频率（Hz）
@@ -8,6 +7,15 @@ K     = 0.5   # 耦合强度
 # 初始相位，可自行修改
 initial_phases = [0.0, np.pi]  # φ1(0)=0.0 rad, φ2(0)=1.0 rad
 
+# 定点相位：uint32 累加器，2^32 对应 2π，溢出回绕即对 2π 取模 (长时间运行不丢精度)
+PHASE_BITS = 32
+PHASE_RANGE = 1 << PHASE_BITS
+PHASE_MASK = PHASE_RANGE - 1
+PHASE_SCALE = PHASE_RANGE / (2 * np.pi)     # rad -> LSB
+
+# 积分器：euler (显式欧拉)、rk4 (四阶龙格-库塔)、steady (稳态闭式解 φ += 2π·ω·dt，仅在锁相后精确)
+INTEGRATORS = ("euler", "rk4", "steady")
+
 def coupled_oscillators2(t, y):
     """
     两个振荡器的耦合动力学方程。
@@ -23,7 +31,104 @@ def coupled_oscillators2(t, y):
         dy.append(dy_i)
     return dy
 
+
+class CPGNetwork:
+    """
+    N 个相位振荡器的耦合网络 (Kuramoto 型)，向量化计算导数：
+        dφ_i/dt = 2π·ω_i + Σ_j K_ij · sin(φ_j - φ_i - Φ_ij)
+    Φ_ij = θ_j - θ_i 为期望相位差 (θ 为 target_phases)，稳态时各振荡器保持 θ 的相对相位，
+    并以 2π·ω rad/s 前进。ω、K 为每个实例独立的参数 (标量或数组)。
+    """
+
+    def __init__(self, target_phases, omega=omega, K=K, coupling=None):
+        self.target_phases = np.asarray(target_phases, dtype=float).ravel()
+        n = self.target_phases.size
+        if n < 1:
+            raise ValueError("CPG network needs at least one oscillator")
+        self.omega = np.broadcast_to(np.asarray(omega, dtype=float), (n,)).copy()    # Hz
+        if coupling is None:
+            coupling = K * (np.ones((n, n)) - np.eye(n))        # all-to-all, uniform gain
+        self.coupling = np.asarray(coupling, dtype=float).reshape(n, n)
+        self.offsets = self.target_phases[None, :] - self.target_phases[:, None]   # Φ_ij
+        self._angular_velocity = 2 * np.pi * self.omega
+
+    @property
+    def size(self):
+        return self.target_phases.size
+
+    def derivative(self, phases):
+        """phases: (n,) -> dφ/dt (n,)"""
+        phases = np.asarray(phases, dtype=float)
+        coupling = np.sin(phases[None, :] - phases[:, None] - self.offsets)
+        coupling *= self.coupling
+        return self._angular_velocity + coupling.sum(axis=1)
+
+    def integrate(self, phases, dt, method="rk4", max_step=None):
+        """
+        从 phases 积分 dt 秒，返回新的相位 (n,)。
+        max_step: 子步长上限 (s)，dt 较大 (低控制频率或调度抖动) 时拆成 ceil(dt / max_step) 个等长子步；
+                  None 表示只走一步。steady 不需要子步。
+        """
+        phases = np.array(phases, dtype=float)
+        if dt <= 0.0:
+            return phases
+        if method == "steady":
+            return phases + self._angular_velocity * dt
+        steps = int(np.ceil(dt / max_step)) if max_step else 1
+        h = dt / steps
+        f = self.derivative
+        if method == "euler":
+            for _ in range(steps):
+                phases = phases + h * f(phases)
+        elif method == "rk4":
+            for _ in range(steps):
+                k1 = f(phases)
+                k2 = f(phases + (0.5 * h) * k1)
+                k3 = f(phases + (0.5 * h) * k2)
+                k4 = f(phases + h * k3)
+                phases = phases + (h / 6.0) * (k1 + 2.0 * (k2 + k3) + k4)
+        else:
+            raise ValueError(f"Unknown integrator {method!r}, expected one of {INTEGRATORS}")
+        return phases
+
+
+def phase_to_fixed(phases):
+    """rad (任意范围) -> uint32 定点相位"""
+    phases = np.asarray(phases, dtype=float)
+    return np.rint(np.mod(phases, 2 * np.pi) * PHASE_SCALE).astype(np.int64).astype(np.uint32)
+
+
+def fixed_to_phase(fixed):
+    """uint32 定点相位 -> rad，范围 [0, 2π)"""
+    return np.asarray(fixed, dtype=np.uint32) * (1.0 / PHASE_SCALE)
+
+
+class PhaseAccumulator:
+    """
+    振荡器相位的 uint32 回绕累加器。
+    advance() 的增量按 LSB 取整，舍去的小数部分留到下一次 (误差反馈)，所以长时间累加不漂移；
+    value 可直接作为查表索引：row = (value * rows) >> PHASE_BITS。
+    """
+
+    def __init__(self, phases):
+        self.value = phase_to_fixed(phases).ravel()
+        self._residual = np.zeros(self.value.shape)      # LSB
+
+    def phases(self):
+        """(n,) rad in [0, 2π)"""
+        return fixed_to_phase(self.value)
+
+    def advance(self, delta_phases):
+        """delta_phases: (n,) rad，可为负或大于 2π"""
+        ticks = np.asarray(delta_phases, dtype=float) * PHASE_SCALE + self._residual
+        whole = np.rint(ticks)
+        self._residual = ticks - whole
+        self.value += whole.astype(np.int64).astype(np.uint32)     # uint32 加法自然回绕
+
+
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     # 时间设置
     dt = 0.01      # 步长 (s)
     T  = 10        # 总时长 (s)
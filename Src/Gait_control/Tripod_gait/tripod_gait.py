@@ -6,70 +6,166 @@ ROOT = FILE.parents[3]
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
-from typing import Dict, Iterable, List, Optional
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 
 from Src.Gait_control.Tripod_gait import config as cfg
 from Src.Gait_control.Tripod_gait import cpg
 from Src.Gait_control.Tripod_gait import bezier
+from Src.Gait_control.Robot import body_pose
 
 
-class TripodGait:
-    """Tripod gait generator driven by coupled oscillators."""
+class CPGGait:
+    """Gait generator driven by an N-oscillator CPG network (presets in config.CPG_PRESETS)."""
 
     def __init__(
         self,
+        preset: str = "tripod",
         leg_config: Optional[Dict[str, Dict[str, object]]] = None,
         initial_phases: Optional[Iterable[float]] = None,
         z_lift: float = cfg.Z_LIFT,
         z_down: float = cfg.Z_DOWN,
+        omega: float = cpg.omega,
+        K: float = cpg.K,
+        coupling: Optional[np.ndarray] = None,
+        integrator: str = cfg.CPG_INTEGRATOR,
+        max_step: Optional[float] = cfg.CPG_MAX_STEP,
     ) -> None:
+        if preset not in cfg.CPG_PRESETS:
+            raise ValueError(f"Unknown gait preset {preset!r}, expected one of {sorted(cfg.CPG_PRESETS)}")
+        self.preset = preset
+        self._preset = cfg.CPG_PRESETS[preset]
         self.leg_config = leg_config if leg_config is not None else cfg.LEG_CONFIG_Forward
         self.z_lift = float(z_lift)
         self.z_down = float(z_down)
-        self._phases: List[float] = []
+        self.duty_factor = float(self._preset['duty_factor'])
+        self.network = cpg.CPGNetwork(self._preset['phases'], omega=omega, K=K, coupling=coupling)
+        if integrator not in cpg.INTEGRATORS:
+            raise ValueError(f"Unknown integrator {integrator!r}, expected one of {cpg.INTEGRATORS}")
+        # a late or slow tick is split into sub-steps of at most max_step seconds
+        self.integrator = integrator
+        self.max_step = max_step
+        # oscillator phases as uint32 fixed point (2^32 == 2π), bounded and drift free over long runs
+        self._accumulator = cpg.PhaseAccumulator(np.zeros(self.network.size))
         self._last_time: Optional[float] = None
+        # velocity command mode: (vx, vy, yaw_rate) -> trajectories, LRU over quantized command buckets
+        self.command: Optional[Tuple[float, float, float]] = None
+        self._command_cache: "OrderedDict[Tuple[int, int, int], bezier.BezierBatch]" = OrderedDict()
+        self._build_trajectories()
         self.reset(initial_phases=initial_phases)
 
+    def _build_trajectories(self) -> None:
+        # stacked [P1, P3] endpoints and oscillator index of every leg, in leg_config order
+        self.leg_names = [self._to_robot_leg_key(leg_key) for leg_key in self.leg_config]
+        self._osc_index = np.array([self._oscillator_of(name, meta) for name, meta in zip(self.leg_names, self.leg_config.values())],
+                                   dtype=np.intp)
+        for leg_key, osc_index in zip(self.leg_config, self._osc_index):
+            if osc_index < 0 or osc_index >= self.network.size:
+                raise IndexError(f"Oscillator index {osc_index} out of range for {leg_key}")
+        endpoints = np.array([[meta['P1'], meta['P3']] for meta in self.leg_config.values()], dtype=float)
+        self._static_trajectories = bezier.BezierBatch(endpoints, self.z_lift, self.z_down, self.duty_factor)
+        self._trajectories = self._static_trajectories
+
+        # stroke centres (midpoint of P1, P3) and the horizontal leg -> body rotations for set_command()
+        self._neutral = endpoints.mean(axis=1)
+        rotations, origins = body_pose.mount_transforms(self.leg_names)
+        self._mount_xy = rotations[:, :2, :2]
+        self._neutral_body_xy = origins[:, :2] + (self._mount_xy @ self._neutral[:, :2, None])[:, :, 0]
+        self._command_cache.clear()
+
+    def _oscillator_of(self, leg_name: str, meta: Dict[str, object]) -> int:
+        # the preset decides which oscillator drives a leg, 'osc' of the leg config is the fallback
+        return int(self._preset['legs'].get(leg_name, meta['osc']))
+
+    def set_command(self, vx: float = 0.0, vy: float = 0.0, yaw_rate: float = 0.0) -> None:
+        """
+        Walk with body velocity (vx, vy) in mm/s (body frame, x forward, y left) and yaw_rate in deg/s.
+
+        The stance stroke P1 -> P3 of every foot is derived from the command instead of leg_config:
+        a foot fixed on the ground at body position p moves by -(v + yaw_rate x p) * T_stance
+        relative to the body, centred on the leg_config stroke centre. Commands are quantized to
+        config.COMMAND_RESOLUTION and the trajectories of recently used buckets are cached.
+        """
+        resolution = cfg.COMMAND_RESOLUTION
+        key = (round(vx / resolution[0]), round(vy / resolution[1]), round(yaw_rate / resolution[2]))
+        trajectories = self._command_cache.get(key)
+        if trajectories is None:
+            endpoints = self.command_endpoints(key[0] * resolution[0], key[1] * resolution[1], key[2] * resolution[2])
+            trajectories = bezier.BezierBatch(endpoints, self.z_lift, self.z_down, self.duty_factor)
+            self._command_cache[key] = trajectories
+            if len(self._command_cache) > cfg.COMMAND_CACHE_SIZE:
+                self._command_cache.popitem(last=False)
+        else:
+            self._command_cache.move_to_end(key)
+        # one attribute swap, a sample running on another thread sees either the old or the new trajectories
+        self._trajectories = trajectories
+        self.command = (float(vx), float(vy), float(yaw_rate))
+
+    def clear_command(self) -> None:
+        """Go back to the fixed P1/P3 endpoints of leg_config."""
+        self._trajectories = self._static_trajectories
+        self.command = None
+
+    def command_endpoints(self, vx: float, vy: float, yaw_rate: float) -> np.ndarray:
+        """(vx, vy, yaw_rate) -> (L, 2, 3) [P1, P3] per leg in the leg frames, nothing cached."""
+        stance_time = self.duty_factor / self.network.omega[self._osc_index]            # (L,) s
+        p = self._neutral_body_xy
+        yaw = np.deg2rad(yaw_rate)
+        # ground velocity of each foot relative to the body, times the stance duration
+        stroke = np.empty_like(p)
+        stroke[:, 0] = -(vx - yaw * p[:, 1]) * stance_time
+        stroke[:, 1] = -(vy + yaw * p[:, 0]) * stance_time
+        longest = np.sqrt((stroke * stroke).sum(axis=1)).max()
+        if longest > cfg.COMMAND_MAX_STROKE:
+            stroke *= cfg.COMMAND_MAX_STROKE / longest
+        half = np.zeros_like(self._neutral)
+        half[:, :2] = 0.5 * (self._mount_xy.transpose(0, 2, 1) @ stroke[:, :, None])[:, :, 0]
+        return np.stack((self._neutral - half, self._neutral + half), axis=1)
+
     def reset(
         self,
         initial_phases: Optional[Iterable[float]] = None,
         time_reference: Optional[float] = None,
     ) -> None:
-        phases = list(initial_phases if initial_phases is not None else cfg.INITIAL_PHASES)
-        if len(phases) != 2:
-            raise ValueError("Tripod gait expects exactly two coupled oscillators")
-        self._phases = [float(p) for p in phases]
+        phases = list(initial_phases if initial_phases is not None else self.network.target_phases)
+        if len(phases) != self.network.size:
+            raise ValueError(f"{self.preset} gait expects exactly {self.network.size} coupled oscillators")
+        self._accumulator = cpg.PhaseAccumulator(phases)
         self._last_time = float(time_reference) if time_reference is not None else None
 
     def phases(self) -> List[float]:
-        return list(self._phases)
+        """oscillator phases in [0, 2π)"""
+        return self._accumulator.phases().tolist()
+
+    def phase_fixed(self) -> np.ndarray:
+        """oscillator phases as uint32 fixed point, row = (phase * rows) >> cpg.PHASE_BITS indexes a table directly"""
+        return self._accumulator.value.copy()
 
     def sample(self, time_s: float) -> Dict[str, List[float]]:
+        return dict(zip(self.leg_names, self.sample_array(time_s).tolist()))
+
+    def sample_array(self, time_s: float) -> np.ndarray:
+        """Advance the oscillators to time_s and return (L, 3) foot targets in self.leg_names order."""
+        return self.positions_at(self.advance(time_s))
+
+    def advance(self, time_s: float) -> np.ndarray:
+        """Advance the oscillators to time_s and return their phases (n_osc,) in [0, 2π)."""
         time_s = float(time_s)
         dt = 0.0
         if self._last_time is not None:
             dt = max(0.0, time_s - self._last_time)
+        phases = self._accumulator.phases()
         if dt > 0.0:
-            derivatives = cpg.coupled_oscillators2(time_s, self._phases)
-            self._phases = [self._phases[i] + float(derivatives[i]) * dt for i in range(len(self._phases))]
+            self._accumulator.advance(self.network.integrate(phases, dt, self.integrator, self.max_step) - phases)
+            phases = self._accumulator.phases()
         self._last_time = time_s
-        return self._build_foot_positions()
+        return phases
 
-    def _build_foot_positions(self) -> Dict[str, List[float]]:
-        positions: Dict[str, List[float]] = {}
-        for leg_key, meta in self.leg_config.items():
-            osc_index = int(meta['osc'])
-            if osc_index < 0 or osc_index >= len(self._phases):
-                raise IndexError(f"Oscillator index {osc_index} out of range for {leg_key}")
-            theta = self._phases[osc_index] % (2.0 * np.pi)
-            p1 = meta['P1']
-            p3 = meta['P3']
-            target = bezier.Bezier(p1, p3, theta, self.z_lift, self.z_down)
-            robot_leg = self._to_robot_leg_key(leg_key)
-            positions[robot_leg] = target.astype(float).tolist()
-        return positions
+    def positions_at(self, phases) -> np.ndarray:
+        """Oscillator phases (..., n_osc) -> (..., L, 3) foot targets in self.leg_names order, state untouched."""
+        return self._trajectories.evaluate(np.asarray(phases, dtype=float)[..., self._osc_index])
 
     @staticmethod
     def _to_robot_leg_key(config_key: str) -> str:
@@ -82,3 +178,24 @@ class TripodGait:
 
         raise ValueError(f"Invalid leg key format, expected 'L#' or 'R#': {config_key}")
 
+
+class TripodGait(CPGGait):
+    """Tripod gait generator driven by coupled oscillators (the "tripod" preset of CPGGait)."""
+
+    def __init__(
+        self,
+        leg_config: Optional[Dict[str, Dict[str, object]]] = None,
+        initial_phases: Optional[Iterable[float]] = None,
+        z_lift: float = cfg.Z_LIFT,
+        z_down: float = cfg.Z_DOWN,
+        omega: float = cpg.omega,
+        K: float = cpg.K,
+        integrator: str = cfg.CPG_INTEGRATOR,
+        max_step: Optional[float] = cfg.CPG_MAX_STEP,
+    ) -> None:
+        super().__init__("tripod", leg_config, initial_phases, z_lift, z_down, omega, K,
+                         integrator=integrator, max_step=max_step)
+
+    def _oscillator_of(self, leg_name: str, meta: Dict[str, object]) -> int:
+        # tripod leg configs carry their own oscillator assignment
+        return int(meta['osc'])
@@ -0,0 +1,13 @@
+# ==== periodic scheduler config ====
+
+# the last SPIN_THRESHOLD seconds before a deadline are busy-waited instead of slept,
+# time.sleep() overshoots by up to a few hundred microseconds on a desktop kernel
+SPIN_THRESHOLD = 0.0005         # s, 0 disables spinning
+
+# upper edges of the late-tick histogram (wakeup time - deadline), in s, the last bin is open ended
+LATE_HISTOGRAM_EDGES = [0.00005, 0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01]
+
+# ==== latency probes config ====
+
+PROBE_CAPACITY = 4096           # ticks kept per ring buffer
+PROBE_PERCENTILES = [50, 90, 99]
@@ -0,0 +1,146 @@
+"""
+Per-stage latency probes.
+
+A LatencyProbes object times consecutive stages of one loop tick:
+
+    probes.begin()
+    ...                     # stage 0
+    probes.lap(0)
+    ...                     # stage 1
+    probes.lap(1)
+    probes.end()
+
+Every tick becomes one row of a fixed-size ring buffer (capacity ticks x
+stages, seconds), summary() gives percentiles per stage and for the whole tick.
+Stages not reached in a tick are NaN and left out of their percentiles.
+
+DISABLED has the same interface and does nothing, so instrumented code keeps
+one code path and pays a no-op method call per probe when timing is off.
+"""
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import threading
+from time import perf_counter
+from typing import Dict, Sequence
+
+import numpy as np
+
+from Src.Timing import config as cfg
+
+
+class LatencyProbes:
+    enabled = True
+
+    def __init__(self, stages: Sequence[str], capacity: int = cfg.PROBE_CAPACITY,
+                 percentiles: Sequence[float] = cfg.PROBE_PERCENTILES):
+        if capacity < 1:
+            raise ValueError("probe capacity must be at least 1")
+        self.stages = tuple(stages)
+        self.capacity = int(capacity)
+        self.percentiles = list(percentiles)
+        self._lock = threading.Lock()
+        self._samples = np.full((self.capacity, len(self.stages)), np.nan)
+        self._count = 0                                 # ticks recorded since reset(), the ring keeps the last capacity
+        self._current = [float("nan")] * len(self.stages)
+        self._empty = list(self._current)
+        self._last = 0.0
+
+    def begin(self):
+        self._last = perf_counter()
+
+    def lap(self, stage: int):
+        # time since begin() or the previous lap() is booked on stage
+        now = perf_counter()
+        self._current[stage] = now - self._last
+        self._last = now
+
+    def end(self):
+        with self._lock:
+            self._samples[self._count % self.capacity] = self._current
+            self._count += 1
+        self._current[:] = self._empty
+
+    def reset(self):
+        with self._lock:
+            self._samples[:] = np.nan
+            self._count = 0
+
+    def samples(self) -> np.ndarray:
+        '''
+        return: (n, stages) recorded stage times in s, oldest tick first, n <= capacity
+        '''
+        with self._lock:
+            if self._count <= self.capacity:
+                return self._samples[:self._count].copy()
+            start = self._count % self.capacity
+            return np.concatenate((self._samples[start:], self._samples[:start]))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        '''
+        return: { stage: {"count", "mean", "p50", "p90", "p99", "max"}, ..., "total": {...} }, times in us
+        '''
+        samples = self.samples()
+        columns = dict(zip(self.stages, samples.T))
+        columns["total"] = np.nansum(samples, axis=1)
+        result = {}
+        for name, values in columns.items():
+            values = values[~np.isnan(values)] * 1e6
+            entry = {"count": int(values.size)}
+            if values.size:
+                entry["mean"] = float(values.mean())
+                for p, v in zip(self.percentiles, np.percentile(values, self.percentiles).tolist()):
+                    entry[f"p{p:g}"] = v
+                entry["max"] = float(values.max())
+            result[name] = entry
+        return result
+
+    def report(self) -> str:
+        lines = []
+        for name, entry in self.summary().items():
+            if not entry["count"]:
+                lines.append(f"{name:>12}: no samples")
+                continue
+            values = ", ".join(f"{key} {value:.1f}" for key, value in entry.items() if key != "count")
+            lines.append(f"{name:>12}: {values} us (n={entry['count']})")
+        return "\n".join(lines)
+
+    def dump(self, path: str):
+        np.savez(path, stages=np.array(self.stages), samples=self.samples())
+
+
+class _DisabledProbes:
+    enabled = False
+    stages = ()
+
+    def begin(self):
+        pass
+
+    def lap(self, stage: int):
+        pass
+
+    def end(self):
+        pass
+
+    def reset(self):
+        pass
+
+    def samples(self) -> np.ndarray:
+        return np.empty((0, 0))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {}
+
+    def report(self) -> str:
+        return "latency probes disabled"
+
+    def dump(self, path: str):
+        np.savez(path, stages=np.array(self.stages, dtype=str), samples=self.samples())
+
+
+DISABLED = _DisabledProbes()
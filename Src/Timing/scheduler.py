@@ -0,0 +1,166 @@
+"""
+Periodic scheduler shared by the control loops.
+
+Deadlines are absolute multiples of the period on a monotonic clock
+(time.perf_counter), so the loop rate does not drift with the time spent in
+the loop body. Each wait sleeps until shortly before the deadline and spins
+for the rest (hybrid sleep-then-spin), which keeps wakeups within a few
+microseconds instead of the sleep overshoot of the OS.
+
+A tick that wakes up more than one period late is an overrun: the missed
+deadlines are skipped (counted, not run in a burst) and the schedule stays
+aligned to the original period grid. Period jitter, lateness, overruns and a
+late-tick histogram are kept per scheduler and can be queried at runtime
+with stats().
+"""
+import sys
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from Src.Timing import config as cfg
+
+
+class PeriodicScheduler:
+    def __init__(self,
+                 period: float,
+                 name: str = "scheduler",
+                 spin_threshold: float = cfg.SPIN_THRESHOLD,
+                 late_histogram_edges: Sequence[float] = cfg.LATE_HISTOGRAM_EDGES,
+                 clock: Callable[[], float] = time.perf_counter):
+        if period <= 0.0:
+            raise ValueError("scheduler period must be positive")
+        self.period = float(period)
+        self.name = name
+        self.spin_threshold = max(0.0, float(spin_threshold))
+        self.late_histogram_edges = np.asarray(late_histogram_edges, dtype=float)
+        self.clock = clock
+        self._lock = threading.RLock()
+        self.start()
+
+    def start(self, now: Optional[float] = None):
+        '''
+        (re)start the schedule, the first deadline is one period after now, statistics are cleared
+        '''
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._base = now
+            self._tick = 0                  # index of the next deadline on the period grid
+            self._last_wake: Optional[float] = None
+            self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.ticks = 0
+            self.overruns = 0               # ticks that woke up more than one period late
+            self.missed = 0                 # deadlines skipped by those overruns
+            self.late_histogram = np.zeros(self.late_histogram_edges.size + 1, dtype=np.int64)
+            self._late_max = 0.0
+            self._late_sum = 0.0
+            # Welford running mean / variance of the measured tick periods
+            self._intervals = 0
+            self._interval_mean = 0.0
+            self._interval_m2 = 0.0
+            self._interval_min = math.inf
+            self._interval_max = 0.0
+
+    def wait(self) -> float:
+        '''
+        block until the next deadline
+        return: wakeup time in s since start()
+        '''
+        deadline = self._base + (self._tick + 1) * self.period
+        remaining = deadline - self.clock()
+        if remaining > self.spin_threshold:
+            time.sleep(remaining - self.spin_threshold)
+        while self.clock() < deadline:
+            pass
+        now = self.clock()
+        self._record(now, now - deadline)
+        return now - self._base
+
+    def run(self, callback: Callable[[float], None], stop_event: threading.Event):
+        '''
+        call callback(time since start) once per period until stop_event is set
+        '''
+        self.start()
+        while not stop_event.is_set():
+            callback(self.wait())
+
+    def _record(self, now: float, late: float):
+        with self._lock:
+            self._tick += 1
+            if late >= self.period:
+                # woke up past the following deadline: skip the missed ones, stay on the period grid
+                skipped = int(late // self.period)
+                self._tick += skipped
+                self.overruns += 1
+                self.missed += skipped
+            self.ticks += 1
+            self.late_histogram[np.searchsorted(self.late_histogram_edges, late)] += 1
+            self._late_sum += late
+            self._late_max = max(self._late_max, late)
+            if self._last_wake is not None:
+                interval = now - self._last_wake
+                self._intervals += 1
+                delta = interval - self._interval_mean
+                self._interval_mean += delta / self._intervals
+                self._interval_m2 += delta * (interval - self._interval_mean)
+                self._interval_min = min(self._interval_min, interval)
+                self._interval_max = max(self._interval_max, interval)
+            self._last_wake = now
+
+    def stats(self) -> Dict[str, object]:
+        '''
+        return: {"name", "period", "ticks", "overruns", "missed",
+                 "interval_mean", "interval_jitter" (std), "interval_min", "interval_max",
+                 "late_mean", "late_max", "late_histogram": {"<=50us": n, ..., ">10000us": n}}, times in s
+        '''
+        with self._lock:
+            intervals = self._intervals
+            labels = [f"<={edge * 1e6:g}us" for edge in self.late_histogram_edges]
+            labels.append(f">{self.late_histogram_edges[-1] * 1e6:g}us" if self.late_histogram_edges.size else "all")
+            return {
+                "name": self.name,
+                "period": self.period,
+                "ticks": self.ticks,
+                "overruns": self.overruns,
+                "missed": self.missed,
+                "interval_mean": self._interval_mean if intervals else None,
+                "interval_jitter": math.sqrt(self._interval_m2 / intervals) if intervals else None,
+                "interval_min": self._interval_min if intervals else None,
+                "interval_max": self._interval_max if intervals else None,
+                "late_mean": self._late_sum / self.ticks if self.ticks else None,
+                "late_max": self._late_max if self.ticks else None,
+                "late_histogram": dict(zip(labels, self.late_histogram.tolist())),
+            }
+
+    def report(self) -> str:
+        s = self.stats()
+        if not s["ticks"]:
+            return f"[{self.name}] no ticks yet"
+        jitter = s["interval_jitter"] if s["interval_jitter"] is not None else 0.0
+        return (f"[{self.name}] {s['ticks']} ticks @ {1.0 / self.period:.0f} Hz, jitter {jitter * 1e6:.1f} us, "
+                f"late mean {s['late_mean'] * 1e6:.1f} us / max {s['late_max'] * 1e6:.1f} us, "
+                f"{s['overruns']} overruns, {s['missed']} missed")
+
+
+if __name__ == "__main__":
+    # measure the scheduler on this machine: 200 Hz for a few seconds, with some work per tick
+    scheduler = PeriodicScheduler(1.0 / 200.0, name="scheduler test")
+    stop = threading.Event()
+    timer = threading.Timer(5.0, stop.set)
+    timer.start()
+    scheduler.run(lambda t: sum(range(2000)), stop)
+    print(scheduler.report())
+    print(scheduler.stats()["late_histogram"])
@@ -0,0 +1,87 @@
+"""Benchmark the servo frame encoder: frames per second before and after the table-driven CRC / precompiled packer.
+
+The "before" encoder is the original bit-by-bit CRC16 and per-angle struct.pack version, kept here as reference.
+Both encoders are checked to produce identical frames first.
+
+    python Tests/Tools/benchmark_servo_frame.py --seconds 2
+"""
+
+import argparse
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from Src.Drivers.Transmit.servo_control import servo
+
+
+def legacy_crc16_ibm(data: bytes) -> int:
+    crc = 0xFFFF
+    for ch in data:
+        crc ^= ch
+        for _ in range(8):
+            if (crc & 0x0001) != 0:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc & 0xFFFF
+
+
+def legacy_build_frame(seq: int, angles_deg_18) -> bytes:
+    payload = bytearray()
+    payload.append(servo.CMD_SET18)
+    payload += struct.pack("<H", seq & 0xFFFF)
+    for a in angles_deg_18:
+        a = min(180.0, max(0.0, a))
+        payload += struct.pack("<H", int(round(a * 10.0)) & 0xFFFF)
+    payload += struct.pack("<H", legacy_crc16_ibm(payload))
+    return bytes(bytearray([servo.START1, servo.START2, servo.LEN_FIXED]) + payload)
+
+
+def measure(encode, angles, seconds: float) -> float:
+    frames = 0
+    seq = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(200):
+            encode(seq, angles)
+            seq = (seq + 1) & 0xFFFF
+        frames += 200
+        now = time.perf_counter()
+        if now >= deadline:
+            return frames / (now - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="servo frame encoder benchmark")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time per measurement")
+    args = parser.parse_args()
+
+    driver = servo()
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(-10.0, 190.0, size=(1000, 18))
+    for seq, angles in enumerate(samples):
+        expected = legacy_build_frame(seq, angles.tolist())
+        if driver._build_frame(seq, angles.tolist()) != expected or driver._build_frame(seq, angles) != expected:
+            raise SystemExit(f"frame mismatch at sample {seq}")
+    print(f"{len(samples)} random frames identical to the reference encoder")
+
+    angles = samples[0]
+    before = measure(legacy_build_frame, angles.tolist(), args.seconds)
+    after_list = measure(driver._build_frame, angles.tolist(), args.seconds)
+    after_array = measure(driver._build_frame, angles, args.seconds)
+    print(f"before (bitwise CRC, per-angle pack): {before:10.0f} frames/s  {1e6 / before:6.1f} us/frame")
+    print(f"after, list input:                    {after_list:10.0f} frames/s  {1e6 / after_list:6.1f} us/frame  x{after_list / before:.1f}")
+    print(f"after, np.ndarray input:              {after_array:10.0f} frames/s  {1e6 / after_array:6.1f} us/frame  x{after_array / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Soak test / benchmark of the whole servo pipeline without hardware.
+
+GaitController -> servo driver (in-process sink, sender thread) -> PTY -> simulated STM32 board. Runs for the given
+time and reports the gait and sender scheduler timing, the angle handoff and what the board received: frame rate
+and jitter on the modelled UART, SEQ gaps, CRC errors and line utilization.
+
+    python Tests/Tools/soak_servo_pipeline.py --seconds 600 --gait-hz 50 --interpolation hermite
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from Src.Drivers.Transmit import config as servo_cfg
+from Src.Drivers.Transmit import servo_control
+from Src.Drivers.Transmit.servo_board_simulator import ServoBoardSimulator
+from Src.Gait_control.Gait_controller.gait_controller import GaitController
+from Src.Gait_control.Tripod_gait.tripod_gait import TripodGait
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0, help="run time")
+    parser.add_argument("--gait-hz", type=float, default=50.0, help="gait control rate")
+    parser.add_argument("--send-hz", type=float, default=servo_cfg.CONTROL_FREQUENCE, help="servo frame rate")
+    parser.add_argument("--baud", type=int, default=servo_cfg.BAUD, help="modelled UART baud rate")
+    parser.add_argument("--interpolation", choices=("none", "linear", "hermite"), default=servo_cfg.INTERPOLATION,
+                        help="setpoint interpolation in the servo sender thread")
+    parser.add_argument("--interval", type=float, default=5.0, help="s between progress lines")
+    args = parser.parse_args()
+
+    board = ServoBoardSimulator(baud=args.baud)
+    board.start()
+    servo = servo_control.servo(port=board.port, baud=args.baud, control_frequency=args.send_hz,
+                                interpolation=args.interpolation)
+    servo.start()
+    controller = GaitController(gait=TripodGait(), control_hz=args.gait_hz, pub_bind=None, servo_sink=servo)
+    controller.start()
+
+    start = time.monotonic()
+    try:
+        while time.monotonic() - start < args.seconds:
+            time.sleep(min(args.interval, max(0.0, args.seconds - (time.monotonic() - start))))
+            print(f"{time.monotonic() - start:7.1f} s  {board.report()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.close()
+        servo.stop()
+        time.sleep(0.1)         # let the board take the last frames off the PTY
+        board.close()
+
+    print(controller.scheduler.report())
+    print(servo.scheduler.report())
+    buffer = servo.buffer_stats()
+    print(f"[angle buffer] {buffer['writes']} writes, {buffer['reads']} reads, {buffer['read_retries']} read retries, "
+          f"{buffer['write_contention']} contended writes")
+    print(board.report())
+    stats = board.stats()
+    ok = stats["frames"] and not (stats["dropped"] or stats["crc_errors"] or stats["bad_frames"] or stats["seq_repeats"])
+    print("PASS" if ok else "FAIL")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Stress the servo driver's lock-free angle handoff and print its contention stats.
+
+Writer threads publish commands through the servo API (set_angles_array / set_all_angle) as fast as they can
+while a reader thread takes snapshots like the sender thread does. Every command has all 18 angles equal, so a
+snapshot mixing two commands (a torn read) is detected directly.
+
+    python Tests/Tools/stress_angle_buffer.py --seconds 3 --writers 2
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from Src.Drivers.Transmit.servo_control import servo
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="run time")
+    parser.add_argument("--writers", type=int, default=2, help="writer threads")
+    parser.add_argument("--switch-interval", type=float, default=1e-5, help="sys.setswitchinterval, smaller = more preemption")
+    args = parser.parse_args()
+
+    sys.setswitchinterval(args.switch_interval)
+    driver = servo(port="unused")   # never started, only the angle handoff is exercised
+    stop = threading.Event()
+    torn = [0]
+
+    def array_writer(base: float) -> None:
+        k = 0
+        while not stop.is_set():
+            driver.set_angles_array(np.full(18, base + k % 50))
+            k += 1
+
+    def dict_writer(base: float) -> None:
+        k = 0
+        while not stop.is_set():
+            driver.set_all_angle(dict.fromkeys(driver.send_order, base + k % 50))
+            k += 1
+
+    def reader() -> None:
+        out = np.empty(18)
+        while not stop.is_set():
+            driver.angles.snapshot(out)
+            if not (out == out[0]).all():
+                torn[0] += 1
+
+    threads = [threading.Thread(target=array_writer if i % 2 == 0 else dict_writer, args=(10.0 + 60.0 * i,))
+               for i in range(args.writers)]
+    threads.append(threading.Thread(target=reader))
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    stats = driver.buffer_stats()
+    print(f"{stats['writes']} writes ({stats['writes'] / args.seconds:.0f}/s), {stats['write_contention']} contended")
+    print(f"{stats['reads']} reads ({stats['reads'] / args.seconds:.0f}/s), {stats['read_retries']} retried, "
+          f"{stats['overwritten']} commands overwritten before a read")
+    print(f"torn snapshots: {torn[0]}")
+
+
+if __name__ == "__main__":
+    main()
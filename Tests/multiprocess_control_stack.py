@@ -0,0 +1,102 @@
+"""Run gait/IK and the serial driver in separate processes, connected by the shared-memory command ring.
+
+The ring is created here, before either process starts, and both attach to it by name, so they always share one
+segment. Use --remove-stale only after a crashed run, when no other stack uses the ring name.
+"""
+
+import argparse
+import multiprocessing as mp
+import signal
+import sys
+import time
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from Src.DDS import shm_ring
+from Src.DDS.shm_ring import RING_NAME, ShmRingReader, ShmRingWriter
+from Src.Drivers.Transmit import config as servo_cfg
+
+
+def gait_process(ring_name: str, control_hz: float, pub_bind, stop) -> None:
+    from Src.Gait_control.Tripod_gait.tripod_gait import TripodGait
+    from Src.Gait_control.Gait_controller.gait_controller import GaitController
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring = ShmRingWriter(ring_name, create=False)
+    controller = GaitController(gait=TripodGait(), control_hz=control_hz, pub_bind=pub_bind, servo_sink=ring)
+    controller.start()
+    try:
+        stop.wait()
+    finally:
+        controller.close()
+        print(controller.scheduler.report())
+        ring.close()
+
+
+def driver_process(ring_name: str, port: str, stop) -> None:
+    from Src.Drivers.Transmit import servo_control
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring = ShmRingReader(ring_name)
+    servo = servo_control.servo(port=port)
+    servo.attach_source(ring)
+    servo.start()
+    try:
+        stop.wait()
+    finally:
+        servo.stop()
+        print(servo.scheduler.report())
+        stats = ring.stats()
+        if stats["reads"]:
+            print(f"[ring] {stats['reads']} frames read of {stats['written']}, {stats['skipped']} skipped, "
+                  f"{stats['retries']} retries, latency mean {stats['latency_mean'] * 1e6:.0f} us / "
+                  f"max {stats['latency_max'] * 1e6:.0f} us")
+        ring.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", default=servo_cfg.PORT, help="servo board serial port")
+    parser.add_argument("--hz", type=float, default=200.0, help="gait control rate")
+    parser.add_argument("--pub", default=None, help="optional ZeroMQ side channel of the gait process, e.g. tcp://*:6000")
+    parser.add_argument("--ring", default=RING_NAME, help="shared memory name of the command ring")
+    parser.add_argument("--remove-stale", action="store_true", help="remove a ring of the same name left by a crashed run")
+    parser.add_argument("--duration", type=float, default=0.0, help="stop after this many seconds (0: until Ctrl+C)")
+    args = parser.parse_args()
+
+    if args.remove_stale and shm_ring.remove(args.ring):
+        print(f"Removed stale ring '{args.ring}'")
+    try:
+        ring = ShmRingWriter(args.ring)
+    except FileExistsError as exc:
+        print(f"[multiprocess_control_stack] {exc}; pass --remove-stale or another --ring name")
+        return
+
+    stop = mp.Event()
+    gait = mp.Process(target=gait_process, args=(args.ring, args.hz, args.pub, stop), name="gait")
+    driver = mp.Process(target=driver_process, args=(args.ring, args.port, stop), name="servo-driver")
+    gait.start()
+    driver.start()
+    print(f"Gait process -> shared memory '{args.ring}' -> driver process on {args.port}. Press Ctrl+C to stop.")
+
+    start = time.monotonic()
+    try:
+        while gait.is_alive() and driver.is_alive():
+            if args.duration and time.monotonic() - start >= args.duration:
+                break
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        print("Interrupted, shutting down.")
+    finally:
+        stop.set()
+        driver.join(timeout=3.0)
+        gait.join(timeout=3.0)
+        ring.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -55,7 +55,8 @@ def mode2(joint_name: str, amp: float, freq: float, base: float, send_hz: float)
 if __name__ == "__main__":
     import time
 
-    servo = servo_control.servo()
+    # optional port argument, e.g. the PTY printed by Src/Drivers/Transmit/servo_board_simulator.py
+    servo = servo_control.servo(port=sys.argv[1]) if len(sys.argv) > 1 else servo_control.servo()
     servo.start()
 
     try:
@@ -0,0 +1,68 @@
+"""Run the tripod gait controller and the servo driver in one process, no ZeroMQ hop in between."""
+
+import argparse
+import sys
+import time
+import signal
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from Src.Drivers.Transmit import servo_control
+from Src.Drivers.Transmit import config as servo_cfg
+from Src.Gait_control.Tripod_gait.tripod_gait import TripodGait
+from Src.Gait_control.Gait_controller.gait_controller import GaitController
+from Src.Visualization.angle_data_monitor import AngleMonitor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", default=servo_cfg.PORT, help="servo board serial port")
+    parser.add_argument("--hz", type=float, default=200.0, help="gait control rate (may be below the servo rate)")
+    parser.add_argument("--interpolation", choices=("none", "linear", "hermite"), default=servo_cfg.INTERPOLATION,
+                        help="setpoint interpolation in the servo sender thread")
+    parser.add_argument("--pub", default=None, help="optional ZeroMQ side channel, e.g. tcp://*:6000")
+    parser.add_argument("--monitor-hz", type=float, default=0.0, help="refresh rate for AngleMonitor UI (0 disables)")
+    args = parser.parse_args()
+
+    servo = servo_control.servo(port=args.port, interpolation=args.interpolation)
+    servo.start()
+    controller = GaitController(gait=TripodGait(), control_hz=args.hz, pub_bind=args.pub, servo_sink=servo)
+    monitor = AngleMonitor(lambda: servo.read_joint_angle(), refresh_hz=args.monitor_hz) if args.monitor_hz > 0 else None
+
+    stop = False
+
+    def _handle_sigint(signum, frame):
+        nonlocal stop
+        stop = True
+
+    signal.signal(signal.SIGINT, _handle_sigint)
+    controller.start()
+    print(f"Gait controller driving {args.port} in-process. Press Ctrl+C to stop.")
+
+    try:
+        while not stop:
+            time.sleep(0.2)
+    finally:
+        controller.close()
+        if monitor is not None:
+            try:
+                monitor.stop(timeout=1.0)
+                monitor.join(timeout=1.0)
+            except Exception:
+                pass
+        print(controller.scheduler.report())
+        print(servo.scheduler.report())
+        try:
+            servo.reset_joint_angle()
+        except Exception:
+            pass
+        servo.stop()
+        print("Controller stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
 from Src.Drivers.Transmit import servo_control
+from Src.Drivers.Transmit import config as servo_cfg
 from Src.Visualization.angle_data_monitor import AngleMonitor
 from Src.DDS.subscriber import Subscriber
 
@@ -30,10 +31,11 @@ def main() -> None:
     parser.add_argument("--connect", default="tcp://127.0.0.1:6000", help="PUB socket to connect to")
     parser.add_argument("--topic", default="servo.angles", help="topic name to subscribe")
     parser.add_argument("--timeout", type=float, default=2.0, help="receive timeout in seconds (0 for block)")
+    parser.add_argument("--port", default=servo_cfg.PORT, help="servo board serial port (or a servo_board_simulator PTY)")
     parser.add_argument("--monitor-hz", type=float, default=10.0, help="refresh rate for AngleMonitor UI")
     args = parser.parse_args()
 
-    servo = servo_control.servo()
+    servo = servo_control.servo(port=args.port)
     servo.start()
     monitor = AngleMonitor(lambda: servo.read_joint_angle(), refresh_hz=args.monitor_hz)
 